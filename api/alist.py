@@ -3,21 +3,36 @@
 # -*- coding: utf-8 -*-
 
 
-import requests
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-from utils import RequestUtils, StringUtils
-from utils.types import HttpMethod
+from config.config import Config
+from metrics.metrics import metrics
+from utils import RequestUtils, StringUtils, TTLCache, NegativeCache
+from utils.async_http_utils import AsyncRequestUtils
+from utils.hedge import HedgePolicy
+from utils.persistent_store import PersistentStore
+from utils.shared_cache import SharedTTLCache
+from utils.types import HttpMethod, LookupFailure
 
 
 # noinspection SpellCheckingInspection
 class AlistApi:
     __paths = {
         "fs_get": "api/fs/get",
+        "ping": "ping",
     }
-    __request = RequestUtils(session=requests.Session())
+    __upstream_config = None
+    __request = None
+    __async_request = None
+    __raw_url_cache = TTLCache()
+    __negative_cache = NegativeCache()
+    __hedge_policy = None
+    __hedge_executor = None
 
-    __alist_url = None
-    __alist_api_key = None
+    __header_profiles = {}
+    __fs_get_templates = {}
 
     def __init__(self, alist_url, alist_api_key):
         """
@@ -27,36 +42,50 @@ class AlistApi:
         if isinstance(self.__alist_url, str) and not self.__alist_url.endswith("/"):
             self.__alist_url += "/"
         self.__alist_api_key = alist_api_key if alist_api_key and isinstance(alist_api_key, str) else ""
-        AlistApi.__alist_url = self.__alist_url
-        AlistApi.__alist_api_key = self.__alist_api_key
+        self.__headers = self.__get_header_profile(self.__alist_url, self.__alist_api_key)
 
-    @classmethod
-    def __invoke(cls, method, path, headers=None, **kwargs):
+    def __invoke(self, method, path, headers=None, endpoint="", **kwargs):
         """
         执行Alist API 请求
 
         Parameters:
         - path (str): Alist API 请求路径
+        - headers (Mapping): 本次请求携带的请求头，不会修改共享的请求头
+        - endpoint (str): 接口名称，用于指标标签
         - **kwargs: 请求参数
 
         Returns:
         - dict or None: API 响应的 JSON 数据或 None（请求失败时）
         """
-        req_url = cls.__alist_url + path
+        req_url = self.__alist_url + path
         if not StringUtils.is_valid_url(req_url):
             return None
-        if headers:
-            cls.__request.update_headers(headers)
         params = {}
         if kwargs:
             if isinstance(kwargs, dict) and 'body' in kwargs and isinstance(kwargs['body'], dict):
                 params.update(kwargs['body'])
             else:
                 params.update(kwargs)
+        started = time.perf_counter()
         if method == HttpMethod.GET:
-            response = cls.__request.get_res(url=req_url, params=params)
+            response = self.__request.get_res(url=req_url, params=params, headers=headers)
         else:
-            response = cls.__request.post_res(url=req_url, json=params)
+            response = self.__request.post_res(url=req_url, json=params, headers=headers)
+        metrics.observe_upstream("alist", endpoint, getattr(response, "status_code", None),
+                                 time.perf_counter() - started)
+        return self.__parse_response(response)
+
+    @staticmethod
+    def __parse_response(response):
+        """
+        解析 Alist API 响应
+
+        Parameters:
+        - response (requests.Response): 响应对象
+
+        Returns:
+        - dict or None: API 响应的 JSON 数据或 None（请求失败时）
+        """
         if not response:
             return None
         return (
@@ -65,6 +94,50 @@ class AlistApi:
             else None
         )
 
+    async def __invoke_async(self, method, path, headers=None, endpoint="", **kwargs):
+        """
+        异步执行Alist API 请求
+
+        Parameters:
+        - path (str): Alist API 请求路径
+        - headers (dict): 本次请求携带的请求头
+        - endpoint (str): 接口名称，用于指标标签
+        - **kwargs: 请求参数
+
+        Returns:
+        - httpx.Response or None: 响应对象或 None（地址非法或请求失败时）
+        """
+        req_url = self.__alist_url + path
+        if not StringUtils.is_valid_url(req_url):
+            return None
+        params = {}
+        if kwargs:
+            if 'body' in kwargs and isinstance(kwargs['body'], dict):
+                params.update(kwargs['body'])
+            else:
+                params.update(kwargs)
+        started = time.perf_counter()
+        if method == HttpMethod.GET:
+            response = await self.__async_request.get_res(url=req_url, params=params, headers=headers)
+        else:
+            response = await self.__async_request.post_res(url=req_url, json=params, headers=headers)
+        metrics.observe_upstream("alist", endpoint, getattr(response, "status_code", None),
+                                 time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def __is_reachable(response):
+        """
+        判断 Alist 是否可达：请求失败或返回 5xx 时视为不可达，文件不存在等业务错误仍视为可达
+
+        Parameters:
+        - response (Response): 响应对象
+
+        Returns:
+        - bool: 是否可达
+        """
+        return response is not None and response.status_code < 500
+
     def fetch_file_path(self, emby_path):
         """
         根据 item_id、media_source_id 和 api_key 获取文件路径
@@ -78,37 +151,336 @@ class AlistApi:
         if not emby_path or not isinstance(emby_path, str):
             return ""
 
-        headers = {
-            'accept': 'application/json, text/plain, */*',
-            'accept-language': 'zh-CN,zh;q=0.9,zh-Hans;q=0.8,en;q=0.7',
-            'authorization': f'{self.__alist_api_key}',
-            'cache-control': 'no-cache',
-            'content-type': 'application/json;charset=UTF-8',
-            'origin': f'{self.__alist_url}',
-            'pragma': 'no-cache',
-            'priority': 'u=1, i',
-            'sec-ch-ua': '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"',
-            'sec-ch-ua-mobile': '?1',
-            'sec-ch-ua-platform': '"Android"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-origin',
-            'user-agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) '
-                          'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36'
-        }
+        cached_raw_url = self.__raw_url_cache.get(emby_path)
+        if cached_raw_url is not None:
+            return cached_raw_url
+        if self.__negative_cache.get(emby_path) is not None:
+            return ""
+        raw_url, reachable = self.fetch_raw_url(emby_path)
+        if not raw_url:
+            self.cache_failure(emby_path, reachable)
+        return raw_url
 
-        body = {
-            "path": emby_path,
-            "password": ""
-        }
+    async def fetch_file_path_async(self, emby_path):
+        """
+        fetch_file_path 的异步版本，与同步版本共享直链缓存
 
-        alist_file_info = self.__invoke(
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
+        if not emby_path or not isinstance(emby_path, str):
+            return ""
+
+        cached_raw_url = self.__raw_url_cache.get(emby_path)
+        if cached_raw_url is not None:
+            return cached_raw_url
+        if self.__negative_cache.get(emby_path) is not None:
+            return ""
+        raw_url, reachable = await self.fetch_raw_url_async(emby_path)
+        if not raw_url:
+            self.cache_failure(emby_path, reachable)
+        return raw_url
+
+    def fetch_raw_url(self, emby_path):
+        """
+        不经过直链缓存，直接向当前 Alist 请求直链，结果写入直链缓存
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - tuple: (直链，失败时为 空字符串, Alist 是否可达)
+        """
+        fs_get_template = self.__get_fs_get_template()
+        if fs_get_template is None:
+            return "", False
+        started = time.perf_counter()
+        response = self.__request.send_prepared(fs_get_template, json=self.__build_fs_get_body(emby_path))
+        elapsed = time.perf_counter() - started
+        metrics.observe_upstream("alist", "fs_get", getattr(response, "status_code", None), elapsed)
+        reachable = self.__is_reachable(response)
+        self.__observe_fs_get(elapsed, reachable)
+        return self.__parse_file_info(emby_path, self.__parse_response(response)), reachable
+
+    async def fetch_raw_url_async(self, emby_path):
+        """
+        fetch_raw_url 的异步版本
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - tuple: (直链，失败时为 空字符串, Alist 是否可达)
+        """
+        started = time.perf_counter()
+        response = await self.__invoke_async(
             HttpMethod.POST,
             self.__paths["fs_get"],
-            headers=headers,
-            body=body
+            headers=self.__headers,
+            endpoint="fs_get",
+            body=self.__build_fs_get_body(emby_path)
         )
+        reachable = self.__is_reachable(response)
+        self.__observe_fs_get(time.perf_counter() - started, reachable)
+        alist_file_info = None
+        if response is not None and response.status_code == 200 and \
+                RequestUtils.check_response_is_valid_json(response):
+            alist_file_info = response.json()
+        return self.__parse_file_info(emby_path, alist_file_info), reachable
+
+    @classmethod
+    def __observe_fs_get(cls, seconds, reachable):
+        """
+        记录 fs/get 耗时，用于计算对冲延迟；不可达的请求耗时取决于超时配置，不计入
+        """
+        hedge_policy = cls.__hedge_policy
+        if hedge_policy is not None and reachable:
+            hedge_policy.observe(seconds)
+
+    def fetch_raw_url_hedged(self, emby_path, alternate=None):
+        """
+        带对冲的 fetch_raw_url：第一个请求超过对冲延迟仍未返回时，向 alternate（未提供时为当前实例）
+        再发出一个请求，采用先拿到直链的结果。未开启对冲或样本不足时等同于 fetch_raw_url
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+        - alternate (AlistApi, optional): 发送对冲请求的 Alist 实例
+
+        Returns:
+        - tuple: (直链，失败时为 空字符串, Alist 是否可达, 采用对冲请求的结果时为对冲请求的耗时，否则为 None)
+        """
+        hedge_policy = self.__hedge_policy
+        hedge_executor = self.__hedge_executor
+        delay = hedge_policy.delay() if hedge_policy is not None else None
+        if delay is None or hedge_executor is None:
+            return self.fetch_raw_url(emby_path) + (None,)
+
+        primary = hedge_executor.submit(self.fetch_raw_url, emby_path)
+        done, _ = wait((primary,), timeout=delay)
+        if done:
+            hedge_policy.record(False, False)
+            return primary.result() + (None,)
+
+        # 未被采用的请求在后台继续完成，结果同样会写入直链缓存
+        hedge_started = time.perf_counter()
+        hedge = hedge_executor.submit((alternate or self).fetch_raw_url, emby_path)
+        pending = {primary, hedge}
+        fallback = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result[0]:
+                    hedge_policy.record(True, future is hedge)
+                    return result + (time.perf_counter() - hedge_started if future is hedge else None,)
+                if fallback is None or result[1]:
+                    fallback = result
+        hedge_policy.record(True, False)
+        return fallback + (None,)
+
+    async def fetch_raw_url_hedged_async(self, emby_path, alternate=None):
+        """
+        fetch_raw_url_hedged 的异步版本，采用一个结果后取消另一个请求
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+        - alternate (AlistApi, optional): 发送对冲请求的 Alist 实例
+
+        Returns:
+        - tuple: (直链，失败时为 空字符串, Alist 是否可达, 采用对冲请求的结果时为对冲请求的耗时，否则为 None)
+        """
+        hedge_policy = self.__hedge_policy
+        delay = hedge_policy.delay() if hedge_policy is not None else None
+        if delay is None:
+            return await self.fetch_raw_url_async(emby_path) + (None,)
+
+        primary = asyncio.ensure_future(self.fetch_raw_url_async(emby_path))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            hedge_policy.record(False, False)
+            return primary.result() + (None,)
+
+        hedge_started = time.perf_counter()
+        hedge = asyncio.ensure_future((alternate or self).fetch_raw_url_async(emby_path))
+        pending = {primary, hedge}
+        fallback = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result[0]:
+                        hedge_policy.record(True, task is hedge)
+                        return result + (time.perf_counter() - hedge_started if task is hedge else None,)
+                    if fallback is None or result[1]:
+                        fallback = result
+        finally:
+            for task in pending:
+                task.cancel()
+        hedge_policy.record(True, False)
+        return fallback + (None,)
+
+    @classmethod
+    def hedge_stats(cls):
+        """
+        获取 fs/get 对冲统计信息
+
+        Returns:
+        - dict: 请求数、对冲数、对冲胜出数、对冲比例与当前对冲延迟，未开启对冲时返回 空字典
+        """
+        hedge_policy = cls.__hedge_policy
+        return hedge_policy.stats() if hedge_policy is not None else {}
+
+    def ping(self):
+        """
+        健康检查：请求 Alist 的 /ping 接口
+
+        Returns:
+        - bool: Alist 是否可达
+        """
+        req_url = self.__alist_url + self.__paths["ping"]
+        if not StringUtils.is_valid_url(req_url):
+            return False
+        started = time.perf_counter()
+        response = self.__request.get_res(url=req_url, headers=self.__headers)
+        metrics.observe_upstream("alist", "ping", getattr(response, "status_code", None),
+                                 time.perf_counter() - started)
+        return self.__is_reachable(response)
+
+    @classmethod
+    def get_cached_raw_url_with_ttl(cls, emby_path):
+        """
+        读取直链缓存及其剩余有效期
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - tuple: (直链, 剩余有效期（秒）)，未缓存时返回 (None, 0)
+        """
+        return cls.__raw_url_cache.get_with_ttl(emby_path)
+
+    @classmethod
+    def is_cached(cls, emby_path):
+        """
+        判断获取直链是否无需请求 Alist（直链缓存或负缓存中存在该路径），不计入命中统计
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - bool: 无需请求 Alist 时返回 True
+        """
+        return emby_path in cls.__raw_url_cache or emby_path in cls.__negative_cache
+
+    @classmethod
+    def get_cached_failure(cls, emby_path):
+        """
+        读取负缓存
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - LookupFailure: 最近一次获取直链失败的原因，未缓存时返回 None
+        """
+        return cls.__negative_cache.get(emby_path)
+
+    @classmethod
+    def cache_failure(cls, emby_path, reachable):
+        """
+        记录一次获取直链失败
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+        - reachable (bool): Alist 是否可达，可达时视为文件不存在，否则视为上游错误
+        """
+        cls.__negative_cache.set(emby_path, LookupFailure.NOT_FOUND if reachable else LookupFailure.UPSTREAM_ERROR)
+
+    @classmethod
+    def __get_header_profile(cls, alist_url, alist_api_key):
+        """
+        获取请求 Alist 时使用的只读请求头，每个 Alist 地址与密钥组合只构造一次
+
+        Parameters:
+        - alist_url (str): Alist 地址
+        - alist_api_key (str): Alist API 密钥
+
+        Returns:
+        - MappingProxyType: 只读的请求头
+        """
+        profile_key = (alist_url, alist_api_key)
+        header_profile = cls.__header_profiles.get(profile_key)
+        if header_profile is None:
+            header_profile = RequestUtils.freeze_headers({
+                'accept': 'application/json, text/plain, */*',
+                'accept-language': 'zh-CN,zh;q=0.9,zh-Hans;q=0.8,en;q=0.7',
+                'authorization': f'{alist_api_key}',
+                'cache-control': 'no-cache',
+                'content-type': 'application/json;charset=UTF-8',
+                'origin': f'{alist_url}',
+                'pragma': 'no-cache',
+                'priority': 'u=1, i',
+                'sec-ch-ua': '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"',
+                'sec-ch-ua-mobile': '?1',
+                'sec-ch-ua-platform': '"Android"',
+                'sec-fetch-dest': 'empty',
+                'sec-fetch-mode': 'cors',
+                'sec-fetch-site': 'same-origin',
+                'user-agent': 'Mozilla/5.0 (Linux; Android 6.0; Nexus 5 Build/MRA58N) '
+                              'AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Mobile Safari/537.36'
+            })
+            cls.__header_profiles[profile_key] = header_profile
+        return header_profile
 
+    def __get_fs_get_template(self):
+        """
+        获取 fs/get 的请求模板，每个 Alist 地址与密钥组合只构造一次
+
+        Returns:
+        - requests.PreparedRequest or None: 请求模板，Alist 地址非法时返回 None
+        """
+        template_key = (self.__alist_url, self.__alist_api_key)
+        fs_get_template = self.__fs_get_templates.get(template_key)
+        if fs_get_template is None:
+            req_url = self.__alist_url + self.__paths["fs_get"]
+            if not StringUtils.is_valid_url(req_url):
+                return None
+            fs_get_template = self.__request.prepare_template(HttpMethod.POST.value, req_url, headers=self.__headers)
+            self.__fs_get_templates[template_key] = fs_get_template
+        return fs_get_template
+
+    @staticmethod
+    def __build_fs_get_body(emby_path):
+        """
+        构造 fs/get 请求体
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+
+        Returns:
+        - dict: 请求体
+        """
+        return {
+            "path": emby_path,
+            "password": ""
+        }
+
+    @classmethod
+    def __parse_file_info(cls, emby_path, alist_file_info):
+        """
+        从 fs/get 响应中解析直链，并写入直链缓存
+
+        Parameters:
+        - emby_path (str): Emby媒体库的 相对路径
+        - alist_file_info (dict): fs/get 响应
+
+        Returns:
+        - str: 直链，解析失败时返回 空字符串
+        """
         if not isinstance(alist_file_info, dict):
             return ""
 
@@ -116,7 +488,147 @@ class AlistApi:
         if not alist_file_data or not isinstance(alist_file_data, dict):
             return ""
 
-        return alist_file_data.get("raw_url", "")
+        raw_url = alist_file_data.get("raw_url", "")
+        if raw_url and isinstance(raw_url, str):
+            cls.__raw_url_cache.set(emby_path, raw_url, ttl=cls.__get_raw_url_ttl(raw_url))
+        return raw_url
+
+    @staticmethod
+    def __get_raw_url_ttl(raw_url):
+        """
+        计算直链的缓存时间：优先使用直链签名中的过期时间，否则使用配置的默认值，并扣除安全余量
+
+        Parameters:
+        - raw_url (str): Alist 返回的直链
+
+        Returns:
+        - float: 缓存时间（秒），小于等于 0 时不缓存
+        """
+        snapshot = Config().snapshot
+        expire_time = StringUtils.get_url_expire_time(raw_url)
+        if expire_time is None:
+            return snapshot.alist_raw_url_cache_ttl - snapshot.alist_raw_url_expire_margin
+        return expire_time - time.time() - snapshot.alist_raw_url_expire_margin
+
+    @classmethod
+    def apply_config(cls, snapshot):
+        """
+        应用配置快照：调整Alist 直链缓存的容量、过期时间与持久化存储，连接池或超时配置变化时重建请求工具
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        cls.__raw_url_cache.configure(max_size=snapshot.alist_raw_url_cache_max_size, ttl=snapshot.alist_raw_url_cache_ttl)
+        store = None
+        if snapshot.persistent_cache_enabled and cls.__raw_url_cache.enabled:
+            store = PersistentStore.open(Config().persistent_cache_path, snapshot.persistent_cache_flush_interval)
+        cls.__raw_url_cache.attach_store(store, "alist_raw_url")
+        cls.__negative_cache.configure(snapshot.negative_cache_max_size, snapshot.negative_cache_not_found_ttl,
+                                       snapshot.negative_cache_error_ttl)
+        cls.__apply_hedge_config(snapshot)
+        upstream_config = dict(snapshot.upstreams["alist"])
+        if upstream_config == cls.__upstream_config:
+            return
+        # 旧的请求工具仍可能被进行中的请求使用，只替换引用，不主动关闭
+        cls.__request = RequestUtils(
+            session=RequestUtils.create_session(
+                pool_connections=upstream_config["pool_connections"],
+                pool_maxsize=upstream_config["pool_maxsize"],
+                max_retries=upstream_config["max_retries"]
+            ),
+            timeout=(upstream_config["connect_timeout"], upstream_config["read_timeout"]),
+            pool_maxsize=upstream_config["pool_maxsize"]
+        )
+        cls.__async_request = AsyncRequestUtils(
+            timeout=(upstream_config["connect_timeout"], upstream_config["read_timeout"]),
+            max_connections=upstream_config["pool_maxsize"],
+            max_keepalive_connections=upstream_config["pool_maxsize"]
+        )
+        # 对冲请求在独立的线程池中发出，每个请求最多占用两个线程；线程按需创建，未开启对冲时不占用资源。
+        # 旧的线程池仍可能被进行中的请求使用，只替换引用，空闲线程在线程池被回收后退出
+        cls.__hedge_executor = ThreadPoolExecutor(max_workers=upstream_config["pool_maxsize"] * 2,
+                                                  thread_name_prefix="alist-hedge")
+        cls.__upstream_config = upstream_config
+
+    @classmethod
+    def __apply_hedge_config(cls, snapshot):
+        """
+        应用对冲配置，对冲参数不变时保留已有的耗时样本
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        if not snapshot.alist_hedge_enabled:
+            cls.__hedge_policy = None
+            return
+        settings = (snapshot.alist_hedge_percentile, snapshot.alist_hedge_min_delay / 1000)
+        if cls.__hedge_policy is None or cls.__hedge_policy.settings != settings:
+            cls.__hedge_policy = HedgePolicy(percentile=settings[0], min_delay=settings[1])
+
+    @classmethod
+    def invalidate_path(cls, emby_path):
+        """
+        删除文件路径对应的直链缓存与负缓存
+
+        Parameters:
+        - emby_path (str): 经过路径修复后的 Emby 文件路径
+
+        Returns:
+        - bool: 直链缓存存在并被删除时返回 True
+        """
+        cls.__negative_cache.delete(emby_path)
+        return cls.__raw_url_cache.delete(emby_path)
+
+    @classmethod
+    def use_shared_cache(cls, shared_table):
+        """
+        将直链缓存替换为 prefork worker 进程间共享的缓存，在 worker 进程启动时调用
+
+        Parameters:
+        - shared_table (SharedTable): 共享表
+        """
+        cls.__raw_url_cache = SharedTTLCache(shared_table, "alist_raw_url")
+        cls.apply_config(Config().snapshot)
+
+    @classmethod
+    def cache_stats(cls):
+        """
+        获取 Alist 直链缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数等信息
+        """
+        return cls.__raw_url_cache.stats()
+
+    @classmethod
+    def negative_cache_stats(cls):
+        """
+        获取 Alist 直链负缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数等信息
+        """
+        return cls.__negative_cache.stats()
+
+    @classmethod
+    def pool_stats(cls):
+        """
+        获取 同步与异步请求连接池 的使用情况
+
+        Returns:
+        - dict: 同步（sync）与异步（async）连接池的统计信息
+        """
+        return {
+            "sync": cls.__request.pool_stats(),
+            "async": cls.__async_request.pool_stats()
+        }
+
+    @classmethod
+    async def aclose(cls):
+        """
+        关闭异步请求的连接池
+        """
+        await cls.__async_request.aclose()
 
     def to_json(self):
         return {
@@ -125,6 +637,14 @@ class AlistApi:
         }
 
 
+AlistApi.apply_config(Config().snapshot)
+Config().add_reload_listener(AlistApi.apply_config)
+metrics.add_pool_source("alist", AlistApi.pool_stats)
+metrics.add_cache_source("alist_raw_url", AlistApi.cache_stats)
+metrics.add_cache_source("alist_raw_url_negative", AlistApi.negative_cache_stats)
+metrics.add_hedge_source("alist_fs_get", AlistApi.hedge_stats)
+
+
 # noinspection SpellCheckingInspection
 if __name__ == "__main__":
     alist_api = AlistApi("http://127.0.0.1:5400", "alist-api-key")
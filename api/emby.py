@@ -3,10 +3,15 @@
 # -*- coding: utf-8 -*-
 
 
-import requests
+import time
 
-from utils import BuiltinUtils, RequestUtils, StringUtils
-from utils.types import HttpMethod
+from config.config import Config
+from metrics.metrics import metrics
+from utils import BuiltinUtils, RequestUtils, StringUtils, TTLCache, NegativeCache
+from utils.async_http_utils import AsyncRequestUtils
+from utils.persistent_store import PersistentStore
+from utils.shared_cache import SharedTTLCache
+from utils.types import HttpMethod, LookupFailure
 
 
 # noinspection SpellCheckingInspection
@@ -14,7 +19,11 @@ class EmbyApi:
     __paths = {
         "playback_info": "Items/%s/PlaybackInfo",
     }
-    __request = RequestUtils(session=requests.Session())
+    __upstream_config = None
+    __request = None
+    __async_request = None
+    __path_cache = TTLCache()
+    __negative_cache = NegativeCache()
 
     __emby_url = None
     __emby_api_key = None
@@ -31,34 +40,78 @@ class EmbyApi:
         EmbyApi.__emby_api_key = self.__emby_api_key
 
     @classmethod
-    def __invoke(cls, method, path, headers=None, **kwargs):
+    def __invoke(cls, method, path, headers=None, endpoint="", **kwargs):
         """
         执行Emby API 请求
 
         Parameters:
         - path (str): Emby API 请求路径
+        - headers (Mapping): 本次请求携带的请求头，不会修改共享的请求头
+        - endpoint (str): 接口名称，用于指标标签
         - **kwargs: 请求参数
 
         Returns:
-        - dict or None: API 响应的 JSON 数据或 None（请求失败时）
+        - requests.Response or httpx.Response or None: 响应对象或 None（地址非法或请求失败时）
+        """
+        req_url = cls.__emby_url + path
+        if not StringUtils.is_valid_url(req_url):
+            return None
+        params = {}
+        if kwargs:
+            params.update(kwargs)
+        started = time.perf_counter()
+        if method == HttpMethod.GET:
+            response = cls.__request.get_res(url=req_url, params=params, headers=headers)
+        else:
+            response = cls.__request.post_res(url=req_url, params=params, headers=headers)
+        metrics.observe_upstream("emby", endpoint, getattr(response, "status_code", None),
+                                 time.perf_counter() - started)
+        return response
+
+    @classmethod
+    async def __invoke_async(cls, method, path, endpoint="", **kwargs):
+        """
+        异步执行Emby API 请求
+
+        Parameters:
+        - path (str): Emby API 请求路径
+        - endpoint (str): 接口名称，用于指标标签
+        - **kwargs: 请求参数
+
+        Returns:
+        - requests.Response or httpx.Response or None: 响应对象或 None（地址非法或请求失败时）
         """
         req_url = cls.__emby_url + path
         if not StringUtils.is_valid_url(req_url):
             return None
-        if headers:
-            cls.__request.update_headers(headers)
         params = {}
         if kwargs:
             params.update(kwargs)
+        started = time.perf_counter()
         if method == HttpMethod.GET:
-            response = cls.__request.get_res(url=req_url, params=params)
+            response = await cls.__async_request.get_res(url=req_url, params=params)
         else:
-            response = cls.__request.post_res(url=req_url, params=params)
-        if not response:
+            response = await cls.__async_request.post_res(url=req_url, params=params)
+        metrics.observe_upstream("emby", endpoint, getattr(response, "status_code", None),
+                                 time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def __parse_response(response):
+        """
+        解析 Emby API 响应
+
+        Parameters:
+        - response (Response): 响应对象
+
+        Returns:
+        - dict or None: API 响应的 JSON 数据或 None（请求失败时）
+        """
+        if response is None:
             return None
         return (
             response.json()
-            if response and response.status_code == 200 and RequestUtils.check_response_is_valid_json(response)
+            if response.status_code == 200 and RequestUtils.check_response_is_valid_json(response)
             else None
         )
 
@@ -80,27 +133,341 @@ class EmbyApi:
         if not media_source_id or not isinstance(media_source_id, str):
             return ""
 
+        cache_key = (item_id, media_source_id)
+        cached_path = self.__path_cache.get(cache_key)
+        if cached_path is not None:
+            return cached_path
+        if self.__negative_cache.get(cache_key) is not None:
+            return ""
+        return self.refresh_file_path(item_id, media_source_id, api_key)
+
+    def refresh_file_path(self, item_id, media_source_id, api_key=None):
+        """
+        不经过文件路径缓存，直接请求 PlaybackInfo 获取文件路径，结果写入缓存
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str, optional): Emby API 密钥。如果未提供，则使用默认密钥
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
         api_key = api_key if api_key and isinstance(api_key, str) else self.__emby_api_key
-        play_back_info = self.__invoke(
+        response = self.__invoke(
             HttpMethod.GET,
             self.__paths["playback_info"] % item_id,
-            item_id,
+            endpoint="playback_info",
             MediaSourceId=media_source_id,
             api_key=api_key
         )
+        return self.__resolve_path((item_id, media_source_id), response)
 
-        if not isinstance(play_back_info, dict):
+    async def fetch_file_path_async(self, item_id, media_source_id, api_key):
+        """
+        fetch_file_path 的异步版本，与同步版本共享路径缓存
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str, optional): Emby API 密钥。如果未提供，则使用默认密钥
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
+        if not item_id or not isinstance(item_id, str):
             return ""
 
+        if not media_source_id or not isinstance(media_source_id, str):
+            return ""
+
+        cache_key = (item_id, media_source_id)
+        cached_path = self.__path_cache.get(cache_key)
+        if cached_path is not None:
+            return cached_path
+        if self.__negative_cache.get(cache_key) is not None:
+            return ""
+        return await self.refresh_file_path_async(item_id, media_source_id, api_key)
+
+    async def refresh_file_path_async(self, item_id, media_source_id, api_key=None):
+        """
+        refresh_file_path 的异步版本
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str, optional): Emby API 密钥。如果未提供，则使用默认密钥
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
+        api_key = api_key if api_key and isinstance(api_key, str) else self.__emby_api_key
+        response = await self.__invoke_async(
+            HttpMethod.GET,
+            self.__paths["playback_info"] % item_id,
+            endpoint="playback_info",
+            MediaSourceId=media_source_id,
+            api_key=api_key
+        )
+        return self.__resolve_path((item_id, media_source_id), response)
+
+    @classmethod
+    def __resolve_path(cls, cache_key, response):
+        """
+        从 PlaybackInfo 响应中解析文件路径，没有找到时写入负缓存
+
+        Parameters:
+        - cache_key (tuple): (媒体文件的 ID, 媒体源的 ID)
+        - response (Response): PlaybackInfo 响应
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
+        emby_path = cls.__parse_playback_info(cache_key[0], cache_key[1], cls.__parse_response(response))
+        if emby_path:
+            return emby_path
+
+        status_code = getattr(response, "status_code", None)
+        # 401 / 403 只说明本次请求的 api_key 无效，不能让其他客户端也拿到失败结果
+        if status_code in (401, 403):
+            return ""
+        if status_code is None or status_code >= 500:
+            cls.__negative_cache.set(cache_key, LookupFailure.UPSTREAM_ERROR)
+        else:
+            cls.__negative_cache.set(cache_key, LookupFailure.NOT_FOUND)
+        return ""
+
+    @classmethod
+    def __parse_playback_info(cls, item_id, media_source_id, play_back_info):
+        """
+        从 PlaybackInfo 响应中解析出指定媒体源的文件路径，并缓存全部媒体源的路径
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+        - play_back_info (dict): PlaybackInfo 响应
+
+        Returns:
+        - str: 如果成功找到文件路径，则返回文件路径；否则返回 空字符串
+        """
+        return cls.__cache_media_sources(item_id, play_back_info).get(media_source_id) or ""
+
+    @classmethod
+    def __cache_media_sources(cls, item_id, play_back_info):
+        """
+        缓存 PlaybackInfo 响应中全部媒体源的文件路径
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - play_back_info (dict): PlaybackInfo 响应
+
+        Returns:
+        - dict: 媒体源 ID 到文件路径的映射，同一媒体源出现多次时以第一次为准
+        """
+        if not isinstance(play_back_info, dict):
+            return {}
+
         media_sources = play_back_info.get("MediaSources", [])
         if not media_sources or not BuiltinUtils.is_dict_array(media_sources):
-            return ""
+            return {}
 
+        # 一次 PlaybackInfo 响应会返回该媒体的全部媒体源，统一写入缓存
+        source_paths = {}
         for media_source in media_sources:
-            if "Id" in media_source and media_source.get("Id", "") == media_source_id:
-                return media_source.get("Path", "")
+            source_id = media_source.get("Id", "")
+            source_path = media_source.get("Path", "")
+            if not source_id or not isinstance(source_id, str):
+                continue
+            if source_path and isinstance(source_path, str):
+                cls.__path_cache.set((item_id, source_id), source_path)
+            source_paths.setdefault(source_id, source_path)
+        return source_paths
 
-        return ""
+    def refresh_item(self, item_id, api_key=None):
+        """
+        重新获取媒体的全部媒体源并写入缓存，用于预解析新入库或更新的媒体
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - api_key (str, optional): Emby API 密钥。如果未提供，则使用默认密钥
+
+        Returns:
+        - dict: 媒体源 ID 到文件路径的映射，请求失败时返回 空字典
+        """
+        if not item_id or not isinstance(item_id, str):
+            return {}
+
+        api_key = api_key if api_key and isinstance(api_key, str) else self.__emby_api_key
+        response = self.__invoke(
+            HttpMethod.GET,
+            self.__paths["playback_info"] % item_id,
+            endpoint="playback_info",
+            api_key=api_key
+        )
+        return self.__cache_media_sources(item_id, self.__parse_response(response))
+
+    @classmethod
+    def get_cached_path(cls, item_id, media_source_id):
+        """
+        读取文件路径缓存及其剩余有效期
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+
+        Returns:
+        - tuple: (文件路径, 剩余有效期（秒）)，未缓存时返回 (None, 0)
+        """
+        return cls.__path_cache.get_with_ttl((item_id, media_source_id))
+
+    @classmethod
+    def is_cached(cls, item_id, media_source_id):
+        """
+        判断获取文件路径是否无需请求 Emby（文件路径缓存或负缓存中存在该媒体源），不计入命中统计
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+
+        Returns:
+        - bool: 无需请求 Emby 时返回 True
+        """
+        cache_key = (item_id, media_source_id)
+        return cache_key in cls.__path_cache or cache_key in cls.__negative_cache
+
+    @classmethod
+    def get_cached_failure(cls, item_id, media_source_id):
+        """
+        读取负缓存
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_id (str): 媒体源的 ID
+
+        Returns:
+        - LookupFailure: 最近一次获取文件路径失败的原因，未缓存时返回 None
+        """
+        return cls.__negative_cache.get((item_id, media_source_id))
+
+    @classmethod
+    def invalidate_item(cls, item_id, media_source_ids=()):
+        """
+        删除媒体全部媒体源的文件路径缓存与负缓存
+
+        Parameters:
+        - item_id (str): 媒体文件的 ID
+        - media_source_ids (Iterable[str]): 额外需要删除的媒体源 ID，例如 Webhook 中携带的媒体源
+
+        Returns:
+        - list: 被删除的、仍未过期的文件路径
+        """
+        keys = {key for key in cls.__path_cache.keys() if key[0] == item_id}
+        keys.update((item_id, media_source_id) for media_source_id in media_source_ids if media_source_id)
+        removed_paths = []
+        for key in keys:
+            emby_path = cls.__path_cache.pop(key)
+            if emby_path:
+                removed_paths.append(emby_path)
+        for key in cls.__negative_cache.keys():
+            if key[0] == item_id:
+                cls.__negative_cache.delete(key)
+        return removed_paths
+
+    @classmethod
+    def pool_stats(cls):
+        """
+        获取 同步与异步请求连接池 的使用情况
+
+        Returns:
+        - dict: 同步（sync）与异步（async）连接池的统计信息
+        """
+        return {
+            "sync": cls.__request.pool_stats(),
+            "async": cls.__async_request.pool_stats()
+        }
+
+    @classmethod
+    async def aclose(cls):
+        """
+        关闭异步请求的连接池
+        """
+        await cls.__async_request.aclose()
+
+    @classmethod
+    def apply_config(cls, snapshot):
+        """
+        应用配置快照：调整Emby 文件路径缓存的容量、过期时间与持久化存储，连接池或超时配置变化时重建请求工具
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        cls.__path_cache.configure(max_size=snapshot.emby_path_cache_max_size, ttl=snapshot.emby_path_cache_ttl)
+        cls.__negative_cache.configure(snapshot.negative_cache_max_size, snapshot.negative_cache_not_found_ttl,
+                                       snapshot.negative_cache_error_ttl)
+        store = None
+        if snapshot.persistent_cache_enabled and cls.__path_cache.enabled:
+            store = PersistentStore.open(Config().persistent_cache_path, snapshot.persistent_cache_flush_interval)
+        cls.__path_cache.attach_store(store, "emby_path", key_encoder=cls.__encode_cache_key,
+                                      key_decoder=cls.__decode_cache_key)
+        upstream_config = dict(snapshot.upstreams["emby"])
+        if upstream_config == cls.__upstream_config:
+            return
+        # 旧的请求工具仍可能被进行中的请求使用，只替换引用，不主动关闭
+        cls.__request = RequestUtils(
+            session=RequestUtils.create_session(
+                pool_connections=upstream_config["pool_connections"],
+                pool_maxsize=upstream_config["pool_maxsize"],
+                max_retries=upstream_config["max_retries"]
+            ),
+            timeout=(upstream_config["connect_timeout"], upstream_config["read_timeout"]),
+            pool_maxsize=upstream_config["pool_maxsize"]
+        )
+        cls.__async_request = AsyncRequestUtils(
+            timeout=(upstream_config["connect_timeout"], upstream_config["read_timeout"]),
+            max_connections=upstream_config["pool_maxsize"],
+            max_keepalive_connections=upstream_config["pool_maxsize"]
+        )
+        cls.__upstream_config = upstream_config
+
+    @staticmethod
+    def __encode_cache_key(key):
+        return "\x1f".join(key)
+
+    @staticmethod
+    def __decode_cache_key(key):
+        return tuple(key.split("\x1f", 1))
+
+    @classmethod
+    def use_shared_cache(cls, shared_table):
+        """
+        将文件路径缓存替换为 prefork worker 进程间共享的缓存，在 worker 进程启动时调用
+
+        Parameters:
+        - shared_table (SharedTable): 共享表
+        """
+        cls.__path_cache = SharedTTLCache(shared_table, "emby_path", key_encoder=cls.__encode_cache_key,
+                                          key_decoder=cls.__decode_cache_key)
+        cls.apply_config(Config().snapshot)
+
+    @classmethod
+    def cache_stats(cls):
+        """
+        获取 Emby 文件路径缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数等信息
+        """
+        return cls.__path_cache.stats()
+
+    @classmethod
+    def negative_cache_stats(cls):
+        """
+        获取 Emby 文件路径负缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数等信息
+        """
+        return cls.__negative_cache.stats()
 
     def to_json(self):
         return {
@@ -109,6 +476,13 @@ class EmbyApi:
         }
 
 
+EmbyApi.apply_config(Config().snapshot)
+Config().add_reload_listener(EmbyApi.apply_config)
+metrics.add_pool_source("emby", EmbyApi.pool_stats)
+metrics.add_cache_source("emby_path", EmbyApi.cache_stats)
+metrics.add_cache_source("emby_path_negative", EmbyApi.negative_cache_stats)
+
+
 # noinspection SpellCheckingInspection
 if __name__ == "__main__":
     emby_api = EmbyApi("http://localhost:8000", "api_key")
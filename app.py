@@ -3,10 +3,12 @@
 # -*- coding: utf-8 -*-
 
 
-from flask import Flask, request
+from flask import Flask, Response, request, jsonify
 
 from config.config import Config
+from metrics.metrics import metrics
 from stream.stream import Stream
+from stream.webhook import handle_webhook
 
 app = Flask(__name__)
 
@@ -18,13 +20,16 @@ def get_stream():
     Returns:
     - Stream: Stream 实例
     """
+    snapshot = Config().snapshot
     return Stream(
-        emby_url=Config().emby_url,
-        emby_api_key=Config().emby_api_key,
-        backend_url=Config().backend_url,
-        backend_token=Config().backend_token,
-        alist_url=Config().alist_url,
-        alist_api_key=Config().alist_api_key
+        emby_url=snapshot.emby_url,
+        emby_api_key=snapshot.emby_api_key,
+        backend_url=snapshot.backend_url,
+        backend_token=snapshot.backend_token,
+        alist_url=snapshot.alist_url,
+        alist_api_key=snapshot.alist_api_key,
+        alist_backends=snapshot.alist_backends,
+        stream_backends=snapshot.stream_backends
     )
 
 
@@ -45,10 +50,29 @@ def redirect_common(request_obj, item_id):
         url=request_obj.url,
         item_id=item_id,
         media_source_id=media_source_id,
-        api_key=api_key
+        api_key=api_key,
+        route=request_obj.endpoint or ""
     )
 
 
+@app.route("/metrics", methods=["GET"])
+def export_metrics():
+    """
+    以 Prometheus 文本格式导出指标
+    """
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/webhook/emby", methods=["POST"])
+def emby_webhook():
+    """
+    接收 Emby Webhook 通知，媒体入库、更新或删除时刷新对应的路径与直链缓存
+    """
+    token = request.args.get("token") or request.headers.get("X-Webhook-Token", "")
+    status, body = handle_webhook(get_stream(), token, request.content_type, request.get_data())
+    return jsonify(body), status
+
+
 @app.route("/videos/<item_id>/original.<media_type>", methods=["GET"])
 def redirect_yamby_original(item_id, media_type):
     """
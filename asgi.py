@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import re
+import json
+from urllib.parse import parse_qsl
+
+from werkzeug.urls import iri_to_uri
+
+from app import get_stream
+from config.config import Config
+from metrics.metrics import metrics
+from stream.webhook import handle_webhook
+from utils.rate_limiter import get_client_ip
+
+# 与 app.py 中的六个推流路由一一对应，名称与 Flask 的 endpoint 一致
+ROUTES = (
+    ("redirect_yamby_original", re.compile(r"^/videos/(?P<item_id>[^/]+)/original\.(?P<media_type>[^/]+)$")),
+    ("redirect_emby_original", re.compile(r"^/emby/videos/(?P<item_id>[^/]+)/original\.(?P<media_type>[^/]+)$")),
+    ("redirect_old_emb_stream", re.compile(r"^/emby/videos/(?P<item_id>[^/]+)/stream\.(?P<media_type>[^/]+)$")),
+    ("redirect_old_emby_original", re.compile(r"^/Videos/(?P<item_id>[^/]+)/original$")),
+    ("redirect_infuse_stream", re.compile(r"^/Videos/(?P<item_id>[^/]+)/stream$")),
+    ("redirect_conflux_stream", re.compile(r"^/emby/Videos/(?P<item_id>[^/]+)/stream\.(?P<media_type>[^/]+)$")),
+)
+
+
+def get_request_url(scope, headers):
+    """
+    根据 ASGI scope 还原完整的请求 URL
+
+    Parameters:
+    - scope (dict): ASGI scope
+    - headers (dict): 请求头
+
+    Returns:
+    - str: 完整的请求 URL
+    """
+    host = headers.get("Host", "")
+    if not host and scope.get("server"):
+        server_host, server_port = scope["server"]
+        host = f"{server_host}:{server_port}"
+    url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{scope['path']}"
+    query_string = scope.get("query_string", b"").decode("latin-1")
+    return f"{url}?{query_string}" if query_string else url
+
+
+async def redirect_common(scope, item_id, route=""):
+    """
+    处理通用的重定向请求
+
+    Parameters:
+    - scope (dict): ASGI scope
+    - item_id (str): 媒体文件的唯一标识符
+    - route (str): 路由名称，用于指标标签
+
+    Returns:
+    - tuple: (推流 URL，客户端被限流时为 None, 缓存相关的响应头)
+    """
+    headers = {
+        "-".join(part.capitalize() for part in key.decode("latin-1").split("-")): value.decode("latin-1")
+        for key, value in scope.get("headers", [])
+    }
+    args = {}
+    for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1")):
+        args.setdefault(key, value)
+
+    media_source_id = args.get("MediaSourceId", "")
+    api_key = args.get("api_key", "") if args.get("api_key", "") else Config().emby_api_key
+    return await get_stream().resolve_stream_url_async(
+        url=get_request_url(scope, headers),
+        item_id=item_id,
+        media_source_id=media_source_id,
+        api_key=api_key,
+        user_agent=headers.get("User-Agent", ""),
+        headers=headers,
+        route=route,
+        client_ip=get_client_ip(headers.get("X-Real-Ip"), headers.get("X-Forwarded-For"),
+                                (scope.get("client") or ("",))[0], Config().snapshot.trusted_proxies)
+    )
+
+
+async def read_body(receive):
+    """
+    读取完整的请求体
+
+    Parameters:
+    - receive (Callable): ASGI receive
+
+    Returns:
+    - bytes: 请求体
+    """
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def emby_webhook(scope, receive, send):
+    """
+    接收 Emby Webhook 通知，与 app.py 中的 /webhook/emby 路由相同
+
+    Parameters:
+    - scope (dict): ASGI scope
+    - receive (Callable): ASGI receive
+    - send (Callable): ASGI send
+    """
+    if scope["method"] != "POST":
+        await send_response(send, 405, [(b"allow", b"POST")])
+        return
+    headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+    args = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+    token = args.get("token") or headers.get("x-webhook-token", "")
+    body = await read_body(receive)
+    # 预解析在后台线程池中执行，这里只删除缓存，不会阻塞事件循环
+    status, response = handle_webhook(get_stream(), token, headers.get("content-type", ""), body)
+    await send_response(send, status, [(b"content-type", b"application/json")],
+                        json.dumps(response, ensure_ascii=False).encode("utf-8"))
+
+
+async def send_response(send, status, headers=None, body=b""):
+    """
+    发送 HTTP 响应
+
+    Parameters:
+    - send (Callable): ASGI send
+    - status (int): HTTP 状态码
+    - headers (list): 响应头
+    - body (bytes): 响应体
+    """
+    response_headers = [
+        (b"content-length", str(len(body)).encode("latin-1")),
+        (b"access-control-allow-origin", b"*"),
+    ]
+    response_headers.extend(headers or [])
+    await send({"type": "http.response.start", "status": status, "headers": response_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def lifespan(receive, send):
+    """
+    处理 ASGI lifespan 事件，启动时开启配置热重载，关闭时释放上游连接池
+
+    Parameters:
+    - receive (Callable): ASGI receive
+    - send (Callable): ASGI send
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            Config().install_reload_signal()
+            Config().start_auto_reload()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await get_stream().aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    ASGI 入口，提供与 app.py 相同的推流重定向路由
+
+    Parameters:
+    - scope (dict): ASGI scope
+    - receive (Callable): ASGI receive
+    - send (Callable): ASGI send
+    """
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    if scope["path"] == "/metrics":
+        await send_response(send, 200, [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8")],
+                            metrics.render().encode("utf-8"))
+        return
+
+    if scope["path"] == "/webhook/emby":
+        await emby_webhook(scope, receive, send)
+        return
+
+    for route, pattern in ROUTES:
+        match = pattern.match(scope["path"])
+        if not match:
+            continue
+        if scope["method"] not in ("GET", "HEAD"):
+            await send_response(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        stream_url, cache_headers = await redirect_common(scope, match.group("item_id"), route)
+        if stream_url is None:
+            await send_response(send, 429, [(b"retry-after", str(get_stream().retry_after).encode("latin-1"))],
+                                b"Too Many Requests")
+            return
+        await send_response(send, 302, [(b"location", iri_to_uri(stream_url).encode("latin-1"))] + [
+            (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in cache_headers
+        ])
+        return
+
+    await send_response(send, 404)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("asgi:app", port=60001, host="0.0.0.0", loop="auto", http="auto")
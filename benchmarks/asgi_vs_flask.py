@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+对比 Flask（threaded）与 ASGI 两种服务模式在上游存在延迟时的吞吐、延迟与线程数
+
+用法:
+    python -m benchmarks.asgi_vs_flask --requests 2000 --concurrency 200 --latency 0.05
+"""
+
+
+import sys
+import time
+import json
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+import httpx
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+
+def configure_app(upstream_url, log_path, enable_cache=False):
+    """
+    将应用配置指向桩服务器并关闭限流，默认关闭缓存，使每个请求都真正访问上游
+
+    Parameters:
+    - upstream_url (str): 桩服务器地址
+    - log_path (str): 日志目录
+    - enable_cache (bool): 是否保留 config.yaml 中的缓存配置
+    """
+    sys.path.insert(0, str(ROOT_PATH))
+    from config.config import Config
+
+    config = Config()
+    config.log_path = log_path
+    raw_config = dict(config.get_config())
+    raw_config["app"] = dict(config.get_config("app"))
+    raw_config["app"].update({
+        "emby_url": upstream_url,
+        "emby_api_key": "benchmark",
+        "alist_url": upstream_url,
+        "alist_api_key": "benchmark",
+        # 压测客户端都来自本机，关闭限流
+        "rate_limit_per_minute": 0,
+    })
+    if not enable_cache:
+        raw_config["app"].update({"emby_path_cache_ttl": 0, "alist_raw_url_cache_ttl": 0,
+                                  "negative_cache_not_found_ttl": 0, "negative_cache_error_ttl": 0})
+    config.reload(raw_config)
+
+
+def serve(mode, port, upstream_url, log_path, enable_cache=False):
+    """
+    以指定模式启动被测服务
+
+    Parameters:
+    - mode (str): flask 或 asgi
+    - port (int): 监听端口
+    - upstream_url (str): 桩服务器地址
+    - log_path (str): 日志目录
+    - enable_cache (bool): 是否启用缓存
+    """
+    configure_app(upstream_url, log_path, enable_cache)
+    if mode == "flask":
+        from werkzeug.serving import make_server
+        from main import create_app
+
+        make_server("127.0.0.1", port, create_app(), threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from asgi import app
+
+        uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"端口 {port} 启动超时")
+
+
+def read_thread_count(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+async def run_load(base_url, total, concurrency, pid):
+    """
+    并发请求推流路由，每个请求使用不同的 item_id 以避开缓存
+
+    Returns:
+    - dict: 压测结果
+    """
+    latencies = []
+    errors = 0
+    peak_threads = 0
+    queue = asyncio.Queue()
+    for index in range(total):
+        queue.put_nowait(index)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                index = queue.get_nowait()
+                url = f"{base_url}/emby/videos/{index}/original.mkv?MediaSourceId=mediasource_{index}"
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url, headers={"User-Agent": "Yamby/1.0"})
+                    if response.status_code != 302:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while True:
+                peak_threads = max(peak_threads, read_thread_count(pid))
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_threads())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_threads": peak_threads,
+    }
+
+
+def benchmark(args):
+    stub_port = get_free_port()
+    stub = subprocess.Popen(
+        [sys.executable, str(ROOT_PATH / "benchmarks" / "stub_servers.py"),
+         "--port", str(stub_port), "--latency", str(args.latency)]
+    )
+    results = {}
+    try:
+        wait_for_port(stub_port)
+        with tempfile.TemporaryDirectory() as log_path:
+            for mode in args.modes:
+                port = get_free_port()
+                server = subprocess.Popen(
+                    [sys.executable, "-m", "benchmarks.asgi_vs_flask", "--serve", mode, "--port", str(port),
+                     "--upstream", f"http://127.0.0.1:{stub_port}", "--log-path", log_path],
+                    cwd=str(ROOT_PATH), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                try:
+                    wait_for_port(port)
+                    results[mode] = asyncio.run(
+                        run_load(f"http://127.0.0.1:{port}", args.requests, args.concurrency, server.pid)
+                    )
+                finally:
+                    server.terminate()
+                    server.wait()
+    finally:
+        stub.terminate()
+        stub.wait()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flask 与 ASGI 服务模式对比压测")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="桩服务器每次上游调用的延迟（秒）")
+    parser.add_argument("--modes", nargs="+", default=["flask", "asgi"], choices=["flask", "asgi"])
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--serve", choices=["flask", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--upstream", help=argparse.SUPPRESS)
+    parser.add_argument("--log-path", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.serve:
+        serve(arguments.serve, arguments.port, arguments.upstream, arguments.log_path)
+        sys.exit(0)
+
+    benchmark_results = benchmark(arguments)
+    if arguments.json:
+        print(json.dumps(benchmark_results, indent=2))
+    else:
+        print(f"{'mode':<8}{'rps':>10}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}{'errors':>8}{'threads':>9}")
+        for benchmark_mode, result in benchmark_results.items():
+            print(f"{benchmark_mode:<8}{result['rps']:>10}{result['p50_ms']:>12}{result['p95_ms']:>12}"
+                  f"{result['p99_ms']:>12}{result['errors']:>8}{result['peak_threads']:>9}")
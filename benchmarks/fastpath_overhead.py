@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+测量推流路由的框架开销：在进程内直接调用 WSGI 应用，对比 Flask 与 WSGI 快速通道处理一次命中缓存的推流请求的耗时，
+并减去直接调用 Stream.resolve_stream_url 的耗时，得到每个请求的框架开销
+
+不经过网络与 HTTP 服务器，结果只反映请求上下文、路由匹配、参数解析与响应构造的差异
+
+用法:
+    python -m benchmarks.fastpath_overhead --repeat 7
+    python -m benchmarks.fastpath_overhead --route /emby/videos/1/original.mkv --json
+"""
+
+
+import io
+import sys
+import json
+import argparse
+import tempfile
+
+from benchmarks.asgi_vs_flask import ROOT_PATH, configure_app
+from benchmarks.micro_benchmark import measure
+from benchmarks.report import build_report, save_report
+
+
+def build_cases(path, query_string):
+    """
+    构造三个被测用例，调用前先请求一次，使解析结果进入缓存
+
+    Parameters:
+    - path (str): 推流路由路径
+    - query_string (str): 查询字符串
+
+    Returns:
+    - dict: 用例名称到无参函数的映射
+    """
+    from werkzeug.test import EnvironBuilder
+
+    from app import get_stream
+    from main import create_app
+    from fastpath import FastPathDispatcher
+
+    app = create_app()
+    fast_path = FastPathDispatcher(app.wsgi_app)
+    environ = EnvironBuilder(path=path, query_string=query_string, headers={
+        "User-Agent": "Infuse-Direct/7.7.4", "X-Real-IP": "10.0.0.1"
+    }).get_environ()
+    stream = get_stream()
+    item_id = path.split("/")[-2]
+    url = f"http://localhost{path}?{query_string}"
+
+    def start_response(status, headers, exc_info=None):
+        return None
+
+    def call(wsgi_app):
+        response = wsgi_app(dict(environ), start_response)
+        for _ in response:
+            pass
+        if hasattr(response, "close"):
+            response.close()
+
+    def resolve_only():
+        stream.resolve_stream_url(url=url, item_id=item_id, media_source_id=f"mediasource_{item_id}",
+                                  api_key="benchmark", user_agent="Infuse-Direct/7.7.4", client_ip="10.0.0.1")
+
+    cases = {
+        "resolve_only": resolve_only,
+        "flask": lambda: call(app),
+        "fast_path": lambda: call(fast_path),
+    }
+    for case in cases.values():
+        case()
+    return cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="推流路由的框架开销：Flask 与 WSGI 快速通道")
+    parser.add_argument("--route", default="/Videos/1/stream", help="被测的推流路由路径")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复测量的轮数")
+    parser.add_argument("--output", help="将结果保存为 JSON 文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    arguments = parser.parse_args()
+
+    from benchmarks.stub_servers import start_stub_server
+
+    stub = start_stub_server(latency=0)
+    configure_app(f"http://127.0.0.1:{stub.server_address[1]}", tempfile.mkdtemp(), enable_cache=True)
+    sys.path.insert(0, str(ROOT_PATH))
+    from config.config import Config
+
+    raw_config = dict(Config().get_config())
+    raw_config["app"] = dict(Config().get_config("app"), log_level="INFO", log_caller_mode="fast")
+    Config().reload(raw_config)
+
+    # 终端输出写入内存，避免测量结果受终端速度影响
+    stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+        item = arguments.route.split("/")[-2]
+        results = {}
+        for name, case in build_cases(arguments.route, f"MediaSourceId=mediasource_{item}").items():
+            results[name] = measure(case, arguments.repeat)
+            sys.stderr.seek(0)
+            sys.stderr.truncate()
+        from log.log import logger
+        logger.shutdown()
+    finally:
+        sys.stderr = stderr
+        stub.shutdown()
+
+    baseline = results["resolve_only"]["median_ns"]
+    for result in results.values():
+        result["overhead_ns"] = round(result["median_ns"] - baseline, 1)
+
+    report = build_report("fastpath", {"route": arguments.route, "repeat": arguments.repeat}, results)
+    if arguments.output:
+        save_report(arguments.output, report)
+    if arguments.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'case':<16}{'min(ns)':>12}{'median(ns)':>14}{'overhead(ns)':>15}")
+        for case_name, result in results.items():
+            print(f"{case_name:<16}{result['min_ns']:>12}{result['median_ns']:>14}{result['overhead_ns']:>15}")
+        saved = results["flask"]["overhead_ns"] - results["fast_path"]["overhead_ns"]
+        print(f"\n快速通道每个请求减少 {saved / 1000:.1f} µs 框架开销")
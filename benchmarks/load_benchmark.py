@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+端到端压测：启动模拟 Emby / Alist 的桩服务器，以真实的客户端组合并发请求推流路由，
+按场景输出 RPS、p50/p95/p99 延迟与上游调用次数
+
+用法:
+    python -m benchmarks.load_benchmark --requests 2000 --concurrency 64
+    python -m benchmarks.load_benchmark --scenarios warm flaky --output baseline.json
+    python -m benchmarks.load_benchmark --output current.json --compare baseline.json
+"""
+
+
+import sys
+import time
+import json
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from itertools import accumulate
+
+import httpx
+
+from benchmarks.asgi_vs_flask import ROOT_PATH, get_free_port, wait_for_port, percentile, serve
+from benchmarks.report import build_report, save_report, load_report, compare_reports, print_comparison
+
+# (名称, 权重, 路由模板, UA)，路由与 app.py 中的推流路由对应
+CLIENTS = (
+    ("infuse", 40, "/Videos/{item_id}/stream?MediaSourceId=mediasource_{item_id}&api_key=benchmark",
+     "Infuse-Direct/7.7.4 (iPhone; iOS 17.5.1)"),
+    ("yamby", 25, "/videos/{item_id}/original.mkv?MediaSourceId=mediasource_{item_id}&api_key=benchmark",
+     "Yamby/1.0.3 (iPhone; iOS 17.5.1; Scale/3.00)"),
+    ("conflux", 15, "/emby/Videos/{item_id}/stream.mkv?MediaSourceId=mediasource_{item_id}&api_key=benchmark",
+     "Conflux/1.6.2 (com.tolvy.conflux; build:262; iOS 17.5.1) Alamofire/5.9.1"),
+    ("emby_web", 20, "/emby/videos/{item_id}/original.mp4?MediaSourceId=mediasource_{item_id}&api_key=benchmark",
+     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/126.0.0.0 Safari/537.36"),
+)
+
+# 每个场景的桩服务器行为与缓存设置；popularity 为 zipf 指数，0 表示均匀分布
+SCENARIOS = {
+    "cold": {"latency": 0.02, "jitter": 0.01, "error_rate": 0.0, "library_size": 100000, "popularity": 0.0,
+             "cache": False},
+    "warm": {"latency": 0.02, "jitter": 0.01, "error_rate": 0.0, "library_size": 500, "popularity": 1.1,
+             "cache": True},
+    "flaky": {"latency": 0.02, "jitter": 0.05, "error_rate": 0.05, "library_size": 500, "popularity": 1.1,
+              "cache": True},
+    "slow": {"latency": 0.2, "jitter": 0.1, "error_rate": 0.0, "library_size": 100000, "popularity": 0.0,
+             "cache": False},
+}
+
+
+def build_plan(scenario, total, seed):
+    """
+    按随机数种子生成请求序列，相同参数每次运行得到相同的序列
+
+    Parameters:
+    - scenario (dict): 场景配置
+    - total (int): 请求数
+    - seed (int): 随机数种子
+
+    Returns:
+    - list: [(客户端名称, 请求路径, UA), ...]
+    """
+    rng = random.Random(seed)
+    library_size = scenario["library_size"]
+    if scenario["popularity"] > 0:
+        cum_weights = list(accumulate(1 / rank ** scenario["popularity"] for rank in range(1, library_size + 1)))
+        item_ids = rng.choices(range(1, library_size + 1), cum_weights=cum_weights, k=total)
+    else:
+        item_ids = [rng.randint(1, library_size) for _ in range(total)]
+    clients = rng.choices(CLIENTS, weights=[client[1] for client in CLIENTS], k=total)
+    return [(name, template.format(item_id=item_id), user_agent)
+            for (name, _, template, user_agent), item_id in zip(clients, item_ids)]
+
+
+async def run_load(base_url, plan, concurrency):
+    """
+    并发执行请求序列
+
+    Returns:
+    - dict: 压测结果
+    """
+    latencies = []
+    client_latencies = {}
+    errors = 0
+    empty_locations = 0
+    queue = asyncio.Queue()
+    for request in plan:
+        queue.put_nowait(request)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors, empty_locations
+            while not queue.empty():
+                name, path, user_agent = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    response = await client.get(base_url + path, headers={"User-Agent": user_agent})
+                    if response.status_code != 302:
+                        errors += 1
+                    elif not response.headers.get("location"):
+                        empty_locations += 1
+                except httpx.HTTPError:
+                    errors += 1
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed)
+                client_latencies.setdefault(name, []).append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": len(plan),
+        "errors": errors,
+        "empty_locations": empty_locations,
+        "rps": round(len(plan) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+    for name, values in sorted(client_latencies.items()):
+        values.sort()
+        result[f"{name}_p95_ms"] = round(percentile(values, 95) * 1000, 2)
+    return result
+
+
+def run_scenario(name, scenario, args):
+    """
+    运行单个场景：启动桩服务器与被测服务，执行压测并读取上游调用次数
+
+    Returns:
+    - dict: 场景结果
+    """
+    stub_port = get_free_port()
+    stub = subprocess.Popen(
+        [sys.executable, str(ROOT_PATH / "benchmarks" / "stub_servers.py"), "--port", str(stub_port),
+         "--latency", str(scenario["latency"]), "--jitter", str(scenario["jitter"]),
+         "--error-rate", str(scenario["error_rate"]), "--library-size", str(scenario["library_size"]),
+         "--seed", str(args.seed)]
+    )
+    try:
+        wait_for_port(stub_port)
+        upstream_url = f"http://127.0.0.1:{stub_port}"
+        with tempfile.TemporaryDirectory() as log_path:
+            port = get_free_port()
+            command = [sys.executable, "-m", "benchmarks.load_benchmark", "--serve", args.mode, "--port", str(port),
+                       "--upstream", upstream_url, "--log-path", log_path]
+            if scenario["cache"]:
+                command.append("--cache")
+            server = subprocess.Popen(command, cwd=str(ROOT_PATH), stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(port)
+                plan = build_plan(scenario, args.requests, args.seed)
+                result = asyncio.run(run_load(f"http://127.0.0.1:{port}", plan, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+        upstream_calls = httpx.get(f"{upstream_url}/__stats").json()
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    for call, count in upstream_calls.items():
+        result[f"upstream_{call}"] = count
+    return result
+
+
+def print_results(results):
+    print(f"{'scenario':<10}{'rps':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'errors':>8}"
+          f"{'emby':>8}{'alist':>8}{'up_err':>8}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['rps']:>9}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+              f"{result['errors']:>8}{result['upstream_playback_info']:>8}{result['upstream_fs_get']:>8}"
+              f"{result['upstream_errors']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基于桩服务器的端到端压测")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mode", default="flask", choices=["flask", "asgi"], help="被测服务模式")
+    parser.add_argument("--seed", type=int, default=20241213, help="请求序列与桩服务器的随机数种子")
+    parser.add_argument("--output", help="将结果保存为 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--serve", choices=["flask", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--upstream", help=argparse.SUPPRESS)
+    parser.add_argument("--log-path", help=argparse.SUPPRESS)
+    parser.add_argument("--cache", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.serve:
+        serve(arguments.serve, arguments.port, arguments.upstream, arguments.log_path, arguments.cache)
+        sys.exit(0)
+
+    scenario_results = {name: run_scenario(name, SCENARIOS[name], arguments) for name in arguments.scenarios}
+    report = build_report(
+        "load",
+        {"requests": arguments.requests, "concurrency": arguments.concurrency, "mode": arguments.mode,
+         "seed": arguments.seed, "scenarios": {name: SCENARIOS[name] for name in arguments.scenarios}},
+        scenario_results
+    )
+    if arguments.output:
+        save_report(arguments.output, report)
+    if arguments.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_results(scenario_results)
+    if arguments.compare:
+        print()
+        print_comparison(compare_reports(load_report(arguments.compare), report, higher_is_better=("rps",)))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+测量 LoggerManager.logger 在不同调用者解析方式下的单次调用耗时
+
+用法:
+    python -m benchmarks.logging_benchmark --calls 2000 --depth 40
+"""
+
+
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+
+def call_at_depth(depth, func):
+    """
+    在指定的调用栈深度上执行函数，模拟 Flask / werkzeug 处理请求时较深的调用栈
+
+    Parameters:
+    - depth (int): 额外的调用栈深度
+    - func (Callable): 要执行的函数
+
+    Returns:
+    - 函数的返回值
+    """
+    if depth <= 0:
+        return func()
+    return call_at_depth(depth - 1, func)
+
+
+def measure(log_manager, caller_mode, calls, depth, level="DEBUG"):
+    """
+    测量单次日志调用在请求线程中的平均耗时
+
+    Returns:
+    - float: 单次调用耗时（微秒）
+    """
+    log_manager.set_caller_mode(caller_mode)
+    log_manager.set_level(level)
+
+    def run():
+        started = time.perf_counter()
+        for index in range(calls):
+            log_manager.info("[%s] -> 推流URL：%s", index, "https://example.com/d/电影/示例.mkv")
+        return time.perf_counter() - started
+
+    call_at_depth(depth, lambda: log_manager.info("warm up"))
+    return call_at_depth(depth, run) / calls * 1_000_000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="日志调用耗时微基准")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--depth", type=int, default=40, help="模拟的额外调用栈深度")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    arguments = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_PATH))
+    from config.config import Config
+
+    Config().log_path = tempfile.mkdtemp()
+    from log.log import logger
+
+    # 终端输出写入内存，避免测量结果受终端速度影响
+    stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+        logger.info("setup")
+        results = {mode: round(measure(logger, mode, arguments.calls, arguments.depth), 2)
+                   for mode in ("inspect", "fast", "off")}
+        results["disabled"] = round(measure(logger, "fast", arguments.calls, arguments.depth, level="WARNING"), 2)
+        logger.shutdown()
+    finally:
+        sys.stderr = stderr
+    if arguments.json:
+        print(json.dumps({"us_per_call": results}, indent=2))
+    else:
+        for mode, cost in results.items():
+            print(f"{mode:<8}{cost:>10} us/call")
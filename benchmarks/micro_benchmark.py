@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+每个推流请求都会执行的热点函数的微基准
+
+用法:
+    python -m benchmarks.micro_benchmark --output baseline.json
+    python -m benchmarks.micro_benchmark --output current.json --compare baseline.json
+    python -m benchmarks.micro_benchmark --filter ua --repeat 7
+"""
+
+
+import io
+import sys
+import json
+import timeit
+import argparse
+import tempfile
+import statistics
+
+from benchmarks.asgi_vs_flask import ROOT_PATH
+from benchmarks.report import build_report, save_report, load_report, compare_reports, print_comparison
+
+LONG_CJK_PATH = ("/mnt/媒体库/电视剧/国产剧/2023/漫长的季节 (2023)/Season 01/"
+                 "漫长的季节 - S01E01 - 第1集 - 王响和龚彪在桦林钢厂的旧址重逢.2160p.WEB-DL.H265.HDR.DDP5.1.mkv")
+
+DIR_URL = ("http://127.0.0.1:60001/emby/videos/12345/original.mkv?dir=" + LONG_CJK_PATH +
+           "&MediaSourceId=mediasource_12345&api_key=0123456789abcdef")
+
+USER_AGENTS = (
+    "Infuse-Direct/7.7.4 (iPhone; iOS 17.5.1)",
+    "Infuse-Library/7.7.4",
+    "Yamby/1.0.3 (iPhone; iOS 17.5.1; Scale/3.00)",
+    "Conflux/1.6.2 (com.tolvy.conflux; build:262; iOS 17.5.1) Alamofire/5.9.1",
+    "Emby Theater/3.0.20 Windows NT 10.0",
+    "EmbyTheater/3.0.20",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 "
+    "Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 "
+    "Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Opera/9.80 (Windows NT 6.1; U; en) Presto/2.10.289 Version/12.02",
+    "VLC/3.0.20 LibVLC/3.0.20",
+    "mpv 0.38.0",
+    "libmpv",
+    "PotPlayer/240618",
+    "SenPlayer/4.6.1 (iPhone; iOS 17.5.1)",
+    "Fileball/1.3.5 (iPad; iOS 17.5)",
+    "AppleCoreMedia/1.0.0.21F90 (Apple TV; U; CPU OS 17_5 like Mac OS X; zh_cn)",
+    "GStreamer souphttpsrc 1.22.0 libsoup/3.4.4",
+    "MXPlayer/1.80.4 (Linux; Android 14)",
+    "nPlayer/1.7.7.7",
+    "IINA/1.3.5",
+    "iPlayClient/1.2.0",
+    "Tsukimi/0.15.0",
+    "Terminus/1.4.2",
+    "XstarPlayer/1.0",
+    "Lavf/60.16.100",
+    "Dalvik/2.1.0 (Linux; U; Android 14; Pixel 8 Build/AP2A.240605.024)",
+    "curl/8.8.0",
+    "python-requests/2.31.0",
+    "okhttp/4.12.0",
+    "ExoPlayerLib/2.19.1",
+    "Kodi/21.0 (Windows NT 10.0.22631.0; Win64; x64) App_Bitness/64 Version/21.0-(21.0.0)-Git:20240406",
+)
+
+
+def build_playback_info(item_id, source_count=4):
+    """
+    构造带有多个媒体源的 PlaybackInfo 响应
+
+    Returns:
+    - bytes: JSON 响应体
+    """
+    media_sources = []
+    for index in range(source_count):
+        media_sources.append({
+            "Protocol": "File",
+            "Id": f"{index:032x}",
+            "Path": LONG_CJK_PATH.replace("2160p", f"{2160 >> index}p"),
+            "Type": "Default",
+            "Container": "mkv",
+            "Size": 48_318_382_080 >> index,
+            "Name": f"漫长的季节 - S01E01 - {2160 >> index}p",
+            "IsRemote": False,
+            "RunTimeTicks": 27_330_000_000,
+            "SupportsTranscoding": True,
+            "SupportsDirectStream": True,
+            "SupportsDirectPlay": True,
+            "MediaStreams": [
+                {"Codec": "hevc", "Type": "Video", "Index": 0, "Width": 3840 >> index, "Height": 2160 >> index,
+                 "DisplayTitle": f"{2160 >> index}p HEVC HDR", "BitRate": 40_000_000 >> index},
+                {"Codec": "eac3", "Language": "chi", "Type": "Audio", "Index": 1, "Channels": 6,
+                 "DisplayTitle": "国语 EAC3 5.1 (默认)"},
+                {"Codec": "subrip", "Language": "chi", "Type": "Subtitle", "Index": 2,
+                 "DisplayTitle": "简体中文 (SUBRIP)"},
+            ],
+            "Bitrate": 40_000_000 >> index,
+        })
+    return json.dumps({"MediaSources": media_sources, "PlaySessionId": "f" * 32}, ensure_ascii=False).encode("utf-8")
+
+
+def build_cases():
+    """
+    构造基准用例，导入项目模块前需先设置日志目录
+
+    Returns:
+    - dict: 用例名称到无参函数的映射
+    """
+    from config.config import Config
+    from log.log import logger
+    from api.emby import EmbyApi
+    from stream.alist_path_fixer import AlistPathFixer
+    from utils.string_utils import StringUtils
+    from utils.path_mapper import PathMapper
+
+    config = Config()
+    path_mapper = PathMapper([(f"/mnt/媒体库/{category}", f"/115/{category}") for category in
+                              ("电影", "电视剧", "电视剧/国产剧", "动漫", "纪录片", "综艺")])
+    alist_fixer = AlistPathFixer(DIR_URL, None, None, "http://127.0.0.1:5244", "alist-token", LONG_CJK_PATH, None)
+    playback_info = build_playback_info("12345")
+    media_source_id = f"{3:032x}"
+    # PlaybackInfo 的解析逻辑是 EmbyApi 的私有方法，这里直接调用以排除网络开销
+    parse_playback_info = getattr(EmbyApi, "_EmbyApi__parse_playback_info")
+    user_agent_index = [0]
+
+    def next_user_agent():
+        user_agent_index[0] = (user_agent_index[0] + 1) % len(USER_AGENTS)
+        return USER_AGENTS[user_agent_index[0]]
+
+    return {
+        "dir_path_clean.no_match": lambda: StringUtils.dir_path_clean(r'dir=(.*?)&MediaSourceId=', LONG_CJK_PATH),
+        "dir_path_clean.match": lambda: StringUtils.dir_path_clean(r'dir=(.*?)&MediaSourceId=', DIR_URL),
+        "is_valid_url": lambda: StringUtils.is_valid_url("http://192.168.1.10:8096/emby/Items/12345/PlaybackInfo"),
+        "is_allowed_user_agent": lambda: config.is_allowed_user_agent(next_user_agent()),
+        "logger.info": lambda: logger.info("[%s] -> 推流URL：%s", "12345", DIR_URL),
+        "logger.debug.disabled": lambda: logger.debug("[%s] -> 请求头: %s", "12345", DIR_URL),
+        "alist_path_fixer.fix": alist_fixer.fix,
+        "path_mapper.map": lambda: path_mapper.map(LONG_CJK_PATH),
+        "playback_info.parse": lambda: parse_playback_info("12345", media_source_id, json.loads(playback_info)),
+    }
+
+
+def measure(func, repeat):
+    """
+    自动确定循环次数后重复测量
+
+    Parameters:
+    - func (Callable): 被测函数
+    - repeat (int): 重复测量的轮数
+
+    Returns:
+    - dict: 每次调用的最小与中位耗时（纳秒）以及每轮循环次数
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [elapsed / number * 1_000_000_000 for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_ns": round(min(timings), 1),
+        "median_ns": round(statistics.median(timings), 1),
+        "loops": number,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="推流热点函数微基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例重复测量的轮数")
+    parser.add_argument("--filter", default="", help="只运行名称中包含该字符串的用例")
+    parser.add_argument("--output", help="将结果保存为 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="变慢超过该比例时标记为退化")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    arguments = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT_PATH))
+    from config.config import Config
+
+    Config().log_path = tempfile.mkdtemp()
+    # 日志级别固定为 INFO，debug 用例测量的是被级别过滤的调用
+    raw_config = dict(Config().get_config())
+    raw_config["app"] = dict(Config().get_config("app"), log_level="INFO", log_caller_mode="fast")
+    Config().reload(raw_config)
+
+    # 终端输出写入内存，避免测量结果受终端速度影响
+    stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+        cases = build_cases()
+        results = {}
+        for name, case in cases.items():
+            if arguments.filter in name:
+                results[name] = measure(case, arguments.repeat)
+                sys.stderr.seek(0)
+                sys.stderr.truncate()
+        from log.log import logger
+        logger.shutdown()
+    finally:
+        sys.stderr = stderr
+
+    report = build_report("micro", {"repeat": arguments.repeat}, results)
+    if arguments.output:
+        save_report(arguments.output, report)
+    if arguments.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'case':<28}{'min(ns)':>12}{'median(ns)':>14}{'loops':>10}")
+        for case_name, result in results.items():
+            print(f"{case_name:<28}{result['min_ns']:>12}{result['median_ns']:>14}{result['loops']:>10}")
+    if arguments.compare:
+        baseline = load_report(arguments.compare)
+        # 循环次数由 autorange 决定，不参与对比
+        for report_results in (baseline["results"], report["results"]):
+            for result in report_results.values():
+                result.pop("loops", None)
+        print()
+        print_comparison(compare_reports(baseline, report, threshold=arguments.threshold))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+prefork 扩展性压测：分别以 1 - N 个 worker 启动服务，缓存预热后测量全部命中缓存时的吞吐，
+并统计各 worker 数下的上游调用次数，对比共享缓存与进程内缓存
+
+压测客户端运行在多个进程中，避免客户端本身成为瓶颈；结果受 CPU 核数限制，
+核数少于 worker 数与客户端进程数之和时吞吐不会继续增长
+
+用法:
+    python -m benchmarks.prefork_scaling --workers 1 2 4 8 --requests 20000 --clients 4
+    python -m benchmarks.prefork_scaling --workers 1 4 --no-shared-cache
+"""
+
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from benchmarks.asgi_vs_flask import ROOT_PATH, configure_app, get_free_port, wait_for_port, percentile
+
+
+def serve(port, workers, upstream_url, log_path, shared_cache):
+    """
+    以 prefork 模式启动被测服务，保留缓存配置
+
+    Parameters:
+    - port (int): 监听端口
+    - workers (int): worker 进程数
+    - upstream_url (str): 桩服务器地址
+    - log_path (str): 日志目录
+    - shared_cache (bool): worker 之间是否共享解析结果缓存
+    """
+    configure_app(upstream_url, log_path, enable_cache=True)
+    from main import start_worker
+    from utils.prefork import PreforkServer
+    from utils.shared_cache import SharedTable
+
+    table = SharedTable() if shared_cache else None
+    PreforkServer("127.0.0.1", port, workers, lambda index: start_worker(table), shared_table=table).serve_forever()
+
+
+async def run_client(base_url, item_ids, concurrency):
+    """
+    单个客户端进程：并发请求推流路由
+
+    Returns:
+    - tuple: (耗时列表, 错误数)
+    """
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for item_id in item_ids:
+        queue.put_nowait(item_id)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                item_id = queue.get_nowait()
+                url = f"{base_url}/Videos/{item_id}/stream?MediaSourceId=mediasource_{item_id}&api_key=benchmark"
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url, headers={"User-Agent": "Infuse-Direct/7.7.4"})
+                    if response.status_code != 302:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def client_process(base_url, item_ids, concurrency):
+    return asyncio.run(run_client(base_url, item_ids, concurrency))
+
+
+def run_load(base_url, item_ids, clients, concurrency):
+    """
+    把请求平均分配给多个客户端进程并发执行
+
+    Returns:
+    - dict: 压测结果
+    """
+    chunks = [item_ids[index::clients] for index in range(clients)]
+    with ProcessPoolExecutor(max_workers=clients) as executor:
+        started = time.perf_counter()
+        results = list(executor.map(client_process, [base_url] * clients, chunks,
+                                    [max(concurrency // clients, 1)] * clients))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    return {
+        "requests": len(item_ids),
+        "errors": sum(result[1] for result in results),
+        "rps": round(len(item_ids) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def read_upstream_calls(stub_port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{stub_port}/__stats") as response:
+        stats = json.loads(response.read())
+    return stats.get("playback_info", 0) + stats.get("fs_get", 0)
+
+
+def benchmark(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as log_path:
+        for workers in args.workers:
+            # 每轮使用新的桩服务器，上游调用次数从 0 开始计数
+            stub_port = get_free_port()
+            stub = subprocess.Popen(
+                [sys.executable, str(ROOT_PATH / "benchmarks" / "stub_servers.py"),
+                 "--port", str(stub_port), "--latency", str(args.latency)]
+            )
+            port = get_free_port()
+            command = [sys.executable, "-m", "benchmarks.prefork_scaling", "--serve", str(workers),
+                       "--port", str(port), "--upstream", f"http://127.0.0.1:{stub_port}", "--log-path", log_path]
+            if args.no_shared_cache:
+                command.append("--no-shared-cache")
+            server = subprocess.Popen(command, cwd=str(ROOT_PATH), stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+            try:
+                wait_for_port(stub_port)
+                wait_for_port(port)
+                base_url = f"http://127.0.0.1:{port}"
+                library = list(range(1, args.library_size + 1))
+                run_load(base_url, library, args.clients, args.concurrency)
+                warm_up_calls = read_upstream_calls(stub_port)
+
+                item_ids = random.Random(args.seed).choices(library, k=args.requests)
+                result = run_load(base_url, item_ids, args.clients, args.concurrency)
+                result["warm_up_upstream_calls"] = warm_up_calls
+                result["upstream_calls"] = read_upstream_calls(stub_port) - warm_up_calls
+                results[workers] = result
+            finally:
+                server.terminate()
+                server.wait()
+                stub.terminate()
+                stub.wait()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="prefork worker 数扩展性压测")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=4, help="压测客户端进程数")
+    parser.add_argument("--library-size", type=int, default=500, help="请求的 item_id 范围")
+    parser.add_argument("--latency", type=float, default=0.02, help="桩服务器每次上游调用的延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-shared-cache", action="store_true", help="worker 使用各自的进程内缓存")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--upstream", help=argparse.SUPPRESS)
+    parser.add_argument("--log-path", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.serve:
+        serve(arguments.port, arguments.serve, arguments.upstream, arguments.log_path,
+              not arguments.no_shared_cache)
+        sys.exit(0)
+
+    benchmark_results = benchmark(arguments)
+    if arguments.json:
+        print(json.dumps(benchmark_results, indent=2))
+    else:
+        baseline = benchmark_results[min(benchmark_results)]["rps"] or 1
+        print(f"{'workers':<9}{'rps':>10}{'speedup':>9}{'p50(ms)':>10}{'p99(ms)':>10}{'errors':>8}"
+              f"{'warm-up calls':>15}{'upstream calls':>16}")
+        for worker_count, result in benchmark_results.items():
+            print(f"{worker_count:<9}{result['rps']:>10}{result['rps'] / baseline:>9.2f}{result['p50_ms']:>10}"
+                  f"{result['p99_ms']:>10}{result['errors']:>8}{result['warm_up_upstream_calls']:>15}"
+                  f"{result['upstream_calls']:>16}")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+"""
+基准测试结果的保存、读取与对比，结果以 JSON 保存，便于不同提交之间对比
+"""
+
+
+import json
+import time
+import platform
+import subprocess
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+
+def get_git_revision():
+    """
+    获取当前代码的提交号
+
+    Returns:
+    - str: 提交号，获取失败时返回 空字符串
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT_PATH), capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def build_report(benchmark, parameters, results):
+    """
+    构造基准测试报告
+
+    Parameters:
+    - benchmark (str): 基准测试名称
+    - parameters (dict): 运行参数
+    - results (dict): 场景或函数名称到指标字典的映射
+
+    Returns:
+    - dict: 报告
+    """
+    return {
+        "benchmark": benchmark,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results,
+    }
+
+
+def save_report(path, report):
+    """
+    保存报告
+
+    Parameters:
+    - path (str): 保存路径
+    - report (dict): 报告
+    """
+    with open(path, mode="w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def load_report(path):
+    """
+    读取报告
+
+    Parameters:
+    - path (str): 报告路径
+
+    Returns:
+    - dict: 报告
+    """
+    with open(path, mode="r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_reports(baseline, current, higher_is_better=(), threshold=0.05):
+    """
+    对比两份报告中同名场景的同名数值指标
+
+    Parameters:
+    - baseline (dict): 基线报告
+    - current (dict): 当前报告
+    - higher_is_better (Iterable[str]): 越大越好的指标，其余指标越小越好
+    - threshold (float): 变差超过该比例时标记为退化
+
+    Returns:
+    - list: [(名称, 指标, 基线值, 当前值, 变化比例, 是否退化), ...]
+    """
+    higher_is_better = set(higher_is_better)
+    rows = []
+    for name, current_metrics in current.get("results", {}).items():
+        baseline_metrics = baseline.get("results", {}).get(name)
+        if not isinstance(baseline_metrics, dict):
+            continue
+        for metric, current_value in current_metrics.items():
+            baseline_value = baseline_metrics.get(metric)
+            if not isinstance(current_value, (int, float)) or not isinstance(baseline_value, (int, float)):
+                continue
+            change = (current_value - baseline_value) / baseline_value if baseline_value else 0.0
+            worse = -change if metric in higher_is_better else change
+            rows.append((name, metric, baseline_value, current_value, change, worse > threshold))
+    return rows
+
+
+def print_comparison(rows):
+    """
+    打印对比结果
+
+    Parameters:
+    - rows (list): compare_reports 的返回值
+    """
+    print(f"{'name':<28}{'metric':<22}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, metric, baseline_value, current_value, change, regressed in rows:
+        flag = "  <- regression" if regressed else ""
+        print(f"{name:<28}{metric:<22}{baseline_value:>14}{current_value:>14}{change:>+10.1%}{flag}")
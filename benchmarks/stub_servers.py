@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import json
+import re
+import random
+import threading
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# noinspection PyPep8Naming
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    """
+    同时模拟 Emby 的 Items/{id}/PlaybackInfo 与 Alist 的 api/fs/get 接口，支持配置延迟、抖动、错误率与媒体库大小
+    """
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    jitter = 0.0
+    error_rate = 0.0
+    library_size = 0
+    random = random.Random(0)
+    playback_info_pattern = re.compile(r"^/Items/([^/]+)/PlaybackInfo")
+
+    calls = {"playback_info": 0, "fs_get": 0, "errors": 0, "not_found": 0}
+    calls_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, latency=0.05, jitter=0.0, error_rate=0.0, library_size=0, seed=0):
+        """
+        配置桩服务器的行为
+
+        Parameters:
+        - latency (float): 每次上游调用的基础延迟（秒）
+        - jitter (float): 在基础延迟上随机增加的最大延迟（秒）
+        - error_rate (float): 返回 500 的概率
+        - library_size (int): 媒体库条目数，item_id 超出 1 - library_size 时返回 404，0 表示不限制
+        - seed (int): 随机数种子
+        """
+        cls.latency = latency
+        cls.jitter = jitter
+        cls.error_rate = error_rate
+        cls.library_size = library_size
+        cls.random = random.Random(seed)
+        with cls.calls_lock:
+            for name in cls.calls:
+                cls.calls[name] = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def __count(self, name):
+        with self.calls_lock:
+            self.calls[name] += 1
+
+    def __send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __simulate_upstream(self):
+        """
+        模拟上游延迟与故障
+
+        Returns:
+        - bool: 本次调用是否模拟为失败
+        """
+        with self.calls_lock:
+            delay = self.latency + (self.random.random() * self.jitter if self.jitter else 0)
+            failed = self.error_rate > 0 and self.random.random() < self.error_rate
+            if failed:
+                self.calls["errors"] += 1
+        time.sleep(delay)
+        if failed:
+            self.__send_json(500, {"message": "stub upstream error"})
+        return failed
+
+    def __in_library(self, item_id):
+        if not self.library_size:
+            return True
+        if item_id.isdigit() and 1 <= int(item_id) <= self.library_size:
+            return True
+        with self.calls_lock:
+            self.calls["not_found"] += 1
+        return False
+
+    def do_GET(self):
+        if self.path.startswith("/__stats"):
+            with self.calls_lock:
+                self.__send_json(200, dict(self.calls))
+            return
+        if self.path.startswith("/ping"):
+            self.__send_json(200, "pong")
+            return
+        match = self.playback_info_pattern.match(self.path)
+        if not match:
+            self.__send_json(404, {})
+            return
+        self.__count("playback_info")
+        if self.__simulate_upstream():
+            return
+        item_id = match.group(1)
+        if not self.__in_library(item_id):
+            self.__send_json(404, {})
+            return
+        # 偶数条目带有两个版本，模拟多媒体源的 PlaybackInfo
+        media_sources = [{"Id": f"mediasource_{item_id}", "Path": f"/mnt/媒体库/电影/{item_id}/{item_id}.mkv"}]
+        if item_id.isdigit() and int(item_id) % 2 == 0:
+            media_sources.append({"Id": f"mediasource_{item_id}_4k",
+                                  "Path": f"/mnt/媒体库/电影/{item_id}/{item_id} - 2160p.mkv"})
+        self.__send_json(200, {"MediaSources": media_sources})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.startswith("/api/fs/get"):
+            self.__send_json(404, {})
+            return
+        self.__count("fs_get")
+        if self.__simulate_upstream():
+            return
+        self.__send_json(200, {
+            "code": 200,
+            "data": {"raw_url": f"https://cdn.example.com/d{body.get('path', '')}?sign=bench"}
+        })
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.05, jitter=0.0, error_rate=0.0, library_size=0, seed=0):
+    """
+    在后台线程中启动桩服务器
+
+    Parameters:
+    - host (str): 监听地址
+    - port (int): 监听端口，0 表示随机端口
+    - latency (float): 每次上游调用的模拟延迟（秒）
+    - jitter (float): 在基础延迟上随机增加的最大延迟（秒）
+    - error_rate (float): 返回 500 的概率
+    - library_size (int): 媒体库条目数，0 表示不限制
+    - seed (int): 随机数种子
+
+    Returns:
+    - ThreadingHTTPServer: 已启动的服务器
+    """
+    StubUpstreamHandler.configure(latency, jitter, error_rate, library_size, seed)
+    server = ThreadingHTTPServer((host, port), StubUpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emby / Alist 上游桩服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18096)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--library-size", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    StubUpstreamHandler.configure(args.latency, args.jitter, args.error_rate, args.library_size, args.seed)
+    stub_server = ThreadingHTTPServer((args.host, args.port), StubUpstreamHandler)
+    stub_server.daemon_threads = True
+    stub_server.serve_forever()
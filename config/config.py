@@ -3,9 +3,12 @@
 # -*- coding: utf-8 -*-
 
 
+import time
+import signal
+import threading
 from os import path, remove, makedirs
+from config.config_snapshot import ConfigSnapshot
 from utils.commons import singleton
-from utils.types import RedirectMode
 
 import yaml
 
@@ -15,11 +18,18 @@ import yaml
 class Config:
     """
     配置类
+
+    配置加载后保存为只读的 ConfigSnapshot，重载时构造新快照并整体替换引用，读取配置无需加锁
     """
 
     __log_path = None
     __config_path = None
-    __config = {}
+    __config_yaml_path = None
+    __config_mtime = None
+    __snapshot = None
+    __reload_lock = threading.Lock()
+    __reload_listeners = []
+    __reload_thread = None
 
     def __init__(self):
         __config_path = path.dirname(path.abspath(__file__))
@@ -31,22 +41,149 @@ class Config:
             makedirs(self.__log_path, exist_ok=True)
 
         self.__config_yaml_path = path.join(__config_path, "config.yaml")
+        self.__snapshot = ConfigSnapshot()
 
         try:
-            with open(self.__config_yaml_path, mode="r", encoding="utf-8") as file:
-                yaml_content = file.read()
-            self.__config = yaml.safe_load(yaml_content)
+            self.__config_mtime = self.__get_config_mtime()
+            self.__snapshot = ConfigSnapshot(self.__read_config_file())
         except yaml.YAMLError as e:
             print(f"配置文件格式错误：" + str(e))
         except FileNotFoundError:
             print(f"配置文件不存在")
+        except ValueError as e:
+            print(f"配置项不合法：" + str(e))
         except Exception as e:
             print(f"加载配置出错：" + str(e))
 
+    def __read_config_file(self):
+        """
+        读取 config.yaml
+
+        Returns:
+        - dict: 原始配置
+        """
+        with open(self.__config_yaml_path, mode="r", encoding="utf-8") as file:
+            yaml_content = file.read()
+        return yaml.safe_load(yaml_content) or {}
+
+    def __get_config_mtime(self):
+        """
+        获取 config.yaml 的修改时间
+
+        Returns:
+        - float or None: 修改时间，文件不存在时返回 None
+        """
+        try:
+            return path.getmtime(self.__config_yaml_path) if path.exists(self.__config_yaml_path) else None
+        except OSError:
+            return None
+
+    @property
+    def snapshot(self):
+        """
+        获取当前配置快照，处理一个请求时应只读取一次，保证整个请求使用同一份配置
+
+        Returns:
+        - ConfigSnapshot: 当前配置快照
+        """
+        return self.__snapshot
+
     def get_config(self, node=None):
-        if not node:
-            return self.__config
-        return self.__config.get(node, {})
+        return self.__snapshot.get_node(node)
+
+    def reload(self, raw_config=None):
+        """
+        重新加载配置，新配置校验通过后整体替换快照并通知监听者，校验失败时保留旧配置
+
+        Parameters:
+        - raw_config (dict, optional): 直接使用的原始配置，未提供时从 config.yaml 读取
+
+        Returns:
+        - bool: 是否成功加载了新配置
+        """
+        with self.__reload_lock:
+            try:
+                if raw_config is None:
+                    self.__config_mtime = self.__get_config_mtime()
+                    raw_config = self.__read_config_file()
+                snapshot = ConfigSnapshot(raw_config)
+            except yaml.YAMLError as e:
+                print(f"配置文件格式错误，继续使用旧配置：" + str(e))
+                return False
+            except FileNotFoundError:
+                print(f"配置文件不存在，继续使用旧配置")
+                return False
+            except ValueError as e:
+                print(f"配置项不合法，继续使用旧配置：" + str(e))
+                return False
+
+            self.__snapshot = snapshot
+            listeners = list(self.__reload_listeners)
+
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"应用新配置出错：" + str(e))
+        return True
+
+    def add_reload_listener(self, listener):
+        """
+        注册配置重载监听者，配置重载成功后会以新快照为参数调用
+
+        Parameters:
+        - listener (Callable[[ConfigSnapshot], None]): 监听函数
+        """
+        with self.__reload_lock:
+            if listener not in self.__reload_listeners:
+                self.__reload_listeners.append(listener)
+
+    def reload_if_changed(self):
+        """
+        config.yaml 的修改时间发生变化时重新加载配置
+
+        Returns:
+        - bool: 是否重新加载了配置
+        """
+        mtime = self.__get_config_mtime()
+        if mtime is None or mtime == self.__config_mtime:
+            return False
+        return self.reload()
+
+    def start_auto_reload(self):
+        """
+        启动后台线程，按 config_reload_interval 轮询 config.yaml 的修改时间，间隔为 0 时不启动
+        """
+        with self.__reload_lock:
+            if self.__reload_thread is not None and self.__reload_thread.is_alive():
+                return
+            if self.__snapshot.config_reload_interval <= 0:
+                return
+            self.__reload_thread = threading.Thread(target=self.__watch_config, name="config-reload", daemon=True)
+            self.__reload_thread.start()
+
+    def __watch_config(self):
+        """
+        轮询 config.yaml 的修改时间，间隔每轮按最新配置读取
+        """
+        while True:
+            interval = self.__snapshot.config_reload_interval
+            if interval <= 0:
+                return
+            time.sleep(interval)
+            self.reload_if_changed()
+
+    def install_reload_signal(self):
+        """
+        注册 SIGHUP 信号处理，收到信号时重新加载配置，只能在主线程调用，不支持 SIGHUP 的平台忽略
+
+        Returns:
+        - bool: 是否注册成功
+        """
+        if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+        return True
 
     @staticmethod
     def is_user_agent_allowed(user_agent, ua_list):
@@ -72,14 +209,16 @@ class Config:
         Returns:
         - bool: 如果用户代理字符串在任一列表中，则返回 True；否则返回 False
         """
-        if not self.ua_allow_list and not self.web_ua_allow_list:
-            return True
-        if "infuse" in user_agent.lower() and "direct" not in user_agent.lower():
-            return False
-        if "afuse" in user_agent.lower():
-            return False
-        return (self.is_user_agent_allowed(user_agent, self.ua_allow_list) or
-                self.is_user_agent_allowed(user_agent, self.web_ua_allow_list))
+        return self.__snapshot.ua_matcher.is_allowed(user_agent)
+
+    def ua_matcher_stats(self):
+        """
+        获取 UA 判断结果缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数与容量
+        """
+        return self.__snapshot.ua_matcher.cache_stats()
 
     @property
     def log_path(self):
@@ -109,7 +248,27 @@ class Config:
         Returns:
         - str: 日志级别，默认为 DEBUG
         """
-        return self.get_config("app").get("log_level", "DEBUG")
+        return self.__snapshot.log_level
+
+    @property
+    def log_request_headers(self):
+        """
+        是否在 DEBUG 日志中输出每个推流请求的完整请求头
+
+        Returns:
+        - bool: 默认为 False
+        """
+        return self.__snapshot.log_request_headers
+
+    @property
+    def log_caller_mode(self):
+        """
+        获取日志中调用者名称的解析方式
+
+        Returns:
+        - str: fast（默认，逐帧回溯并缓存）、inspect（使用 inspect.stack()）或 off（不记录调用者）
+        """
+        return self.__snapshot.log_caller_mode
 
     @property
     def emby_url(self):
@@ -119,7 +278,7 @@ class Config:
         Returns:
         - str: Emby 服务器 URL
         """
-        return self.get_config("app").get("emby_url", "")
+        return self.__snapshot.emby_url
 
     @property
     def emby_api_key(self):
@@ -129,7 +288,7 @@ class Config:
         Returns:
         - str: Emby API 密钥
         """
-        return self.get_config("app").get("emby_api_key", "")
+        return self.__snapshot.emby_api_key
 
     @property
     def backend_url(self):
@@ -139,7 +298,7 @@ class Config:
         Returns:
         - str: 推流 服务器 URL
         """
-        return self.get_config("app").get("backend_url", "")
+        return self.__snapshot.backend_url
 
     @property
     def backend_token(self):
@@ -149,7 +308,7 @@ class Config:
         Returns:
         - str: 推流 服务器 Token
         """
-        return self.get_config("app").get("backend_token", "")
+        return self.__snapshot.backend_token
 
     @property
     def alist_url(self):
@@ -159,7 +318,7 @@ class Config:
         Returns:
         - str: AList URL
         """
-        return self.get_config("app").get("alist_url", "")
+        return self.__snapshot.alist_url
 
     @property
     def alist_api_key(self):
@@ -169,7 +328,301 @@ class Config:
         Returns:
         - str: AList API 密钥
         """
-        return self.get_config("app").get("alist_api_key", "")
+        return self.__snapshot.alist_api_key
+
+    @property
+    def alist_backends(self):
+        """
+        获取 Alist 实例列表，配置后与 alist_url 一起按延迟或权重选择，不可达时自动切换
+
+        Returns:
+        - tuple: (BackendSpec(url, credential, weight), ...)，由 [{url, api_key, weight}, ...] 解析得到
+        """
+        return self.__snapshot.alist_backends
+
+    @property
+    def stream_backends(self):
+        """
+        获取 MISAKA 推流后端列表，配置后与 backend_url 一起按延迟或权重选择
+
+        Returns:
+        - tuple: (BackendSpec(url, credential, weight), ...)，由 [{url, token, weight}, ...] 解析得到
+        """
+        return self.__snapshot.stream_backends
+
+    @property
+    def backend_selection(self):
+        """
+        获取多个推流后端的选择策略
+
+        Returns:
+        - str: least_latency（最低 EWMA 延迟，默认）或 weighted（按权重随机）
+        """
+        return self.__snapshot.backend_selection
+
+    @property
+    def backend_health_check_interval(self):
+        """
+        获取推流后端健康检查的间隔
+
+        Returns:
+        - int: 间隔（秒），默认为 10，为 0 时不检查
+        """
+        return self.__snapshot.backend_health_check_interval
+
+    @property
+    def backend_failure_threshold(self):
+        """
+        获取推流后端连续失败多少次后标记为不健康
+
+        Returns:
+        - int: 默认为 2
+        """
+        return self.__snapshot.backend_failure_threshold
+
+    @property
+    def emby_path_cache_ttl(self):
+        """
+        获取 Emby 文件路径缓存的过期时间
+
+        Returns:
+        - int: 缓存过期时间（秒），默认为 600，小于等于 0 时禁用缓存
+        """
+        return self.__snapshot.emby_path_cache_ttl
+
+    @property
+    def emby_path_cache_max_size(self):
+        """
+        获取 Emby 文件路径缓存的最大条目数
+
+        Returns:
+        - int: 缓存最大条目数，默认为 4096
+        """
+        return self.__snapshot.emby_path_cache_max_size
+
+    @property
+    def alist_raw_url_cache_ttl(self):
+        """
+        获取 Alist 直链缓存的默认过期时间，直链中无法解析出过期时间时使用
+
+        Returns:
+        - int: 缓存过期时间（秒），默认为 300，小于等于 0 时禁用缓存
+        """
+        return self.__snapshot.alist_raw_url_cache_ttl
+
+    @property
+    def alist_raw_url_cache_max_size(self):
+        """
+        获取 Alist 直链缓存的最大条目数
+
+        Returns:
+        - int: 缓存最大条目数，默认为 4096
+        """
+        return self.__snapshot.alist_raw_url_cache_max_size
+
+    @property
+    def alist_raw_url_expire_margin(self):
+        """
+        获取 Alist 直链缓存的安全余量，条目会在直链过期前这段时间被淘汰
+
+        Returns:
+        - int: 安全余量（秒），默认为 60
+        """
+        return self.__snapshot.alist_raw_url_expire_margin
+
+    @property
+    def alist_hedge_enabled(self):
+        """
+        是否对 Alist fs/get 请求进行对冲
+
+        Returns:
+        - bool: 默认为 False
+        """
+        return self.__snapshot.alist_hedge_enabled
+
+    @property
+    def alist_hedge_percentile(self):
+        """
+        获取对冲延迟使用的 fs/get 耗时分位数，第一个请求超过该耗时仍未返回时发出对冲请求
+
+        Returns:
+        - int: 分位数（1 - 99），默认为 95
+        """
+        return self.__snapshot.alist_hedge_percentile
+
+    @property
+    def alist_hedge_min_delay(self):
+        """
+        获取对冲延迟的下限
+
+        Returns:
+        - int: 下限（毫秒），默认为 50
+        """
+        return self.__snapshot.alist_hedge_min_delay
+
+    @property
+    def negative_cache_not_found_ttl(self):
+        """
+        获取“未找到”负缓存的过期时间，Emby 中没有该媒体或 Alist 中没有该文件时，在这段时间内不再请求上游
+
+        Returns:
+        - int: 缓存过期时间（秒），默认为 30，为 0 时不缓存
+        """
+        return self.__snapshot.negative_cache_not_found_ttl
+
+    @property
+    def negative_cache_error_ttl(self):
+        """
+        获取“上游错误”负缓存的过期时间，上游不可达、超时或返回 5xx 时，在这段时间内不再请求上游
+
+        Returns:
+        - int: 缓存过期时间（秒），默认为 5，为 0 时不缓存
+        """
+        return self.__snapshot.negative_cache_error_ttl
+
+    @property
+    def negative_cache_max_size(self):
+        """
+        获取 Emby 与 Alist 负缓存各自的最大条目数
+
+        Returns:
+        - int: 缓存最大条目数，默认为 4096
+        """
+        return self.__snapshot.negative_cache_max_size
+
+    @property
+    def stale_while_revalidate_window(self):
+        """
+        获取文件路径与直链缓存的提前刷新窗口，剩余有效期不足该时间的条目会直接返回给客户端，并在后台刷新
+
+        Returns:
+        - int: 提前刷新窗口（秒），默认为 30，为 0 时不提前刷新
+        """
+        return self.__snapshot.stale_while_revalidate_window
+
+    @property
+    def stale_while_revalidate_workers(self):
+        """
+        获取后台刷新缓存的最大线程数
+
+        Returns:
+        - int: 最大线程数，默认为 4
+        """
+        return self.__snapshot.stale_while_revalidate_workers
+
+    @property
+    def rate_limit_per_minute(self):
+        """
+        获取每个客户端 IP 与 API 密钥每分钟允许的上游请求数，命中缓存的请求不计入
+
+        Returns:
+        - int: 每分钟请求数，默认为 0，即不限流
+        """
+        return self.__snapshot.rate_limit_per_minute
+
+    @property
+    def rate_limit_burst(self):
+        """
+        获取每个客户端 IP 与 API 密钥允许的突发上游请求数
+
+        Returns:
+        - int: 突发请求数，默认为 30
+        """
+        return self.__snapshot.rate_limit_burst
+
+    @property
+    def rate_limit_max_clients(self):
+        """
+        获取限流时最多记录的客户端数量，超过后淘汰最久未请求的客户端
+
+        Returns:
+        - int: 客户端数量，默认为 4096
+        """
+        return self.__snapshot.rate_limit_max_clients
+
+    @property
+    def trusted_proxies(self):
+        """
+        获取受信任的反向代理，只有来自这些地址的请求才使用 X-Real-IP / X-Forwarded-For 作为客户端 IP
+
+        Returns:
+        - tuple: (IPv4Network / IPv6Network, ...)，默认为 127.0.0.1 与 ::1
+        """
+        return self.__snapshot.trusted_proxies
+
+    @property
+    def redirect_cache_max_age(self):
+        """
+        获取推流重定向允许客户端与 nginx 缓存的最长时间，实际时间不超过直链的剩余有效期与下一次特殊视频时段的切换时间
+
+        Returns:
+        - int: 缓存时间（秒），默认为 0，即不返回缓存相关的响应头
+        """
+        return self.__snapshot.redirect_cache_max_age
+
+    @property
+    def redirect_cache_placeholder_max_age(self):
+        """
+        获取禁止播放与特殊视频的重定向允许客户端缓存的最长时间，这类重定向不允许 nginx 等共享缓存保存
+
+        Returns:
+        - int: 缓存时间（秒），默认为 10
+        """
+        return self.__snapshot.redirect_cache_placeholder_max_age
+
+    @property
+    def persistent_cache_enabled(self):
+        """
+        是否将解析结果缓存持久化到磁盘，重启后用于预热缓存
+
+        Returns:
+        - bool: 默认为 False
+        """
+        return self.__snapshot.persistent_cache_enabled
+
+    @property
+    def persistent_cache_path(self):
+        """
+        获取持久化缓存的数据库路径，未配置时使用日志目录同级的 data 目录
+
+        Returns:
+        - str: 数据库路径
+        """
+        if self.__snapshot.persistent_cache_path:
+            return self.__snapshot.persistent_cache_path
+        return path.join(path.dirname(path.abspath(self.__log_path)), "data", "resolution_cache.db")
+
+    @property
+    def webhook_token(self):
+        """
+        获取 Emby Webhook 的校验令牌，未配置时拒绝所有 Webhook 通知
+
+        Returns:
+        - str: 校验令牌
+        """
+        return self.__snapshot.webhook_token
+
+    @property
+    def webhook_preresolve(self):
+        """
+        收到新入库或更新通知后是否在后台预先解析推流地址
+
+        Returns:
+        - bool: 默认为 False
+        """
+        return self.__snapshot.webhook_preresolve
+
+    def get_upstream_config(self, name):
+        """
+        获取上游服务（emby 或 alist）的连接池与超时配置，未配置或配置非法时使用默认值
+
+        Parameters:
+        - name (str): 上游服务名称
+
+        Returns:
+        - dict: 包含 pool_connections、pool_maxsize、max_retries、connect_timeout、read_timeout
+        """
+        return dict(self.__snapshot.upstreams.get(name) or self.__snapshot.upstreams["emby"])
 
     @property
     def ua_allow_list(self):
@@ -177,9 +630,9 @@ class Config:
         获取 UA 允许列表
 
         Returns:
-        - list: UA 允许列表
+        - tuple: UA 允许列表
         """
-        return self.get_config("app").get("ua_allow_list", [])
+        return self.__snapshot.ua_allow_list
 
     @property
     def web_ua_allow_list(self):
@@ -187,9 +640,9 @@ class Config:
         获取 Web UA 允许列表
 
         Returns:
-        - list: Web UA 允许列表
+        - tuple: Web UA 允许列表
         """
-        return self.get_config("app").get("web_ua_allow_list", [])
+        return self.__snapshot.web_ua_allow_list
 
     @property
     def national_memorial_day_stream_path(self):
@@ -199,7 +652,7 @@ class Config:
         Returns:
         - str: 国家纪念日直播流 URL Path
         """
-        return self.get_config("app").get("national_memorial_day_stream_path", "")
+        return self.__snapshot.national_memorial_day_stream_path
 
     @property
     def september_18th_incident_stream_path(self):
@@ -209,7 +662,27 @@ class Config:
         Returns:
         - str: 9·18 事变直播流 URL Path
         """
-        return self.get_config("app").get("september_18th_incident_stream_path", "")
+        return self.__snapshot.september_18th_incident_stream_path
+
+    @property
+    def path_mapper(self):
+        """
+        获取 Emby 路径前缀到 Alist 存储路径前缀的挂载路径映射表
+
+        Returns:
+        - PathMapper: 由 alist_path_mappings（[{emby_prefix, alist_prefix}, ...]）构建的映射表，未配置时不做替换
+        """
+        return self.__snapshot.path_mapper
+
+    @property
+    def override_schedule(self):
+        """
+        获取按日期与时间段替换推流视频的时间表
+
+        Returns:
+        - OverrideSchedule: 由 stream_overrides 编译得到的时间表，未配置时包含国家公祭日与 9·18 纪念日
+        """
+        return self.__snapshot.override_schedule
 
     @property
     def forbidden_ua_stream_path(self):
@@ -219,7 +692,7 @@ class Config:
         Returns:
         - str: 禁止 UA 直播流 URL Path
         """
-        return self.get_config("app").get("forbidden_ua_stream_path", "")
+        return self.__snapshot.forbidden_ua_stream_path
 
 
 # noinspection SpellCheckingInspection
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import logging
+import ipaddress
+from types import MappingProxyType
+
+from utils.backend_pool import BackendPool, BackendSpec
+from utils.override_schedule import OverrideSchedule
+from utils.path_mapper import PathMapper
+from utils.string_utils import StringUtils
+from utils.ua_matcher import UserAgentMatcher
+
+
+# noinspection SpellCheckingInspection
+class ConfigSnapshot:
+    """
+    只读的配置快照，加载时一次性完成解析与校验，之后只读不写
+
+    配置热重载时会构造新的快照并整体替换引用，请求处理过程中只需读取一次快照引用，无需加锁
+    """
+
+    __slots__ = (
+        "raw",
+        "log_level",
+        "log_caller_mode",
+        "log_request_headers",
+        "emby_url",
+        "emby_api_key",
+        "backend_url",
+        "backend_token",
+        "alist_url",
+        "alist_api_key",
+        "alist_backends",
+        "stream_backends",
+        "backend_selection",
+        "backend_health_check_interval",
+        "backend_failure_threshold",
+        "emby_path_cache_ttl",
+        "emby_path_cache_max_size",
+        "alist_raw_url_cache_ttl",
+        "alist_raw_url_cache_max_size",
+        "alist_raw_url_expire_margin",
+        "alist_hedge_enabled",
+        "alist_hedge_percentile",
+        "alist_hedge_min_delay",
+        "negative_cache_not_found_ttl",
+        "negative_cache_error_ttl",
+        "negative_cache_max_size",
+        "stale_while_revalidate_window",
+        "stale_while_revalidate_workers",
+        "rate_limit_per_minute",
+        "rate_limit_burst",
+        "rate_limit_max_clients",
+        "trusted_proxies",
+        "redirect_cache_max_age",
+        "redirect_cache_placeholder_max_age",
+        "upstreams",
+        "ua_allow_list",
+        "web_ua_allow_list",
+        "ua_matcher",
+        "national_memorial_day_stream_path",
+        "september_18th_incident_stream_path",
+        "forbidden_ua_stream_path",
+        "override_schedule",
+        "path_mapper",
+        "config_reload_interval",
+        "persistent_cache_enabled",
+        "persistent_cache_path",
+        "persistent_cache_flush_interval",
+        "webhook_token",
+        "webhook_preresolve",
+    )
+
+    __log_caller_modes = ("fast", "inspect", "off")
+    __upstream_defaults = {
+        "pool_connections": 10,
+        "pool_maxsize": 32,
+        "max_retries": 0,
+        "connect_timeout": 3.05,
+        "read_timeout": 10
+    }
+
+    def __init__(self, raw_config=None):
+        """
+        解析并校验配置
+
+        Parameters:
+        - raw_config (dict): 从 config.yaml 读取的原始配置
+
+        Raises:
+        - ValueError: 配置项不合法时抛出，错误信息中包含全部不合法的配置项
+        """
+        raw_config = raw_config if isinstance(raw_config, dict) else {}
+        app_config = raw_config.get("app") or {}
+        if not isinstance(app_config, dict):
+            raise ValueError("app 节点必须是字典")
+
+        errors = []
+        values = {"raw": MappingProxyType(raw_config)}
+
+        log_level = str(app_config.get("log_level") or "DEBUG").strip().upper()
+        if not isinstance(logging.getLevelName(log_level), int):
+            errors.append(f"log_level 不合法：{log_level}")
+        values["log_level"] = log_level
+
+        log_caller_mode = str(app_config.get("log_caller_mode") or "fast").strip().lower()
+        if log_caller_mode not in self.__log_caller_modes:
+            errors.append(f"log_caller_mode 不合法：{log_caller_mode}")
+        values["log_caller_mode"] = log_caller_mode
+        values["log_request_headers"] = bool(app_config.get("log_request_headers", False))
+
+        for key in ("emby_url", "backend_url", "alist_url"):
+            url = self.__get_str(app_config, key)
+            if url and not StringUtils.is_valid_url(url):
+                errors.append(f"{key} 不是合法的 URL：{url}")
+            values[key] = url
+        for key in ("emby_api_key", "backend_token", "alist_api_key", "national_memorial_day_stream_path",
+                    "september_18th_incident_stream_path", "forbidden_ua_stream_path"):
+            values[key] = self.__get_str(app_config, key)
+
+        values["alist_backends"] = self.__parse_backends(app_config, "alist_backends", "api_key", errors)
+        values["stream_backends"] = self.__parse_backends(app_config, "stream_backends", "token", errors)
+        backend_selection = str(app_config.get("backend_selection") or BackendPool.LEAST_LATENCY).strip().lower()
+        if backend_selection not in BackendPool.SELECTIONS:
+            errors.append(f"backend_selection 不合法：{backend_selection}")
+            backend_selection = BackendPool.LEAST_LATENCY
+        values["backend_selection"] = backend_selection
+
+        stream_paths = {key: values[key] for key in ("national_memorial_day_stream_path",
+                                                     "september_18th_incident_stream_path",
+                                                     "forbidden_ua_stream_path")}
+        try:
+            values["override_schedule"] = OverrideSchedule.from_config(app_config.get("stream_overrides"),
+                                                                       stream_paths)
+        except ValueError as e:
+            errors.append(str(e))
+
+        try:
+            values["path_mapper"] = PathMapper.from_config(app_config.get("alist_path_mappings"))
+        except ValueError as e:
+            errors.append(str(e))
+
+        for key, default in (("emby_path_cache_ttl", 600), ("emby_path_cache_max_size", 4096),
+                             ("alist_raw_url_cache_ttl", 300), ("alist_raw_url_cache_max_size", 4096),
+                             ("alist_raw_url_expire_margin", 60), ("config_reload_interval", 5),
+                             ("persistent_cache_flush_interval", 1), ("backend_health_check_interval", 10),
+                             ("backend_failure_threshold", 2), ("alist_hedge_percentile", 95),
+                             ("alist_hedge_min_delay", 50), ("negative_cache_not_found_ttl", 30),
+                             ("negative_cache_error_ttl", 5), ("negative_cache_max_size", 4096),
+                             ("stale_while_revalidate_window", 30), ("stale_while_revalidate_workers", 4),
+                             ("rate_limit_per_minute", 0), ("rate_limit_burst", 30),
+                             ("rate_limit_max_clients", 4096), ("redirect_cache_max_age", 0),
+                             ("redirect_cache_placeholder_max_age", 10)):
+            value = app_config.get(key, default)
+            value = default if value is None else value
+            if isinstance(value, str) and value.strip().isdigit():
+                value = int(value)
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                errors.append(f"{key} 必须是非负整数：{value}")
+                value = default
+            values[key] = value
+        for key in ("emby_path_cache_max_size", "alist_raw_url_cache_max_size", "backend_failure_threshold",
+                    "negative_cache_max_size", "stale_while_revalidate_workers", "rate_limit_burst",
+                    "rate_limit_max_clients"):
+            values[key] = values[key] or 1
+
+        if not 1 <= values["alist_hedge_percentile"] <= 99:
+            errors.append(f"alist_hedge_percentile 必须在 1 - 99 之间：{values['alist_hedge_percentile']}")
+        values["alist_hedge_enabled"] = bool(app_config.get("alist_hedge_enabled", False))
+
+        values["persistent_cache_enabled"] = bool(app_config.get("persistent_cache_enabled", False))
+        values["persistent_cache_path"] = self.__get_str(app_config, "persistent_cache_path")
+        values["webhook_token"] = self.__get_str(app_config, "webhook_token")
+        values["webhook_preresolve"] = bool(app_config.get("webhook_preresolve", False))
+
+        values["trusted_proxies"] = self.__parse_trusted_proxies(app_config, errors)
+
+        values["upstreams"] = MappingProxyType({
+            name: self.__parse_upstream(app_config, name, errors) for name in ("emby", "alist")
+        })
+
+        for key in ("ua_allow_list", "web_ua_allow_list"):
+            ua_list = app_config.get(key) or []
+            if not isinstance(ua_list, list):
+                errors.append(f"{key} 必须是列表")
+                ua_list = []
+            values[key] = tuple(str(ua) for ua in ua_list if ua is not None)
+        values["ua_matcher"] = UserAgentMatcher(values["ua_allow_list"], values["web_ua_allow_list"])
+
+        if errors:
+            raise ValueError("；".join(errors))
+
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ConfigSnapshot 是只读的")
+
+    def __delattr__(self, key):
+        raise AttributeError("ConfigSnapshot 是只读的")
+
+    @staticmethod
+    def __get_str(app_config, key):
+        """
+        读取字符串配置，未配置时返回 空字符串
+
+        Parameters:
+        - app_config (dict): app 节点配置
+        - key (str): 配置项名称
+
+        Returns:
+        - str: 配置值
+        """
+        value = app_config.get(key)
+        return "" if value is None else str(value)
+
+    @staticmethod
+    def __parse_backends(app_config, key, credential_key, errors):
+        """
+        解析推流后端列表
+
+        Parameters:
+        - app_config (dict): app 节点配置
+        - key (str): 配置项名称，alist_backends 或 stream_backends
+        - credential_key (str): 后端密钥的配置项名称，api_key 或 token
+        - errors (list): 收集校验错误的列表
+
+        Returns:
+        - tuple: (BackendSpec, ...)
+        """
+        raw_backends = app_config.get(key) or []
+        if not isinstance(raw_backends, list):
+            errors.append(f"{key} 必须是列表")
+            return ()
+
+        backends = []
+        for index, raw_backend in enumerate(raw_backends):
+            if not isinstance(raw_backend, dict):
+                errors.append(f"{key} 第 {index + 1} 项必须是字典")
+                continue
+            url = "" if raw_backend.get("url") is None else str(raw_backend.get("url")).strip()
+            if not StringUtils.is_valid_url(url):
+                errors.append(f"{key} 第 {index + 1} 项的 url 不是合法的 URL：{url}")
+                continue
+            credential = raw_backend.get(credential_key)
+            weight = raw_backend.get("weight", 1)
+            if not isinstance(weight, int) or isinstance(weight, bool) or weight <= 0:
+                errors.append(f"{key} 第 {index + 1} 项的 weight 必须是正整数：{weight}")
+                continue
+            backends.append(BackendSpec(url, "" if credential is None else str(credential), weight))
+        return tuple(backends)
+
+    @staticmethod
+    def __parse_trusted_proxies(app_config, errors):
+        """
+        解析受信任的反向代理，未配置时只信任本机
+
+        Parameters:
+        - app_config (dict): app 节点配置
+        - errors (list): 收集校验错误的列表
+
+        Returns:
+        - tuple: (IPv4Network / IPv6Network, ...)
+        """
+        raw_proxies = app_config.get("trusted_proxies")
+        if raw_proxies is None:
+            raw_proxies = ["127.0.0.1", "::1"]
+        if not isinstance(raw_proxies, list):
+            errors.append("trusted_proxies 必须是列表")
+            return ()
+
+        networks = []
+        for raw_proxy in raw_proxies:
+            try:
+                networks.append(ipaddress.ip_network(str(raw_proxy).strip(), strict=False))
+            except ValueError:
+                errors.append(f"trusted_proxies 中的地址不合法：{raw_proxy}")
+        return tuple(networks)
+
+    @classmethod
+    def __parse_upstream(cls, app_config, name, errors):
+        """
+        解析上游服务（emby 或 alist）的连接池与超时配置
+
+        Parameters:
+        - app_config (dict): app 节点配置
+        - name (str): 上游服务名称
+        - errors (list): 收集校验错误的列表
+
+        Returns:
+        - MappingProxyType: 包含 pool_connections、pool_maxsize、max_retries、connect_timeout、read_timeout
+        """
+        upstreams = app_config.get("upstreams") or {}
+        upstream = upstreams.get(name) if isinstance(upstreams, dict) else None
+        upstream = upstream if isinstance(upstream, dict) else {}
+
+        upstream_config = dict(cls.__upstream_defaults)
+        for key, default in cls.__upstream_defaults.items():
+            value = upstream.get(key, default)
+            try:
+                value = type(default)(value)
+            except (TypeError, ValueError):
+                errors.append(f"upstreams.{name}.{key} 不合法：{value}")
+                continue
+            # 超时必须为正数，避免一个卡住的上游请求永久占用工作线程
+            if value > 0 or (key == "max_retries" and value == 0):
+                upstream_config[key] = value
+            else:
+                errors.append(f"upstreams.{name}.{key} 必须大于 0：{value}")
+        return MappingProxyType(upstream_config)
+
+    def get_node(self, node=None):
+        """
+        获取原始配置节点
+
+        Parameters:
+        - node (str, optional): 节点名称，未提供时返回全部配置
+
+        Returns:
+        - Mapping: 原始配置
+        """
+        if not node:
+            return self.raw
+        return self.raw.get(node, {})
+
+    @property
+    def redirect_settings(self):
+        """
+        获取 Stream 使用的推流地址配置
+
+        Returns:
+        - tuple: (emby_url, emby_api_key, backend_url, backend_token, alist_url, alist_api_key,
+                  alist_backends, stream_backends)
+        """
+        return (self.emby_url, self.emby_api_key, self.backend_url,
+                self.backend_token, self.alist_url, self.alist_api_key,
+                self.alist_backends, self.stream_backends)
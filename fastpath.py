@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import re
+from urllib.parse import unquote_plus
+
+from werkzeug.urls import iri_to_uri
+from werkzeug.wsgi import get_current_url
+
+from app import get_stream
+from config.config import Config
+from utils.rate_limiter import get_client_ip
+
+# 用一个正则匹配 app.py 中的六个推流路由，再按 (前缀, videos 大小写, 类型, 是否带扩展名) 查出路由名称，
+# 名称与 Flask 的 endpoint 一致；不在表中的组合交给 Flask 处理
+ROUTE_PATTERN = re.compile(
+    r"^(?P<prefix>/emby)?/(?P<videos>[vV]ideos)/(?P<item_id>[^/]+)/(?P<kind>original|stream)(?P<ext>\.[^/]+)?$"
+)
+
+ROUTE_NAMES = {
+    ("", "videos", "original", True): "redirect_yamby_original",
+    ("/emby", "videos", "original", True): "redirect_emby_original",
+    ("/emby", "videos", "stream", True): "redirect_old_emb_stream",
+    ("", "Videos", "original", False): "redirect_old_emby_original",
+    ("", "Videos", "stream", False): "redirect_infuse_stream",
+    ("/emby", "Videos", "stream", True): "redirect_conflux_stream",
+}
+
+
+def parse_query(query_string):
+    """
+    只解析推流需要的 MediaSourceId 与 api_key，同名参数以第一个为准
+
+    Parameters:
+    - query_string (str): WSGI 环境中的 QUERY_STRING
+
+    Returns:
+    - tuple: (MediaSourceId, api_key)，不存在时为 空字符串
+    """
+    media_source_id = api_key = None
+    for part in query_string.split("&"):
+        if media_source_id is None and part.startswith("MediaSourceId="):
+            media_source_id = unquote_plus(part[14:])
+        elif api_key is None and part.startswith("api_key="):
+            api_key = unquote_plus(part[8:])
+    return media_source_id or "", api_key or ""
+
+
+def get_headers(environ):
+    """
+    从 WSGI 环境还原请求头，键的格式与 Flask 的 request.headers 一致
+
+    Parameters:
+    - environ (dict): WSGI 环境
+
+    Returns:
+    - dict: 请求头
+    """
+    headers = {key[5:].replace("_", "-").title(): value for key, value in environ.items() if key.startswith("HTTP_")}
+    for key in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+        if environ.get(key):
+            headers[key.replace("_", "-").title()] = environ[key]
+    return headers
+
+
+class FastPathDispatcher:
+    """
+    推流路由的 WSGI 快速通道：直接匹配六个推流路由并返回 302（包括缓存相关的响应头），
+    跳过 Flask 的请求上下文、路由匹配与 flask_cors 处理，其它请求交给 Flask
+
+    用法: app.wsgi_app = FastPathDispatcher(app.wsgi_app)
+    """
+
+    def __init__(self, fallback):
+        """
+        初始化快速通道
+
+        Parameters:
+        - fallback (Callable): 未命中推流路由时使用的 WSGI 应用
+        """
+        self.__fallback = fallback
+        self.__stream = None
+
+    def __call__(self, environ, start_response):
+        match = ROUTE_PATTERN.match(environ.get("PATH_INFO", ""))
+        if match is None or environ.get("REQUEST_METHOD") not in ("GET", "HEAD"):
+            return self.__fallback(environ, start_response)
+        prefix, videos, kind, ext = match.group("prefix", "videos", "kind", "ext")
+        route = ROUTE_NAMES.get((prefix or "", videos, kind, ext is not None))
+        if route is None:
+            return self.__fallback(environ, start_response)
+
+        # Stream 是单例，配置变化通过重载监听器生效，无需每个请求都重新组装构造参数
+        stream = self.__stream
+        if stream is None:
+            stream = self.__stream = get_stream()
+        snapshot = Config().snapshot
+        media_source_id, api_key = parse_query(environ.get("QUERY_STRING", ""))
+        stream_url, cache_headers = stream.resolve_stream_url(
+            url=get_current_url(environ),
+            # PEP 3333 中 PATH_INFO 按 latin-1 解码，这里与 werkzeug 一样还原为 UTF-8
+            item_id=match.group("item_id").encode("latin-1").decode("utf-8", "replace"),
+            media_source_id=media_source_id,
+            api_key=api_key or snapshot.emby_api_key,
+            user_agent=environ.get("HTTP_USER_AGENT", ""),
+            headers=get_headers(environ) if snapshot.log_request_headers else None,
+            route=route,
+            client_ip=get_client_ip(environ.get("HTTP_X_REAL_IP"), environ.get("HTTP_X_FORWARDED_FOR"),
+                                    environ.get("REMOTE_ADDR"), snapshot.trusted_proxies)
+        )
+
+        # 与 flask_cors 对 "*" 的处理一致：带 Origin 的请求原样返回该来源
+        origin = environ.get("HTTP_ORIGIN")
+        cors_headers = [("Access-Control-Allow-Origin", origin), ("Vary", "Origin")] if origin else \
+            [("Access-Control-Allow-Origin", "*")]
+        if stream_url is None:
+            body = b"Too Many Requests"
+            start_response("429 Too Many Requests", [
+                ("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", str(len(body))),
+                ("Retry-After", str(stream.retry_after)), *cors_headers
+            ])
+            return [body]
+        start_response("302 Found", [("Location", iri_to_uri(stream_url)), ("Content-Length", "0"), *cache_headers,
+                                     *cors_headers])
+        return []
@@ -1,11 +1,16 @@
+import sys
+import queue
+import threading
+import atexit
 import inspect
 import logging
 from pathlib import Path
 from typing import Dict, Any
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueListener, RotatingFileHandler
 
 from config.config import Config
 from .log_formatter import LogFormatter
+from .log_handler import DeferredQueueHandler
 
 
 # noinspection SpellCheckingInspection
@@ -16,13 +21,87 @@ class LoggerManager:
     Attributes:
     - __loggers (Dict[str, Any]): 存储已创建的日志记录器
     - __default_log_file (str): 默认的日志文件名
+    - __caller_labels (Dict[str, str]): 源文件路径到调用者名称的缓存
+    - __caller_mode (str): 调用者解析方式，fast（默认）、inspect 或 off
+    - __listeners (Dict[str, QueueListener]): 每个日志文件对应的后台写日志线程
     """
 
     __loggers: Dict[str, Any] = {}
+    __listeners: Dict[str, QueueListener] = {}
+    __setup_lock = threading.Lock()
     __default_log_file = "stream.log"
+    __caller_labels: Dict[str, str] = {}
+    __caller_modes = ("fast", "inspect", "off")
+    __method_levels = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "warning": logging.WARNING,
+        "error": logging.ERROR,
+        "critical": logging.CRITICAL
+    }
+
+    def __init__(self):
+        self.__caller_mode = "fast"
+        self.__level = logging.DEBUG
+        self.apply_config(Config().snapshot)
+        Config().add_reload_listener(self.apply_config)
+        atexit.register(self.shutdown)
+
+    def apply_config(self, snapshot):
+        """
+        应用配置快照中的日志级别与调用者解析方式
 
-    @staticmethod
-    def __setup_logger(log_file: str):
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        self.set_caller_mode(snapshot.log_caller_mode)
+        self.set_level(snapshot.log_level)
+
+    def set_caller_mode(self, caller_mode: str):
+        """
+        设置调用者解析方式
+
+        Parameters:
+        - caller_mode (str): fast 逐帧回溯并缓存文件名称；inspect 使用 inspect.stack()；off 不记录调用者
+        """
+        caller_mode = str(caller_mode or "").lower()
+        self.__caller_mode = caller_mode if caller_mode in self.__caller_modes else "fast"
+
+    def set_level(self, level):
+        """
+        设置日志级别，低于该级别的日志在调用处直接丢弃
+
+        Parameters:
+        - level (str or int): 日志级别，如 DEBUG、INFO，非法时使用 DEBUG
+        """
+        if isinstance(level, str):
+            level = logging.getLevelName(level.strip().upper())
+        self.__level = level if isinstance(level, int) else logging.DEBUG
+        for __logger in self.__loggers.values():
+            __logger.setLevel(self.__level)
+
+    def is_enabled_for(self, method: str) -> bool:
+        """
+        判断指定级别的日志是否会被记录，可用于在构造开销较大的日志消息前提前判断
+
+        Parameters:
+        - method (str): 日志记录方法（例如：info、debug）
+
+        Returns:
+        - bool: 会被记录时返回 True
+        """
+        return self.__method_levels.get(method, logging.CRITICAL) >= self.__level
+
+    def shutdown(self):
+        """
+        停止后台写日志线程，并写出队列中剩余的日志
+        """
+        for listener in self.__listeners.values():
+            listener.stop()
+        self.__listeners.clear()
+        self.__loggers.clear()
+
+    def __setup_logger(self, log_file: str):
         """
         设置日志记录器
 
@@ -37,9 +116,10 @@ class LoggerManager:
             log_file_path.parent.mkdir(parents=True, exist_ok=True)
 
         __logger = logging.getLogger(log_file_path.stem)
-        __logger.setLevel(logging.DEBUG)
+        __logger.setLevel(self.__level)
+        __logger.propagate = False
 
-        for handler in __logger.handlers:
+        for handler in list(__logger.handlers):
             __logger.removeHandler(handler)
 
         # 终端日志
@@ -47,7 +127,6 @@ class LoggerManager:
         console_handler.setLevel(logging.DEBUG)
         console_formatter = LogFormatter(f"%(level_text)s%(message)s")
         console_handler.setFormatter(console_formatter)
-        __logger.addHandler(console_handler)
 
         # 文件日志
         file_handler = RotatingFileHandler(filename=log_file_path,
@@ -58,7 +137,16 @@ class LoggerManager:
         file_handler.setLevel(logging.INFO)
         file_formatter = LogFormatter(f"【%(levelname)s】%(asctime)s - %(message)s")
         file_handler.setFormatter(file_formatter)
-        __logger.addHandler(file_handler)
+
+        # 请求线程只负责入队，格式化与写终端、写文件都在后台线程中完成
+        log_queue = queue.SimpleQueue()
+        __logger.addHandler(DeferredQueueHandler(log_queue))
+        listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        listener.start()
+        previous_listener = self.__listeners.get(log_file)
+        if previous_listener:
+            previous_listener.stop()
+        self.__listeners[log_file] = listener
 
         return __logger
 
@@ -72,17 +160,28 @@ class LoggerManager:
         - args: 可变参数
         - kwargs: 关键字参数
         """
-        caller_name = self.__get_caller()
+        if not self.is_enabled_for(method):
+            return
+
+        if self.__caller_mode == "fast":
+            caller_name = self.__get_caller_fast()
+        elif self.__caller_mode == "inspect":
+            caller_name = self.__get_caller()
+        else:
+            caller_name = None
         logfile = self.__default_log_file
 
         __logger = self.__loggers.get(logfile)
         if not __logger:
-            __logger = self.__setup_logger(logfile)
-            self.__loggers[logfile] = __logger
+            with self.__setup_lock:
+                __logger = self.__loggers.get(logfile)
+                if not __logger:
+                    __logger = self.__setup_logger(logfile)
+                    self.__loggers[logfile] = __logger
 
         if hasattr(__logger, method):
             method = getattr(__logger, method)
-            method(f"{caller_name} - {msg}", *args, **kwargs)
+            method(f"{caller_name} - {msg}" if caller_name else msg, *args, **kwargs)
 
     @staticmethod
     def __get_caller():
@@ -105,6 +204,28 @@ class LoggerManager:
                 break
         return caller_name or "log.py"
 
+    @classmethod
+    def __get_caller_fast(cls):
+        """
+        获取调用者的文件名称，沿 f_back 逐帧回溯，不构造 FrameInfo 也不读取源码，
+        文件路径到名称的映射会被缓存
+
+        Returns:
+        - str: 调用者所在的文件名称
+        """
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            caller_name = cls.__caller_labels.get(filename)
+            if caller_name is None:
+                parts = Path(filename).parts
+                caller_name = parts[-2] if parts[-1] == "__init__.py" else parts[-1]
+                cls.__caller_labels[filename] = caller_name
+            if caller_name and caller_name != "log.py":
+                return caller_name
+            frame = frame.f_back
+        return "log.py"
+
     def info(self, msg: str, *args, **kwargs):
         """
         记录 INFO 级别的日志
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+from logging.handlers import QueueHandler
+
+
+# noinspection SpellCheckingInspection
+class DeferredQueueHandler(QueueHandler):
+    """
+    将日志记录原样放入队列的处理器，继承自 logging.handlers.QueueHandler
+
+    标准的 QueueHandler 会在调用线程中先格式化消息再入队，这里把格式化推迟到
+    后台的 QueueListener 线程中完成，请求线程只负责创建日志记录并入队
+    """
+
+    def prepare(self, record):
+        """
+        入队前处理日志记录，队列只在进程内使用，无需提前格式化或序列化
+
+        Parameters:
+        - record (logging.LogRecord): 日志记录对象
+
+        Returns:
+        - logging.LogRecord: 原日志记录对象
+        """
+        return record
@@ -2,14 +2,103 @@
 
 # -*- coding: utf-8 -*-
 
+"""
+启动 PiliPili Stream
 
-from flask_cors import CORS
+用法:
+    python main.py                          # 单进程
+    python main.py --workers 4              # prefork 4 个 worker，共享解析结果缓存
+    python main.py --workers 0              # worker 数与 CPU 核数相同
+    python main.py --fast-path              # 推流路由绕过 Flask，直接由 WSGI 快速通道返回 302
+    python main.py --debug                  # Flask 开发服务器（调试模式）
+"""
 
-from app import app
 
-# noinspection SpellCheckingInspection
-CORS(app, resources={r"/*": {"origins": "*"}})
+import os
+import argparse
+
+from config.config import Config
+
+
+def create_app(fast_path=False):
+    """
+    导入 Flask 应用并开启跨域
+
+    应用在这里才被导入：prefork 模式下主进程不导入应用，日志、配置轮询等后台线程在 worker 进程中创建
+
+    Parameters:
+    - fast_path (bool): 是否在 Flask 之前挂载推流路由的 WSGI 快速通道
+
+    Returns:
+    - Flask: Flask 应用
+    """
+    from flask_cors import CORS
+    from app import app
+
+    # noinspection SpellCheckingInspection
+    CORS(app, resources={r"/*": {"origins": "*"}})
+    if fast_path:
+        from fastpath import FastPathDispatcher
+
+        if not isinstance(app.wsgi_app, FastPathDispatcher):
+            app.wsgi_app = FastPathDispatcher(app.wsgi_app)
+    return app
+
+
+def start_worker(shared_table=None, fast_path=False):
+    """
+    初始化 worker 进程：切换到共享缓存，注册配置重载
+
+    Parameters:
+    - shared_table (SharedTable, optional): 各 worker 共享的解析结果缓存，为 None 时使用进程内缓存
+    - fast_path (bool): 是否启用推流路由的 WSGI 快速通道
+
+    Returns:
+    - Flask: Flask 应用
+    """
+    app = create_app(fast_path)
+    if shared_table is not None:
+        from api.alist import AlistApi
+        from api.emby import EmbyApi
+
+        EmbyApi.use_shared_cache(shared_table)
+        AlistApi.use_shared_cache(shared_table)
+    Config().install_reload_signal()
+    Config().start_auto_reload()
+    return app
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="PiliPili Stream")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", type=int, default=60001, help="监听端口")
+    parser.add_argument("--workers", type=int, default=1, help="worker 进程数，0 表示与 CPU 核数相同")
+    parser.add_argument("--shared-cache-slots", type=int, default=16384,
+                        help="多个 worker 共享的解析结果缓存的槽位数，0 表示不共享")
+    parser.add_argument("--shared-cache-slot-size", type=int, default=2048,
+                        help="共享缓存每个槽位的字节数，超过的直链不进入共享缓存")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="推流路由绕过 Flask 的请求上下文与路由，直接返回 302，其它请求仍由 Flask 处理")
+    parser.add_argument("--debug", action="store_true", help="使用 Flask 开发服务器（调试模式）")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    app.run(port=60001, debug=True, host="0.0.0.0", threaded=True)
+    arguments = parse_arguments()
+    workers = arguments.workers or os.cpu_count() or 1
+
+    if arguments.debug:
+        start_worker(fast_path=arguments.fast_path).run(port=arguments.port, debug=True, host=arguments.host, threaded=True)
+    elif workers == 1:
+        from werkzeug.serving import make_server
+
+        make_server(arguments.host, arguments.port, start_worker(fast_path=arguments.fast_path), threaded=True).serve_forever()
+    else:
+        from utils.prefork import PreforkServer
+        from utils.shared_cache import SharedTable
+
+        table = None
+        if arguments.shared_cache_slots > 0:
+            table = SharedTable(slots=arguments.shared_cache_slots, slot_size=arguments.shared_cache_slot_size)
+        PreforkServer(arguments.host, arguments.port, workers, lambda index: start_worker(table, arguments.fast_path),
+                      shared_table=table).serve_forever()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+from .registry import MetricsRegistry, escape_label_value
+
+
+# noinspection SpellCheckingInspection
+class StreamMetrics:
+    """
+    推流重定向相关的指标，通过 /metrics 以 Prometheus 文本格式导出
+
+    计数器与直方图按线程分片记录，请求路径上不加锁；连接池与缓存的使用情况在导出时读取
+    """
+
+    REDIRECT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.__registry = MetricsRegistry()
+        self.__redirects = self.__registry.counter(
+            "pilipili_redirects_total",
+            "推流重定向请求数",
+            ("mode", "route", "outcome")
+        )
+        self.__stage_seconds = self.__registry.histogram(
+            "pilipili_redirect_stage_seconds",
+            "推流重定向各阶段耗时：ua_check、emby_playback_info、path_fix、alist_fs_get（仅 ALIST 模式）与 total",
+            ("stage", "mode", "route", "outcome"),
+            self.REDIRECT_BUCKETS
+        )
+        self.__upstream_responses = self.__registry.counter(
+            "pilipili_upstream_responses_total",
+            "上游请求数，status 为 HTTP 状态码，请求失败时为 error",
+            ("upstream", "endpoint", "status")
+        )
+        self.__upstream_seconds = self.__registry.histogram(
+            "pilipili_upstream_request_seconds",
+            "上游请求耗时",
+            ("upstream", "endpoint")
+        )
+        self.__revalidations = self.__registry.counter(
+            "pilipili_revalidations_total",
+            "即将过期的缓存条目触发的后台刷新，result 为 scheduled、skipped（已有刷新任务）或 dropped（任务数已达上限）",
+            ("cache", "result")
+        )
+        self.__pool_sources = {}
+        self.__cache_sources = {}
+        self.__backend_sources = {}
+        self.__hedge_sources = {}
+        self.__registry.add_collector(self.__collect_pools)
+        self.__registry.add_collector(self.__collect_caches)
+        self.__registry.add_collector(self.__collect_backends)
+        self.__registry.add_collector(self.__collect_hedges)
+
+    def observe_redirect(self, mode, route, outcome, stages):
+        """
+        记录一次推流重定向
+
+        Parameters:
+        - mode (str): 重定向模式，MISAKA 或 ALIST
+        - route (str): 客户端请求的路由
+        - outcome (str): 结果，redirected、forbidden、no_path 或 upstream_error
+        - stages (dict): 各阶段名称到耗时（秒）的映射
+        """
+        self.__redirects.inc(mode, route, outcome)
+        for stage, seconds in stages.items():
+            self.__stage_seconds.observe(seconds, stage, mode, route, outcome)
+
+    def observe_upstream(self, upstream, endpoint, status, seconds):
+        """
+        记录一次上游请求
+
+        Parameters:
+        - upstream (str): 上游服务名称，emby 或 alist
+        - endpoint (str): 上游接口名称
+        - status (int or None): HTTP 状态码，请求失败时为 None
+        - seconds (float): 请求耗时（秒）
+        """
+        self.__upstream_responses.inc(upstream, endpoint, "error" if status is None else str(status))
+        self.__upstream_seconds.observe(seconds, upstream, endpoint)
+
+    def observe_revalidation(self, cache, result):
+        """
+        记录一次后台刷新提交
+
+        Parameters:
+        - cache (str): 缓存名称
+        - result (str): 提交结果，scheduled、skipped 或 dropped
+        """
+        self.__revalidations.inc(cache, result)
+
+    def add_pool_source(self, upstream, pool_stats):
+        """
+        注册连接池使用情况的来源，同名来源只保留最后一个
+
+        Parameters:
+        - upstream (str): 上游服务名称
+        - pool_stats (Callable[[], dict]): 返回 {"sync": {...}, "async": {...}} 的函数
+        """
+        self.__pool_sources[upstream] = pool_stats
+
+    def add_cache_source(self, cache, cache_stats):
+        """
+        注册缓存统计信息的来源，同名来源只保留最后一个
+
+        Parameters:
+        - cache (str): 缓存名称
+        - cache_stats (Callable[[], dict]): 返回包含 hits、misses、size 的字典的函数
+        """
+        self.__cache_sources[cache] = cache_stats
+
+    def add_backend_source(self, source, backend_stats):
+        """
+        注册推流后端池运行状态的来源，同名来源只保留最后一个
+
+        Parameters:
+        - source (str): 来源名称
+        - backend_stats (Callable[[], dict]): 返回 {后端池名称: [{url, healthy, latency, requests, errors, slow}, ...]} 的函数
+        """
+        self.__backend_sources[source] = backend_stats
+
+    def add_hedge_source(self, request, hedge_stats):
+        """
+        注册对冲请求统计信息的来源，同名来源只保留最后一个
+
+        Parameters:
+        - request (str): 请求名称
+        - hedge_stats (Callable[[], dict]): 返回包含 requests、hedged、hedge_wins、delay 的字典的函数，未开启对冲时返回 空字典
+        """
+        self.__hedge_sources[request] = hedge_stats
+
+    def __collect_pools(self):
+        """
+        导出连接池使用情况
+
+        Returns:
+        - list: 文本行
+        """
+        gauges = (
+            ("pilipili_upstream_pool_in_flight", "gauge", "in_flight", "进行中的上游请求数"),
+            ("pilipili_upstream_pool_max_in_flight", "gauge", "max_in_flight", "进行中的上游请求数峰值"),
+            ("pilipili_upstream_pool_maxsize", "gauge", "pool_maxsize",
+             "连接池大小，sync 客户端为每个 host 的大小，async 客户端为全部 host 合计"),
+            ("pilipili_upstream_pool_exhausted_total", "counter", "pool_exhausted",
+             "进行中的请求数超过连接池大小的次数，sync 客户端按 host 分别计算"),
+        )
+        samples = {name: [] for name, _, _, _ in gauges}
+        for upstream, pool_stats in list(self.__pool_sources.items()):
+            for client, stats in pool_stats().items():
+                labels = f'{{upstream="{escape_label_value(upstream)}",client="{escape_label_value(client)}"}}'
+                for name, _, key, _ in gauges:
+                    samples[name].append(f"{name}{labels} {stats.get(key) or 0}")
+
+        lines = []
+        for name, metric_type, _, documentation in gauges:
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"))
+            lines.extend(samples[name])
+        return lines
+
+    def __collect_caches(self):
+        """
+        导出缓存命中情况
+
+        Returns:
+        - list: 文本行
+        """
+        metrics = (
+            ("pilipili_cache_hits_total", "counter", "hits", "缓存命中次数"),
+            ("pilipili_cache_misses_total", "counter", "misses", "缓存未命中次数"),
+            ("pilipili_cache_entries", "gauge", "size", "缓存当前条目数"),
+            ("pilipili_cache_lock_timeouts_total", "counter", "lock_timeouts",
+             "prefork 共享缓存获取分段锁超时、放弃写入或删除的次数（当前 worker）"),
+        )
+        samples = {name: [] for name, _, _, _ in metrics}
+        for cache, cache_stats in list(self.__cache_sources.items()):
+            stats = cache_stats()
+            for name, _, key, _ in metrics:
+                samples[name].append(f'{name}{{cache="{escape_label_value(cache)}"}} {stats.get(key) or 0}')
+
+        lines = []
+        for name, metric_type, _, documentation in metrics:
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"))
+            lines.extend(samples[name])
+        return lines
+
+    def __collect_backends(self):
+        """
+        导出推流后端的健康状态、EWMA 延迟与请求数
+
+        Returns:
+        - list: 文本行
+        """
+        metrics = (
+            ("pilipili_backend_healthy", "gauge", "healthy", "后端是否健康，1 为健康"),
+            ("pilipili_backend_latency_seconds", "gauge", "latency", "后端请求与健康检查耗时的 EWMA"),
+            ("pilipili_backend_requests_total", "counter", "requests", "发往后端的推流请求数"),
+            ("pilipili_backend_errors_total", "counter", "errors", "后端不可达的次数"),
+            ("pilipili_backend_slow_total", "counter", "slow", "后端被对冲请求抢先返回的次数"),
+        )
+        samples = {name: [] for name, _, _, _ in metrics}
+        for backend_stats in list(self.__backend_sources.values()):
+            for pool, backends in backend_stats().items():
+                for stats in backends:
+                    labels = f'{{pool="{escape_label_value(pool)}",backend="{escape_label_value(stats["url"])}"}}'
+                    for name, _, key, _ in metrics:
+                        value = stats.get(key)
+                        if value is None:
+                            continue
+                        samples[name].append(f"{name}{labels} {int(value) if isinstance(value, bool) else value}")
+
+        lines = []
+        for name, metric_type, _, documentation in metrics:
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"))
+            lines.extend(samples[name])
+        return lines
+
+    def __collect_hedges(self):
+        """
+        导出对冲请求的对冲比例与胜出次数，用于调整对冲分位数
+
+        Returns:
+        - list: 文本行
+        """
+        metrics = (
+            ("pilipili_hedge_requests_total", "counter", "requests", "可对冲的请求数"),
+            ("pilipili_hedge_fired_total", "counter", "hedged", "发出对冲请求的次数"),
+            ("pilipili_hedge_wins_total", "counter", "hedge_wins", "采用对冲请求结果的次数"),
+            ("pilipili_hedge_delay_seconds", "gauge", "delay", "当前的对冲延迟"),
+        )
+        samples = {name: [] for name, _, _, _ in metrics}
+        for request, hedge_stats in list(self.__hedge_sources.items()):
+            stats = hedge_stats()
+            for name, _, key, _ in metrics:
+                if stats.get(key) is not None:
+                    samples[name].append(f'{name}{{request="{escape_label_value(request)}"}} {stats[key]}')
+
+        lines = []
+        for name, metric_type, _, documentation in metrics:
+            lines.extend((f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"))
+            lines.extend(samples[name])
+        return lines
+
+    def render(self):
+        """
+        导出全部指标
+
+        Returns:
+        - str: Prometheus 文本格式的指标
+        """
+        return self.__registry.render()
+
+
+metrics = StreamMetrics()
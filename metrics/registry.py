@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import math
+import threading
+from bisect import bisect_left
+
+
+def escape_label_value(value):
+    """
+    按 Prometheus 文本格式转义标签值
+
+    Parameters:
+    - value: 标签值
+
+    Returns:
+    - str: 转义后的标签值
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# noinspection SpellCheckingInspection
+class ShardedMetric:
+    """
+    按线程分片记录的指标基类
+
+    每个线程写入自己的分片，记录时无需加锁；只有线程首次记录与导出时才会加锁，
+    已结束线程的分片会被合并到 retired 中，避免每请求一个线程时分片无限增长
+    """
+
+    __compact_threshold = 64
+
+    def __init__(self, name, documentation, label_names=()):
+        """
+        初始化指标
+
+        Parameters:
+        - name (str): 指标名称
+        - documentation (str): 指标说明
+        - label_names (tuple): 标签名称
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__shards = []
+        self.__retired = {}
+
+    def _get_shard(self):
+        """
+        获取当前线程的分片，不存在时创建
+
+        Returns:
+        - dict: 标签值元组到指标值的映射
+        """
+        shard = getattr(self.__local, "shard", None)
+        if shard is None:
+            shard = {}
+            self.__local.shard = shard
+            with self.__lock:
+                if len(self.__shards) >= self.__compact_threshold:
+                    self.__compact()
+                self.__shards.append((threading.current_thread(), shard))
+        return shard
+
+    def __compact(self):
+        """
+        将已结束线程的分片合并到 retired 中，调用方需持有锁
+        """
+        alive_shards = []
+        for thread, shard in self.__shards:
+            if thread.is_alive():
+                alive_shards.append((thread, shard))
+            else:
+                for key, value in list(shard.items()):
+                    self.__retired[key] = self._merge(self.__retired.get(key), value)
+        self.__shards = alive_shards
+
+    def collect(self):
+        """
+        合并所有分片
+
+        Returns:
+        - dict: 标签值元组到指标值的映射
+        """
+        with self.__lock:
+            self.__compact()
+            merged = {key: self._merge(None, value) for key, value in self.__retired.items()}
+            for _, shard in self.__shards:
+                for key, value in list(shard.items()):
+                    merged[key] = self._merge(merged.get(key), value)
+        return merged
+
+    def _merge(self, total, value):
+        raise NotImplementedError
+
+    def _format_labels(self, label_values, extra=()):
+        """
+        格式化标签
+
+        Returns:
+        - str: {name="value",...} 形式的标签，没有标签时返回 空字符串
+        """
+        pairs = list(zip(self.label_names, label_values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+class Counter(ShardedMetric):
+    """
+    只增不减的计数器
+    """
+
+    def inc(self, *label_values, amount=1):
+        """
+        计数器加 amount
+
+        Parameters:
+        - *label_values: 按 label_names 顺序排列的标签值
+        - amount (float): 增加的数量
+        """
+        shard = self._get_shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def _merge(self, total, value):
+        return value if total is None else total + value
+
+    def render(self):
+        """
+        导出为 Prometheus 文本格式
+
+        Returns:
+        - list: 文本行
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{self._format_labels(label_values)} {value}")
+        return lines
+
+
+class Histogram(ShardedMetric):
+    """
+    直方图，分片中每个标签组合保存 [各桶计数..., 超出最大桶的计数, 总和]
+    """
+
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Parameters:
+        - name (str): 指标名称
+        - documentation (str): 指标说明
+        - label_names (tuple): 标签名称
+        - buckets (tuple): 桶的上界，升序排列
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        """
+        记录一次观测值
+
+        Parameters:
+        - value (float): 观测值
+        - *label_values: 按 label_names 顺序排列的标签值
+        """
+        shard = self._get_shard()
+        counts = shard.get(label_values)
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 2)
+            shard[label_values] = counts
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, total, value):
+        if total is None:
+            return list(value)
+        for index, count in enumerate(value):
+            total[index] += count
+        return total
+
+    def render(self):
+        """
+        导出为 Prometheus 文本格式
+
+        Returns:
+        - list: 文本行
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, counts in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{self.name}_bucket{self._format_labels(label_values, (('le', le),))} {cumulative}")
+            labels = self._format_labels(label_values)
+            lines.append(f"{self.name}_sum{labels} {counts[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    指标注册表，负责统一导出所有指标，仪表类指标通过 collector 在导出时读取
+    """
+
+    def __init__(self):
+        self.__metrics = []
+        self.__collectors = []
+
+    def counter(self, name, documentation, label_names=()):
+        """
+        注册计数器
+
+        Returns:
+        - Counter: 计数器
+        """
+        counter = Counter(name, documentation, label_names)
+        self.__metrics.append(counter)
+        return counter
+
+    def histogram(self, name, documentation, label_names=(), buckets=Histogram.DEFAULT_BUCKETS):
+        """
+        注册直方图
+
+        Returns:
+        - Histogram: 直方图
+        """
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self.__metrics.append(histogram)
+        return histogram
+
+    def add_collector(self, collector):
+        """
+        注册导出时调用的 collector
+
+        Parameters:
+        - collector (Callable[[], list]): 返回 Prometheus 文本行的函数
+        """
+        self.__collectors.append(collector)
+
+    def render(self):
+        """
+        导出全部指标
+
+        Returns:
+        - str: Prometheus 文本格式的指标
+        """
+        lines = []
+        for metric in self.__metrics:
+            lines.extend(metric.render())
+        for collector in list(self.__collectors):
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+        return "\n".join(lines) + "\n"
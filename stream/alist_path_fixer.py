@@ -8,6 +8,7 @@ from typing import Tuple
 
 from log.log import logger
 from api.alist import AlistApi
+from config.config import Config
 from .base_path_fixer import BasePathFixer
 from utils.string_utils import StringUtils
 
@@ -15,16 +16,24 @@ from utils.string_utils import StringUtils
 # noinspection SpellCheckingInspection
 class AlistPathFixer(BasePathFixer):
 
+    __dir_pattern = re.compile(r'dir=(.*?)&MediaSourceId=', re.IGNORECASE)
+
     def fix(self) -> Tuple[str, bool]:
         if not self.emby_path or not isinstance(self.emby_path, str):
             return self.original_stream_url, True
 
-        fixed_stream_url = re.sub(r"^/*", "/", self.emby_path)
-        pattern = r'dir=(.*?)&MediaSourceId='
+        # 按挂载路径映射表把 Emby 路径替换为 Alist 中的存储路径
+        fixed_stream_url = Config().snapshot.path_mapper.map("/" + self.emby_path.lstrip("/"))
 
-        return StringUtils.dir_path_clean(pattern, fixed_stream_url), False
+        # 只有包含 = 的路径才可能匹配 dir=，绝大多数路径可以跳过正则查找
+        if "=" not in fixed_stream_url:
+            return fixed_stream_url, False
+        return StringUtils.dir_path_clean(self.__dir_pattern, fixed_stream_url), False
 
     def get_stream_url(self) -> str:
         fixed_path, _ = self.fix()
         return AlistApi(self.alist_url, self.alist_api_key).fetch_file_path(fixed_path)
-        
+
+    async def get_stream_url_async(self) -> str:
+        fixed_path, _ = self.fix()
+        return await AlistApi(self.alist_url, self.alist_api_key).fetch_file_path_async(fixed_path)
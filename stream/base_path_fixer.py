@@ -40,3 +40,6 @@ class BasePathFixer:
 
     def get_stream_url(self) -> str:
         pass
+
+    async def get_stream_url_async(self) -> str:
+        return self.get_stream_url()
@@ -4,14 +4,22 @@
 
 
 import json
-from flask import request, redirect
+import time
+from email.utils import formatdate
+from flask import Response, request, redirect
 
 from log.log import logger
+from api.alist import AlistApi
 from api.emby import EmbyApi
 from config.config import Config
+from metrics.metrics import metrics
+from utils import RequestUtils, StringUtils
+from utils.background_refresher import BackgroundRefresher
+from utils.rate_limiter import TokenBucketLimiter, get_client_ip
+from utils.backend_pool import BackendPool, BackendSpec
 from utils.commons import singleton
-from utils.date_utils import DateUtils
-from utils.types import RedirectMode
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+from utils.types import RedirectMode, RedirectOutcome, LibraryAction
 from .pilipili_path_fixer import PiliPiliPathFixer
 from .alist_path_fixer import AlistPathFixer
 
@@ -28,6 +36,19 @@ class Stream:
     __alist_api_key = None
     __emby_api = None
     __alist_api = None
+    __alist_pool = BackendPool("alist", ())
+    __stream_pool = BackendPool("stream", ())
+    __pool_settings = {}
+    __probe_request = RequestUtils(
+        session=RequestUtils.create_session(pool_connections=2, pool_maxsize=4),
+        timeout=(3.05, 5)
+    )
+    __single_flight = SingleFlight()
+    __async_single_flight = AsyncSingleFlight()
+    __preresolver = BackgroundRefresher("webhook-preresolve", max_workers=2, max_pending=64)
+    __refresher = None
+    __revalidate_window = 0
+    __rate_limiter = None
 
     __redirect_mode = RedirectMode.MISAKA
 
@@ -38,69 +59,699 @@ class Stream:
         backend_url, 
         backend_token, 
         alist_url, 
-        alist_api_key
+        alist_api_key,
+        alist_backends=(),
+        stream_backends=()
     ):
         """
-        初始化 Stream 对象
+        初始化 Stream 对象，并在配置重载后自动更新推流地址配置
+
+        alist_backends 与 stream_backends 为额外的 Alist 实例与 MISAKA 推流后端，
+        与 alist_url、backend_url 一起组成后端池，按延迟或权重选择并自动故障切换
+        """
+        self.__apply_settings(emby_url, emby_api_key, backend_url, backend_token, alist_url, alist_api_key,
+                              alist_backends, stream_backends)
+        self.__apply_revalidate_config(Config().snapshot)
+        self.__apply_rate_limit_config(Config().snapshot)
+        Config().add_reload_listener(self.apply_config)
+        metrics.add_cache_source("user_agent", Config().ua_matcher_stats)
+        metrics.add_backend_source("stream", self.backend_stats)
+
+    def __apply_settings(self, emby_url, emby_api_key, backend_url, backend_token, alist_url, alist_api_key,
+                         alist_backends=(), stream_backends=()):
+        """
+        设置推流地址配置，重建后端池并确定重定向模式
         """
         self.__emby_url = emby_url
         self.__emby_api_key = emby_api_key
-        self.__backend_url = backend_url
-        self.__backend_token = backend_token
         self.__emby_api = EmbyApi(emby_url, emby_api_key)
-        self.__redirect_mode = RedirectMode.MISAKA
-        if alist_url and alist_api_key:
-            self.__alist_url = alist_url
-            self.__alist_api_key = alist_api_key
-            self.__redirect_mode = RedirectMode.ALIST
-
-    def redirect_internal(self, url, item_id, media_source_id, api_key):
-        logger.info(f"[{item_id}] -> 开始处理推流请求，当前参数: {self.to_json()}")
-        headers = dict(request.headers)
-        if headers:
-            logger.info(f"[{item_id}] -> 请求头: {json.dumps(headers, ensure_ascii=False)}")
-        user_agent = request.headers.get("User-Agent", "")
-        logger.info(f"[{item_id}] -> 当前UA：{user_agent}")
-
-        is_allowed = Config().is_allowed_user_agent(user_agent)
-        emby_path = self.__emby_api.fetch_file_path(item_id, media_source_id, api_key)
 
-        if not is_allowed:
-            logger.info(
-                f"[{item_id}] -> 当前UA不被允许，播放PiliPili Sorry -> {Config().forbidden_ua_stream_path}"
+        stream_specs = (BackendSpec(backend_url, backend_token, 1),) if backend_url else ()
+        self.__stream_pool = self.__replace_pool(self.__stream_pool, stream_specs + tuple(stream_backends),
+                                                 self.__probe_stream_backend)
+        alist_specs = (BackendSpec(alist_url, alist_api_key, 1),) if alist_url and alist_api_key else ()
+        self.__alist_pool = self.__replace_pool(self.__alist_pool, alist_specs + tuple(alist_backends),
+                                                self.__probe_alist)
+
+        stream_backend = self.__stream_pool.primary
+        self.__backend_url = stream_backend.url if stream_backend else backend_url
+        self.__backend_token = stream_backend.credential if stream_backend else backend_token
+        alist_backend = self.__alist_pool.primary
+        self.__alist_url = alist_backend.url if alist_backend else None
+        self.__alist_api_key = alist_backend.credential if alist_backend else None
+        self.__redirect_mode = RedirectMode.ALIST if alist_backend else RedirectMode.MISAKA
+
+    def __replace_pool(self, pool, specs, probe):
+        """
+        后端列表或选择策略变化时创建新的后端池并停止旧后端池的健康检查，否则保留原有的延迟与健康状态
+
+        Parameters:
+        - pool (BackendPool): 当前的后端池
+        - specs (tuple): 后端配置，相同地址只保留第一个
+        - probe (Callable[[Backend], bool]): 健康检查函数
+
+        Returns:
+        - BackendPool: 后端池
+        """
+        snapshot = Config().snapshot
+        unique_specs = {}
+        for spec in specs:
+            unique_specs.setdefault(spec.url, spec)
+        settings = (tuple(unique_specs.values()), snapshot.backend_selection,
+                    snapshot.backend_health_check_interval, snapshot.backend_failure_threshold)
+        if self.__pool_settings.get(pool.name) == settings:
+            return pool
+
+        pool.stop()
+        new_pool = BackendPool(pool.name, settings[0], selection=settings[1], failure_threshold=settings[3])
+        new_pool.start_health_checks(probe, settings[2])
+        self.__pool_settings[pool.name] = settings
+        return new_pool
+
+    @staticmethod
+    def __probe_alist(backend):
+        """
+        Alist 健康检查
+        """
+        return AlistApi(backend.url, backend.credential).ping()
+
+    @classmethod
+    def __probe_stream_backend(cls, backend):
+        """
+        MISAKA 推流后端健康检查：请求后端根地址，能连接且未返回 5xx 即视为可达
+        """
+        response = cls.__probe_request.get_res(backend.url, allow_redirects=False)
+        return response is not None and response.status_code < 500
+
+    def backend_stats(self):
+        """
+        获取各后端池中后端的运行状态
+
+        Returns:
+        - dict: 后端池名称到后端状态列表的映射
+        """
+        return {
+            self.__alist_pool.name: self.__alist_pool.stats(),
+            self.__stream_pool.name: self.__stream_pool.stats()
+        }
+
+    def apply_config(self, snapshot):
+        """
+        应用配置快照中的推流地址配置
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        self.__apply_settings(*snapshot.redirect_settings)
+        self.__apply_revalidate_config(snapshot)
+        self.__apply_rate_limit_config(snapshot)
+
+    @classmethod
+    def __apply_rate_limit_config(cls, snapshot):
+        """
+        应用限流配置，配置不变时保留已有的令牌桶
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        if snapshot.rate_limit_per_minute <= 0:
+            cls.__rate_limiter = None
+            return
+        settings = (snapshot.rate_limit_per_minute / 60, float(snapshot.rate_limit_burst),
+                    snapshot.rate_limit_max_clients)
+        if cls.__rate_limiter is None or cls.__rate_limiter.settings != settings:
+            cls.__rate_limiter = TokenBucketLimiter(*settings)
+
+    @classmethod
+    def __get_rate_limit_keys(cls, api_key, client_ip, snapshot):
+        """
+        获取请求的限流键：客户端 IP，以及客户端自带的 API 密钥（使用默认密钥的请求只按 IP 限流）
+
+        Returns:
+        - tuple: 限流键，未开启限流时返回 空元组
+        """
+        if cls.__rate_limiter is None:
+            return ()
+        keys = (("ip", client_ip),) if client_ip else ()
+        if api_key and api_key != snapshot.emby_api_key:
+            keys += (("api_key", api_key),)
+        return keys
+
+    @classmethod
+    def __is_rate_limited(cls, rate_limit_keys):
+        """
+        请求需要访问上游时消耗令牌
+
+        Parameters:
+        - rate_limit_keys (tuple): 限流键
+
+        Returns:
+        - bool: 令牌不足时返回 True
+        """
+        rate_limiter = cls.__rate_limiter
+        return bool(rate_limit_keys) and rate_limiter is not None and not rate_limiter.acquire(rate_limit_keys)
+
+    @property
+    def retry_after(self):
+        """
+        获取被限流后建议的重试间隔
+
+        Returns:
+        - int: 重试间隔（秒）
+        """
+        rate_limiter = self.__rate_limiter
+        return rate_limiter.retry_after if rate_limiter is not None else 1
+
+    @classmethod
+    def __apply_revalidate_config(cls, snapshot):
+        """
+        应用提前刷新配置，线程数变化时替换后台刷新线程池，旧线程池中已提交的任务继续执行
+
+        Parameters:
+        - snapshot (ConfigSnapshot): 配置快照
+        """
+        cls.__revalidate_window = snapshot.stale_while_revalidate_window
+        workers = snapshot.stale_while_revalidate_workers
+        if cls.__refresher is not None and cls.__refresher.settings[0] == workers:
+            return
+        if cls.__refresher is not None:
+            cls.__refresher.shutdown()
+        cls.__refresher = BackgroundRefresher("stale-revalidate", max_workers=workers, max_pending=workers * 16)
+
+    @classmethod
+    def __revalidate(cls, cache, remaining, key, func, *args):
+        """
+        缓存条目的剩余有效期不足提前刷新窗口时，提交后台刷新任务，同一个键同时最多只有一个刷新任务
+
+        Parameters:
+        - cache (str): 缓存名称，用于指标
+        - remaining (float): 条目的剩余有效期（秒）
+        - key: 刷新任务的键
+        - func (Callable): 刷新函数，不经过缓存请求上游并写入缓存
+        - args: 函数的参数
+        """
+        if remaining > cls.__revalidate_window:
+            return
+        metrics.observe_revalidation(cache, cls.__refresher.submit(key, func, *args))
+
+    def redirect_internal(self, url, item_id, media_source_id, api_key, route=""):
+        """
+        处理 Flask 推流请求，返回重定向响应
+
+        Parameters:
+        - url (str): 原始请求 URL
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str): Emby API 密钥
+        - route (str, optional): 客户端请求的路由，用于指标标签
+
+        Returns:
+        - Response: 重定向响应，客户端被限流时返回 429
+        """
+        stream_url, cache_headers = self.resolve_stream_url(
+            url=url,
+            item_id=item_id,
+            media_source_id=media_source_id,
+            api_key=api_key,
+            user_agent=request.headers.get("User-Agent", ""),
+            headers=dict(request.headers),
+            route=route,
+            client_ip=get_client_ip(request.headers.get("X-Real-IP"), request.headers.get("X-Forwarded-For"),
+                                    request.remote_addr, Config().snapshot.trusted_proxies)
+        )
+        if stream_url is None:
+            return Response("Too Many Requests", status=429, headers={"Retry-After": str(self.retry_after)})
+        response = redirect(stream_url)
+        response.headers.extend(cache_headers)
+        return response
+
+    def resolve_stream_url(self, url, item_id, media_source_id, api_key, user_agent, headers=None,
+                           route="", client_ip=""):
+        """
+        解析推流地址，不依赖具体的 Web 框架
+
+        Parameters:
+        - url (str): 原始请求 URL
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str): Emby API 密钥
+        - user_agent (str): 客户端 UA
+        - headers (dict, optional): 请求头，仅用于日志
+        - route (str, optional): 客户端请求的路由，用于指标标签
+        - client_ip (str, optional): 客户端 IP，用于限流
+
+        Returns:
+        - tuple: (推流 URL，客户端请求上游过于频繁被限流时为 None, 重定向响应的缓存相关响应头)
+        """
+        started = time.perf_counter()
+        snapshot = Config().snapshot
+        redirect_mode = self.__redirect_mode
+        alist_pool = self.__alist_pool
+        emby_path, is_forbidden = self.__prepare_emby_path(item_id, user_agent, headers, snapshot)
+        is_placeholder = bool(emby_path)
+        stages = {"ua_check": time.perf_counter() - started}
+        rate_limit_keys = self.__get_rate_limit_keys(api_key, client_ip, snapshot)
+
+        # 没有被替换为特殊视频时才需要查询 Emby，同一媒体源的并发请求共享一次查询；
+        # 只有需要请求上游时才消耗令牌，每个请求最多消耗一次
+        if not emby_path:
+            if rate_limit_keys and not EmbyApi.is_cached(item_id, media_source_id):
+                if self.__is_rate_limited(rate_limit_keys):
+                    return self.__reject(item_id, redirect_mode, route, started, stages)
+                rate_limit_keys = ()
+            emby_started = time.perf_counter()
+            emby_path = self.__single_flight.do(
+                ("emby", item_id, media_source_id),
+                self.__fetch_file_path,
+                item_id,
+                media_source_id,
+                api_key
             )
-            emby_path = Config().forbidden_ua_stream_path if\
-                Config().forbidden_ua_stream_path else emby_path
-        if DateUtils.is_today_national_memorial_day():
-            logger.info(
-                f"[{item_id}] -> 当前为国家公祭日时间，播放爱国主义教育视频 -> {Config().national_memorial_day_stream_path}"
+            stages["emby_playback_info"] = time.perf_counter() - emby_started
+
+        if not emby_path:
+            logger.info("[%s] -> 未获取到 EmbyPath", item_id)
+            self.__observe_redirect(redirect_mode, route, RedirectOutcome.NO_PATH, started, stages)
+            return snapshot.forbidden_ua_stream_path, \
+                self.__get_cache_headers(snapshot.forbidden_ua_stream_path, True, False, snapshot)
+
+        fix_started = time.perf_counter()
+        path_fixer = self.__create_path_fixer(url, item_id, media_source_id, emby_path, redirect_mode)
+        if redirect_mode == RedirectMode.ALIST:
+            alist_path = path_fixer.fix()[0]
+            stages["path_fix"] = time.perf_counter() - fix_started
+            if rate_limit_keys and not AlistApi.is_cached(alist_path) and self.__is_rate_limited(rate_limit_keys):
+                return self.__reject(item_id, redirect_mode, route, started, stages)
+            alist_started = time.perf_counter()
+            stream_url, url_validity = self.__single_flight.do(
+                ("alist", emby_path), self.__fetch_raw_url, alist_pool, alist_path
             )
-            emby_path = Config().national_memorial_day_stream_path if\
-                Config().national_memorial_day_stream_path else emby_path
-        if DateUtils.is_today_september_18th_incident():
-            logger.info(
-                f"[{item_id}] -> 当前为9·18纪念日时间，播放爱国主义教育视频 -> {Config().september_18th_incident_stream_path}"
+            stages["alist_fs_get"] = time.perf_counter() - alist_started
+        else:
+            stream_url, url_validity = path_fixer.get_stream_url(), None
+            stages["path_fix"] = time.perf_counter() - fix_started
+        logger.info("[%s] -> 推流URL：%s\n\n", item_id, stream_url)
+        self.__observe_redirect(redirect_mode, route, self.__get_outcome(stream_url, is_forbidden), started, stages)
+        is_shareable = redirect_mode == RedirectMode.ALIST
+        return stream_url, self.__get_cache_headers(stream_url, is_placeholder, is_shareable, snapshot, url_validity)
+
+    async def resolve_stream_url_async(self, url, item_id, media_source_id, api_key, user_agent, headers=None,
+                                       route="", client_ip=""):
+        """
+        resolve_stream_url 的异步版本，供 ASGI 模式使用
+
+        Parameters:
+        - url (str): 原始请求 URL
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str): Emby API 密钥
+        - user_agent (str): 客户端 UA
+        - headers (dict, optional): 请求头，仅用于日志
+        - route (str, optional): 客户端请求的路由，用于指标标签
+        - client_ip (str, optional): 客户端 IP，用于限流
+
+        Returns:
+        - tuple: (推流 URL，客户端请求上游过于频繁被限流时为 None, 重定向响应的缓存相关响应头)
+        """
+        started = time.perf_counter()
+        snapshot = Config().snapshot
+        redirect_mode = self.__redirect_mode
+        alist_pool = self.__alist_pool
+        emby_path, is_forbidden = self.__prepare_emby_path(item_id, user_agent, headers, snapshot)
+        is_placeholder = bool(emby_path)
+        stages = {"ua_check": time.perf_counter() - started}
+        rate_limit_keys = self.__get_rate_limit_keys(api_key, client_ip, snapshot)
+
+        if not emby_path:
+            if rate_limit_keys and not EmbyApi.is_cached(item_id, media_source_id):
+                if self.__is_rate_limited(rate_limit_keys):
+                    return self.__reject(item_id, redirect_mode, route, started, stages)
+                rate_limit_keys = ()
+            emby_started = time.perf_counter()
+            emby_path = await self.__async_single_flight.do(
+                ("emby", item_id, media_source_id),
+                self.__fetch_file_path_async,
+                item_id,
+                media_source_id,
+                api_key
             )
-            emby_path = Config().september_18th_incident_stream_path if\
-                Config().september_18th_incident_stream_path else emby_path
+            stages["emby_playback_info"] = time.perf_counter() - emby_started
 
         if not emby_path:
-            logger.info(f"[{item_id}] -> 未获取到 EmbyPath")
-            return redirect(Config().forbidden_ua_stream_path)
+            logger.info("[%s] -> 未获取到 EmbyPath", item_id)
+            self.__observe_redirect(redirect_mode, route, RedirectOutcome.NO_PATH, started, stages)
+            return snapshot.forbidden_ua_stream_path, \
+                self.__get_cache_headers(snapshot.forbidden_ua_stream_path, True, False, snapshot)
+
+        fix_started = time.perf_counter()
+        path_fixer = self.__create_path_fixer(url, item_id, media_source_id, emby_path, redirect_mode)
+        if redirect_mode == RedirectMode.ALIST:
+            alist_path = path_fixer.fix()[0]
+            stages["path_fix"] = time.perf_counter() - fix_started
+            if rate_limit_keys and not AlistApi.is_cached(alist_path) and self.__is_rate_limited(rate_limit_keys):
+                return self.__reject(item_id, redirect_mode, route, started, stages)
+            alist_started = time.perf_counter()
+            stream_url, url_validity = await self.__async_single_flight.do(
+                ("alist", emby_path), self.__fetch_raw_url_async, alist_pool, alist_path
+            )
+            stages["alist_fs_get"] = time.perf_counter() - alist_started
+        else:
+            stream_url, url_validity = await path_fixer.get_stream_url_async(), None
+            stages["path_fix"] = time.perf_counter() - fix_started
+        logger.info("[%s] -> 推流URL：%s\n\n", item_id, stream_url)
+        self.__observe_redirect(redirect_mode, route, self.__get_outcome(stream_url, is_forbidden), started, stages)
+        is_shareable = redirect_mode == RedirectMode.ALIST
+        return stream_url, self.__get_cache_headers(stream_url, is_placeholder, is_shareable, snapshot, url_validity)
+
+    def __fetch_file_path(self, item_id, media_source_id, api_key):
+        """
+        获取文件路径：优先读取文件路径缓存，条目即将过期时仍直接返回，并在后台刷新；
+        未缓存且没有负缓存时请求 Emby
+
+        Parameters:
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str): Emby API 密钥
+
+        Returns:
+        - str: 文件路径，获取失败时返回 空字符串
+        """
+        emby_api = self.__emby_api
+        emby_path, remaining = EmbyApi.get_cached_path(item_id, media_source_id)
+        if emby_path is not None:
+            self.__revalidate("emby_path", remaining, ("emby", item_id, media_source_id),
+                              emby_api.refresh_file_path, item_id, media_source_id, api_key)
+            return emby_path
+        if not item_id or not media_source_id or EmbyApi.get_cached_failure(item_id, media_source_id) is not None:
+            return ""
+        return emby_api.refresh_file_path(item_id, media_source_id, api_key)
+
+    async def __fetch_file_path_async(self, item_id, media_source_id, api_key):
+        """
+        __fetch_file_path 的异步版本，后台刷新仍在刷新线程池中同步执行
 
-        logger.info(f"[{item_id}] -> EmbyPath -> {emby_path}")
+        Parameters:
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - api_key (str): Emby API 密钥
 
-        if self.__redirect_mode == RedirectMode.MISAKA:
+        Returns:
+        - str: 文件路径，获取失败时返回 空字符串
+        """
+        emby_api = self.__emby_api
+        emby_path, remaining = EmbyApi.get_cached_path(item_id, media_source_id)
+        if emby_path is not None:
+            self.__revalidate("emby_path", remaining, ("emby", item_id, media_source_id),
+                              emby_api.refresh_file_path, item_id, media_source_id, api_key)
+            return emby_path
+        if not item_id or not media_source_id or EmbyApi.get_cached_failure(item_id, media_source_id) is not None:
+            return ""
+        return await emby_api.refresh_file_path_async(item_id, media_source_id, api_key)
+
+    @classmethod
+    def __fetch_raw_url(cls, alist_pool, alist_path):
+        """
+        获取直链：优先读取直链缓存与负缓存，条目即将过期时仍直接返回，并在后台刷新；
+        否则按后端池的选择顺序请求 Alist
+
+        Parameters:
+        - alist_pool (BackendPool): Alist 后端池
+        - alist_path (str): Alist 文件路径
+
+        Returns:
+        - tuple: (直链，获取失败时为 空字符串, 本服务认为直链仍然有效的剩余时间（秒）)
+        """
+        if not alist_path:
+            return "", 0
+        raw_url, remaining = AlistApi.get_cached_raw_url_with_ttl(alist_path)
+        if raw_url is not None:
+            cls.__revalidate("alist_raw_url", remaining, ("alist", alist_path),
+                             cls.__request_raw_url, alist_pool, alist_path)
+            return raw_url, remaining
+        if AlistApi.get_cached_failure(alist_path) is not None:
+            return "", 0
+        return cls.__request_raw_url(alist_pool, alist_path), cls.__get_fresh_raw_url_validity()
+
+    @staticmethod
+    def __get_fresh_raw_url_validity():
+        """
+        获取刚从 Alist 获取的直链的剩余有效期，与直链缓存的有效期一致；
+        直链自带的过期时间在生成缓存响应头时另行计算
+
+        Returns:
+        - float: 剩余有效期（秒）
+        """
+        snapshot = Config().snapshot
+        return snapshot.alist_raw_url_cache_ttl - snapshot.alist_raw_url_expire_margin
+
+    @classmethod
+    def __request_raw_url(cls, alist_pool, alist_path):
+        """
+        不经过直链缓存，按后端池的选择顺序请求 Alist，不可达时切换到下一个实例，全部失败时写入负缓存
+
+        Parameters:
+        - alist_pool (BackendPool): Alist 后端池
+        - alist_path (str): Alist 文件路径
+
+        Returns:
+        - str: 直链，获取失败时返回 空字符串
+        """
+        raw_url, reachable = alist_pool.execute(
+            lambda backend: cls.__request_hedged(alist_pool, backend, alist_path)
+        )
+        if not raw_url:
+            AlistApi.cache_failure(alist_path, reachable)
+        return raw_url or ""
+
+    @classmethod
+    async def __fetch_raw_url_async(cls, alist_pool, alist_path):
+        """
+        __fetch_raw_url 的异步版本
+
+        Parameters:
+        - alist_pool (BackendPool): Alist 后端池
+        - alist_path (str): Alist 文件路径
+
+        Returns:
+        - tuple: (直链，获取失败时为 空字符串, 本服务认为直链仍然有效的剩余时间（秒）)
+        """
+        if not alist_path:
+            return "", 0
+        raw_url, remaining = AlistApi.get_cached_raw_url_with_ttl(alist_path)
+        if raw_url is not None:
+            cls.__revalidate("alist_raw_url", remaining, ("alist", alist_path),
+                             cls.__request_raw_url, alist_pool, alist_path)
+            return raw_url, remaining
+        if AlistApi.get_cached_failure(alist_path) is not None:
+            return "", 0
+        raw_url, reachable = await alist_pool.execute_async(
+            lambda backend: cls.__request_hedged_async(alist_pool, backend, alist_path)
+        )
+        if not raw_url:
+            AlistApi.cache_failure(alist_path, reachable)
+        return raw_url or "", cls.__get_fresh_raw_url_validity()
+
+    @classmethod
+    def __request_hedged(cls, alist_pool, backend, alist_path):
+        """
+        向 backend 请求直链，超过对冲延迟时向后端池中的另一个健康实例发出对冲请求
+
+        Parameters:
+        - alist_pool (BackendPool): Alist 后端池
+        - backend (Backend): 当前请求的 Alist 实例
+        - alist_path (str): Alist 文件路径
+
+        Returns:
+        - tuple: BackendPool.execute 的请求函数返回值，采用对冲请求的结果时附带 (实际返回结果的实例, 其耗时)
+        """
+        alternate = alist_pool.alternate(backend)
+        raw_url, reachable, hedge_seconds = AlistApi(backend.url, backend.credential).fetch_raw_url_hedged(
+            alist_path, cls.__get_alternate_api(backend, alternate)
+        )
+        if hedge_seconds is None:
+            return raw_url, reachable
+        return raw_url, reachable, (alternate, hedge_seconds)
+
+    @classmethod
+    async def __request_hedged_async(cls, alist_pool, backend, alist_path):
+        """
+        __request_hedged 的异步版本
+        """
+        alternate = alist_pool.alternate(backend)
+        raw_url, reachable, hedge_seconds = await AlistApi(
+            backend.url, backend.credential
+        ).fetch_raw_url_hedged_async(alist_path, cls.__get_alternate_api(backend, alternate))
+        if hedge_seconds is None:
+            return raw_url, reachable
+        return raw_url, reachable, (alternate, hedge_seconds)
+
+    @staticmethod
+    def __get_alternate_api(backend, alternate):
+        """
+        获取发送对冲请求的 Alist 实例
+
+        Parameters:
+        - backend (Backend): 当前请求的 Alist 实例
+        - alternate (Backend): 后端池选出的对冲实例
+
+        Returns:
+        - AlistApi: Alist API 对象，与当前实例相同时返回 None
+        """
+        return AlistApi(alternate.url, alternate.credential) if alternate is not backend else None
+
+    def __prepare_emby_path(self, item_id, user_agent, headers, snapshot):
+        """
+        记录请求信息，并根据 UA 与替换时间表判断是否需要替换为特殊视频
+
+        Parameters:
+        - item_id (str): 媒体文件的唯一标识符
+        - user_agent (str): 客户端 UA
+        - headers (dict): 请求头，仅用于日志
+        - snapshot (ConfigSnapshot): 本次请求使用的配置快照
+
+        Returns:
+        - tuple: (需要替换的特殊视频路径，无需替换时为 空字符串, 是否因 UA 不被允许而替换为禁止播放视频)
+        """
+        if logger.is_enabled_for("debug"):
+            logger.debug("[%s] -> 开始处理推流请求，当前参数: %s", item_id, self.to_json())
+            if headers and snapshot.log_request_headers:
+                logger.debug("[%s] -> 请求头: %s", item_id, json.dumps(headers, ensure_ascii=False))
+        logger.info("[%s] -> 当前UA：%s", item_id, user_agent)
+
+        is_allowed = snapshot.ua_matcher.is_allowed(user_agent)
+        emby_path = ""
+
+        if not is_allowed:
+            logger.info(
+                "[%s] -> 当前UA不被允许，播放PiliPili Sorry -> %s", item_id, snapshot.forbidden_ua_stream_path
+            )
+            emby_path = snapshot.forbidden_ua_stream_path if\
+                snapshot.forbidden_ua_stream_path else emby_path
+        is_forbidden = bool(emby_path)
+        override = snapshot.override_schedule.current()
+        if override is not None:
+            logger.info("[%s] -> 当前为%s时间，播放特殊视频 -> %s", item_id, override.name, override.stream_path)
+            emby_path = override.stream_path
+            is_forbidden = False
+        return emby_path, is_forbidden
+
+    @staticmethod
+    def __get_outcome(stream_url, is_forbidden):
+        """
+        根据推流地址判断重定向结果
+
+        Parameters:
+        - stream_url (str): 推流 URL
+        - is_forbidden (bool): 是否因 UA 不被允许而替换为禁止播放视频
+
+        Returns:
+        - RedirectOutcome: 重定向结果
+        """
+        if is_forbidden:
+            return RedirectOutcome.FORBIDDEN
+        return RedirectOutcome.REDIRECTED if stream_url else RedirectOutcome.UPSTREAM_ERROR
+
+    @classmethod
+    def __reject(cls, item_id, redirect_mode, route, started, stages):
+        """
+        拒绝被限流的请求
+
+        Returns:
+        - tuple: (None, 空元组)，表示请求被限流
+        """
+        logger.info("[%s] -> 客户端请求上游过于频繁，已限流", item_id)
+        cls.__observe_redirect(redirect_mode, route, RedirectOutcome.RATE_LIMITED, started, stages)
+        return None, ()
+
+    @staticmethod
+    def __get_cache_headers(stream_url, is_placeholder, is_shareable, snapshot, url_validity=None):
+        """
+        生成重定向响应的 Cache-Control 与 Expires，使客户端与 nginx 在直链有效期内不必重复请求
+
+        - ALIST 模式下正常的推流 URL 允许共享缓存，缓存时间不超过本服务认为直链仍然有效的时间（直链缓存条目的剩余有效期）
+          与直链自带的过期时间（都已减去提前过期的余量）；是否禁止播放取决于 UA，因此按 User-Agent 区分缓存
+        - MISAKA 模式下推流 URL 由请求 URL 拼接而成，同一媒体源的不同路由与参数对应不同的推流 URL，只允许客户端缓存
+        - 禁止播放与特殊视频只允许客户端短暂缓存
+        - 缓存时间都不超过下一次特殊视频时段的切换时间，切换后 nginx 与客户端不会继续使用切换前的重定向
+        - 获取推流 URL 失败时不允许缓存
+
+        Parameters:
+        - stream_url (str): 推流 URL
+        - is_placeholder (bool): 是否为禁止播放或特殊视频
+        - is_shareable (bool): 推流 URL 是否只取决于媒体源，可以由 nginx 按媒体源共享缓存
+        - snapshot (ConfigSnapshot): 本次请求使用的配置快照
+        - url_validity (float, optional): 本服务认为推流 URL 仍然有效的剩余时间（秒），未知时为 None
+
+        Returns:
+        - tuple: 响应头 (名称, 值) 列表，未开启时为 空元组
+        """
+        max_age = snapshot.redirect_cache_max_age
+        if max_age <= 0:
+            return ()
+        now = time.time()
+        limits = [max_age, snapshot.override_schedule.next_transition(now) - now]
+        if is_placeholder:
+            limits.append(snapshot.redirect_cache_placeholder_max_age)
+        else:
+            if url_validity is not None:
+                limits.append(url_validity)
+            expire_time = StringUtils.get_url_expire_time(stream_url)
+            if expire_time is not None:
+                limits.append(expire_time - now - snapshot.alist_raw_url_expire_margin)
+        max_age = int(min(limits))
+        if not stream_url or max_age <= 0:
+            return (("Cache-Control", "no-store"),)
+        expires = ("Expires", formatdate(now + max_age, usegmt=True))
+        if is_placeholder or not is_shareable:
+            return ("Cache-Control", f"private, max-age={max_age}"), expires
+        return ("Cache-Control", f"public, max-age={max_age}"), expires, ("Vary", "User-Agent")
+
+    @staticmethod
+    def __observe_redirect(redirect_mode, route, outcome, started, stages):
+        """
+        记录推流重定向指标
+
+        Parameters:
+        - redirect_mode (RedirectMode): 本次请求使用的重定向模式
+        - route (str): 客户端请求的路由
+        - outcome (RedirectOutcome): 重定向结果
+        - started (float): 请求开始处理的 perf_counter 时间
+        - stages (dict): 各阶段耗时
+        """
+        stages["total"] = time.perf_counter() - started
+        metrics.observe_redirect(redirect_mode.value, route, outcome.value, stages)
+
+    def __create_path_fixer(self, url, item_id, media_source_id, emby_path, redirect_mode):
+        """
+        根据重定向模式创建路径修复器
+
+        Parameters:
+        - url (str): 原始请求 URL
+        - item_id (str): 媒体文件的唯一标识符
+        - media_source_id (str): 媒体源的 ID
+        - emby_path (str): Emby 文件路径
+        - redirect_mode (RedirectMode): 本次请求使用的重定向模式
+
+        Returns:
+        - BasePathFixer: 路径修复器
+        """
+        logger.info("[%s] -> EmbyPath -> %s", item_id, emby_path)
+
+        if redirect_mode == RedirectMode.MISAKA:
+            # MISAKA 模式下由推流后端完成推流，只需按延迟或权重选择一个健康的后端
+            backend = self.__stream_pool.select()
+            backend_url = backend.url if backend else self.__backend_url
+            backend_token = backend.credential if backend else self.__backend_token
             path_fixer = PiliPiliPathFixer(
                 url, 
-                self.__backend_url, 
-                self.__backend_token,
+                backend_url, 
+                backend_token,
                 None,
                 None,
                 emby_path, 
                 media_source_id
             )
-            logger.info(f"[{item_id}] -> 推流后端URL：{self.__backend_url} -> 推流后端Token：{self.__backend_token}")
+            logger.info("[%s] -> 推流后端URL：%s -> 推流后端Token：%s", item_id, backend_url, backend_token)
         else:
             path_fixer = AlistPathFixer(
                 url, 
@@ -111,12 +762,88 @@ class Stream:
                 emby_path, 
                 None
             )
-            logger.info(f"[{item_id}] -> EmbyPath -> {emby_path} -> "
-                        f"推流后端URL：{self.__alist_url} -> 推流后端Token：{self.__alist_api_key}")
+            logger.info("[%s] -> EmbyPath -> %s -> 推流后端URL：%s -> 推流后端Token：%s",
+                        item_id, emby_path, self.__alist_url, self.__alist_api_key)
+        return path_fixer
+
+    def handle_library_event(self, library_event):
+        """
+        处理媒体库变更通知：删除该媒体全部媒体源的文件路径缓存与对应的直链缓存，
+        开启 webhook_preresolve 时在后台重新解析新入库或更新的媒体
+
+        Parameters:
+        - library_event (LibraryEvent): 媒体库变更
+
+        Returns:
+        - dict: 处理结果
+        """
+        item_id = library_event.item_id
+        source_ids = [source_id for source_id, _ in library_event.media_sources]
+        emby_paths = set(EmbyApi.invalidate_item(item_id, source_ids))
+        emby_paths.update(source_path for _, source_path in library_event.media_sources if source_path)
+
+        raw_url_count = 0
+        for emby_path in emby_paths:
+            if AlistApi.invalidate_path(self.__get_alist_path(emby_path)):
+                raw_url_count += 1
+
+        # 预解析任务按媒体去重且数量有上限，大量通知同时到达时丢弃多余的任务
+        preresolve = Config().webhook_preresolve and library_event.action != LibraryAction.DELETED
+        if preresolve:
+            preresolve = self.__preresolver.submit(
+                item_id, self.__preresolve, item_id, self.__redirect_mode
+            ) != BackgroundRefresher.DROPPED
+            if not preresolve:
+                logger.warning("[%s] -> 预解析任务过多，已跳过本次预解析", item_id)
+        logger.info("[%s] -> 收到媒体库变更通知：%s，删除路径缓存 %d 条，直链缓存 %d 条",
+                    item_id, library_event.event, len(emby_paths), raw_url_count)
+        return {
+            "event": library_event.event,
+            "action": library_event.action.value,
+            "item_id": item_id,
+            "invalidated_paths": len(emby_paths),
+            "invalidated_raw_urls": raw_url_count,
+            "preresolve": preresolve
+        }
 
-        stream_url = path_fixer.get_stream_url()
-        logger.info(f"[{item_id}] -> 推流URL：{stream_url}\n\n")
-        return redirect(stream_url)
+    def __preresolve(self, item_id, redirect_mode):
+        """
+        重新获取媒体全部媒体源的文件路径，ALIST 模式下同时获取直链，结果写入缓存
+
+        Parameters:
+        - item_id (str): 媒体文件的唯一标识符
+        - redirect_mode (RedirectMode): 收到通知时的重定向模式
+        """
+        try:
+            source_paths = self.__emby_api.refresh_item(item_id)
+            if redirect_mode == RedirectMode.ALIST:
+                for emby_path in set(source_paths.values()):
+                    if emby_path:
+                        self.__fetch_raw_url(self.__alist_pool, self.__get_alist_path(emby_path))
+            logger.info("[%s] -> 预解析完成，媒体源 %d 个", item_id, len(source_paths))
+        except Exception as e:
+            logger.error("[%s] -> 预解析出错：%s", item_id, str(e))
+
+    @staticmethod
+    def __get_alist_path(emby_path):
+        """
+        获取 Emby 文件路径在 Alist 中的路径，即直链缓存的键
+
+        Parameters:
+        - emby_path (str): Emby 文件路径
+
+        Returns:
+        - str: Alist 文件路径
+        """
+        return AlistPathFixer(None, None, None, None, None, emby_path, None).fix()[0]
+
+    @classmethod
+    async def aclose(cls):
+        """
+        关闭异步模式下的上游连接池
+        """
+        await EmbyApi.aclose()
+        await AlistApi.aclose()
 
     def to_json(self):
         return {
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import io
+import hmac
+import json
+from collections import namedtuple
+
+from werkzeug.formparser import parse_form_data
+
+from log.log import logger
+from config.config import Config
+from utils.types import LibraryAction
+
+# Emby Webhook 事件名称到处理方式的映射，其余事件（播放、评分等）与文件路径无关，直接忽略
+LIBRARY_EVENTS = {
+    "library.new": LibraryAction.NEW,
+    "item.added": LibraryAction.NEW,
+    "item.updated": LibraryAction.UPDATED,
+    "library.updated": LibraryAction.UPDATED,
+    "item.deleted": LibraryAction.DELETED,
+    "library.deleted": LibraryAction.DELETED,
+}
+
+LibraryEvent = namedtuple("LibraryEvent", ("event", "action", "item_id", "media_sources"))
+LibraryEvent.__doc__ = """
+媒体库变更通知
+
+Attributes:
+- event (str): Emby 事件名称
+- action (LibraryAction): 处理方式
+- item_id (str): 媒体文件的 ID
+- media_sources (tuple): 通知中携带的媒体源 ((媒体源 ID, 文件路径), ...)
+"""
+
+
+def is_valid_webhook_token(expected_token, token):
+    """
+    校验 Webhook 令牌，未配置令牌时拒绝所有请求
+
+    Parameters:
+    - expected_token (str): 配置中的令牌
+    - token (str): 请求携带的令牌，来自 token 查询参数或 X-Webhook-Token 请求头
+
+    Returns:
+    - bool: 是否通过校验
+    """
+    if not expected_token:
+        return False
+    return hmac.compare_digest(expected_token.encode("utf-8"), (token or "").encode("utf-8"))
+
+
+def parse_webhook_payload(content_type, body):
+    """
+    解析 Emby Webhook 请求体，支持 application/json，以及旧版本 Emby 使用的、
+    将 JSON 放在 data 字段中的 multipart/form-data 与 application/x-www-form-urlencoded
+
+    Parameters:
+    - content_type (str): 请求的 Content-Type
+    - body (bytes): 请求体
+
+    Returns:
+    - dict: 通知内容，无法解析时返回 None
+    """
+    content_type = content_type or ""
+    data = body
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": content_type,
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+        _, form, _ = parse_form_data(environ)
+        data = form.get("data")
+        if data is None:
+            return None
+    try:
+        payload = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def parse_library_event(payload):
+    """
+    从通知内容中提取媒体库变更
+
+    Parameters:
+    - payload (dict): parse_webhook_payload 的返回值
+
+    Returns:
+    - LibraryEvent: 媒体库变更，与文件路径无关的事件或缺少媒体 ID 时返回 None
+    """
+    event = str(payload.get("Event") or "").strip().lower()
+    action = LIBRARY_EVENTS.get(event)
+    item = payload.get("Item")
+    if action is None or not isinstance(item, dict):
+        return None
+
+    item_id = item.get("Id")
+    if not item_id or not isinstance(item_id, (str, int)):
+        return None
+
+    media_sources = []
+    for media_source in item.get("MediaSources") or []:
+        if not isinstance(media_source, dict):
+            continue
+        source_id = media_source.get("Id")
+        source_path = media_source.get("Path")
+        if source_id and isinstance(source_id, str):
+            media_sources.append((source_id, source_path if isinstance(source_path, str) else ""))
+    return LibraryEvent(event, action, str(item_id), tuple(media_sources))
+
+
+def handle_webhook(stream, token, content_type, body):
+    """
+    处理 Emby Webhook 请求，不依赖具体的 Web 框架
+
+    Parameters:
+    - stream (Stream): Stream 实例
+    - token (str): 请求携带的令牌
+    - content_type (str): 请求的 Content-Type
+    - body (bytes): 请求体
+
+    Returns:
+    - tuple: (HTTP 状态码, 响应内容)
+    """
+    expected_token = Config().webhook_token
+    if not expected_token:
+        # 未配置令牌时任何人都能清空缓存、触发上游请求，因此拒绝所有通知
+        logger.warning("收到 Emby Webhook 通知，但未配置 webhook_token，已拒绝；请在配置中设置 webhook_token")
+        return 403, {"error": "webhook_token is not configured"}
+    if not is_valid_webhook_token(expected_token, token):
+        return 401, {"error": "invalid token"}
+
+    payload = parse_webhook_payload(content_type, body)
+    if payload is None:
+        return 400, {"error": "invalid payload"}
+
+    library_event = parse_library_event(payload)
+    if library_event is None:
+        return 200, {"event": str(payload.get("Event") or ""), "ignored": True}
+    return 200, stream.handle_library_event(library_event)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+import signal
+import unittest
+import multiprocessing
+
+from utils.shared_cache import SharedTable
+
+# 共享表使用匿名 mmap，只有 fork 出的子进程能看到同一块内存
+FORK = multiprocessing.get_context("fork")
+
+
+def write_entries(table, count):
+    expires_at = time.time() + 60
+    for index in range(count):
+        table.set(f"key-{index}".encode(), f"value-{index}".encode(), expires_at)
+
+
+def read_entries(table, count, results):
+    results.put([table.get(f"key-{index}".encode()) is not None for index in range(count)])
+
+
+def overwrite(table, key, marker, rounds):
+    # 每个进程写入由同一个字节组成、长度不同的值，读到混合字节或长度不符即说明读到了写了一半的槽位
+    for index in range(rounds):
+        length = 64 + (marker * 7 + index) % 900
+        table.set(key, bytes([marker]) * length + length.to_bytes(2, "little"), time.time() + 60)
+
+
+def check_reads(table, key, duration, results):
+    torn = reads = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        entry = table.get(key)
+        if entry is None:
+            continue
+        value = entry[0]
+        reads += 1
+        body, length = value[:-2], int.from_bytes(value[-2:], "little")
+        if len(body) != length or body.count(body[:1]) != len(body):
+            torn += 1
+    results.put((reads, torn))
+
+
+def hold_lock_and_die(table):
+    for lock in table._SharedTable__locks:
+        lock.acquire()
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+class SharedTableTest(unittest.TestCase):
+
+    def run_process(self, target, *args):
+        process = FORK.Process(target=target, args=args)
+        process.start()
+        process.join(30)
+        self.assertFalse(process.is_alive())
+        return process
+
+    def test_entries_are_shared_between_processes(self):
+        table = SharedTable(slots=1024, slot_size=256)
+        results = FORK.Queue()
+
+        self.run_process(write_entries, table, 100)
+        self.assertEqual(table.get(b"key-42")[0], b"value-42")
+
+        self.assertEqual(table.delete(b"key-42")[0], b"value-42")
+        self.assertIsNone(table.delete(b"key-42"))
+        self.run_process(read_entries, table, 100, results)
+        visible = results.get(timeout=10)
+        self.assertFalse(visible[42])
+        self.assertEqual(visible.count(True), 99)
+
+    def test_concurrent_overwrites_are_never_read_torn(self):
+        table = SharedTable(slots=64, slot_size=1024, lock_stripes=4)
+        results = FORK.Queue()
+        key = b"hot-key"
+        readers = [FORK.Process(target=check_reads, args=(table, key, 2, results)) for _ in range(2)]
+        writers = [FORK.Process(target=overwrite, args=(table, key, marker, 5000)) for marker in range(1, 4)]
+        for process in readers + writers:
+            process.start()
+        for process in readers + writers:
+            process.join(60)
+
+        for _ in readers:
+            reads, torn = results.get(timeout=10)
+            self.assertGreater(reads, 0)
+            self.assertEqual(torn, 0)
+        self.assertEqual(len([slot for slot in table.items(b"hot") if slot[0] == key]), 1)
+
+    def test_writes_are_skipped_when_lock_holder_died(self):
+        table = SharedTable(slots=64, slot_size=256, lock_stripes=2, lock_timeout=0.05)
+        process = self.run_process(hold_lock_and_die, table)
+        self.assertEqual(process.exitcode, -signal.SIGKILL)
+
+        started = time.monotonic()
+        self.assertFalse(table.set(b"key", b"value", time.time() + 60))
+        self.assertIsNone(table.delete(b"key"))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(table.lock_timeouts, 2)
+
+    def test_reset_locks_recovers_after_lock_holder_died(self):
+        table = SharedTable(slots=64, slot_size=256, lock_stripes=2, lock_timeout=0.05)
+        self.run_process(hold_lock_and_die, table)
+
+        table.reset_locks()
+        self.assertTrue(table.set(b"key", b"value", time.time() + 60))
+        self.run_process(write_entries, table, 10)
+        self.assertEqual(table.get(b"key")[0], b"value")
+        self.assertEqual(table.get(b"key-9")[0], b"value-9")
+        self.assertEqual(table.lock_timeouts, 0)
+
+    def test_interrupted_write_is_not_readable_until_rewritten(self):
+        table = SharedTable(slots=8, slot_size=256, ways=8, lock_stripes=1)
+        table.set(b"key", b"old", time.time() + 60)
+        memory = table._SharedTable__memory
+        seq = table._SharedTable__seq
+        offset = next(index * table.slot_size for index in range(table.capacity)
+                      if table._SharedTable__header.unpack_from(memory, index * table.slot_size)[3])
+
+        # 模拟写入进程在序列号置为奇数后被杀死
+        seq.pack_into(memory, offset, seq.unpack_from(memory, offset)[0] | 1)
+        self.assertIsNone(table.get(b"key"))
+
+        table.set(b"key", b"new", time.time() + 60)
+        self.assertEqual(seq.unpack_from(memory, offset)[0] % 2, 0)
+        self.assertEqual(table.get(b"key")[0], b"new")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
 from .http_utils import RequestUtils
 from .string_utils import StringUtils
-from .builtin_utils import BuiltinUtils
\ No newline at end of file
+from .builtin_utils import BuiltinUtils
+from .cache_utils import TTLCache, NegativeCache
\ No newline at end of file
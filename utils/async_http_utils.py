@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+
+import httpx
+
+
+# noinspection PyBroadException
+class AsyncRequestUtils:
+	"""
+	异步 HTTP 请求工具类，基于 httpx.AsyncClient，复用带 keep-alive 的连接池
+	"""
+
+	def __init__(self,
+				 headers=None,
+				 timeout=None,
+				 max_connections=100,
+				 max_keepalive_connections=20,
+				 keepalive_expiry=30):
+		"""
+		初始化 AsyncRequestUtils 对象
+
+		Parameters:
+		- headers (dict): 请求头信息
+		- timeout (float or tuple): 请求超时时间，可以是 (连接超时, 读取超时) 元组
+		- max_connections (int): 连接池最大连接数
+		- max_keepalive_connections (int): 连接池最大空闲保持连接数
+		- keepalive_expiry (float): 空闲连接保持时间（秒）
+		"""
+		self.__headers = headers if isinstance(headers, dict) else {}
+		if "Content-Type" not in self.__headers:
+			self.__headers.update({"Content-Type": "application/json; charset=utf-8"})
+		if isinstance(timeout, tuple):
+			connect_timeout, read_timeout = timeout
+			timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+		self.__timeout = timeout
+		self.__max_connections = max_connections
+		self.__in_flight = 0
+		self.__max_in_flight = 0
+		self.__pool_exhausted = 0
+		self.__limits = httpx.Limits(max_connections=max_connections,
+									 max_keepalive_connections=max_keepalive_connections,
+									 keepalive_expiry=keepalive_expiry)
+		self.__client = None
+		self.__client_loop = None
+
+	def __get_client(self):
+		"""
+		获取当前事件循环对应的 httpx.AsyncClient，不存在时创建
+
+		Returns:
+		- httpx.AsyncClient: 异步 HTTP 客户端
+		"""
+		loop = asyncio.get_running_loop()
+		if self.__client is None or self.__client_loop is not loop or self.__client.is_closed:
+			self.__client = httpx.AsyncClient(verify=False,
+											  timeout=self.__timeout,
+											  limits=self.__limits,
+											  headers=self.__headers)
+			self.__client_loop = loop
+		return self.__client
+
+	def __acquire(self):
+		"""
+		统计正在进行中的请求数，请求数超过连接池大小时记为一次连接池耗尽
+		"""
+		self.__in_flight += 1
+		self.__max_in_flight = max(self.__max_in_flight, self.__in_flight)
+		if self.__max_connections and self.__in_flight > self.__max_connections:
+			self.__pool_exhausted += 1
+
+	def pool_stats(self):
+		"""
+		获取连接池使用情况
+
+		Returns:
+		- dict: 当前进行中的请求数、峰值、连接池大小与耗尽次数
+		"""
+		return {
+			"in_flight": self.__in_flight,
+			"max_in_flight": self.__max_in_flight,
+			"pool_maxsize": self.__max_connections,
+			"pool_exhausted": self.__pool_exhausted
+		}
+
+	async def get_res(self, url, params=None, headers=None, allow_redirects=True):
+		"""
+		发送异步 GET 请求，返回完整的响应对象
+
+		Parameters:
+		- url (str): 请求的 URL
+		- params (dict): 请求携带的参数
+		- headers (dict): 本次请求额外携带的请求头
+		- allow_redirects (bool): 是否允许重定向
+
+		Returns:
+		- httpx.Response or None: 请求的响应对象或 None（发生异常时）
+		"""
+		self.__acquire()
+		try:
+			return await self.__get_client().get(url,
+												 params=params,
+												 headers=headers,
+												 follow_redirects=allow_redirects)
+		except httpx.HTTPError:
+			return None
+		finally:
+			self.__in_flight -= 1
+
+	async def post_res(self, url, data=None, params=None, headers=None, allow_redirects=True, json=None):
+		"""
+		发送异步 POST 请求，返回完整的响应对象
+
+		Parameters:
+		- url (str): 请求的 URL
+		- data (dict or str): 请求携带的数据
+		- params (dict): 请求携带的参数
+		- headers (dict): 本次请求额外携带的请求头
+		- allow_redirects (bool): 是否允许重定向
+		- json (dict): 请求携带的 JSON 数据
+
+		Returns:
+		- httpx.Response or None: 请求的响应对象或 None（发生异常时）
+		"""
+		self.__acquire()
+		try:
+			return await self.__get_client().post(url,
+												  data=data,
+												  params=params,
+												  headers=headers,
+												  follow_redirects=allow_redirects,
+												  json=json)
+		except httpx.HTTPError:
+			return None
+		finally:
+			self.__in_flight -= 1
+
+	async def aclose(self):
+		"""
+		关闭连接池
+		"""
+		if self.__client is not None and not self.__client.is_closed:
+			await self.__client.aclose()
+		self.__client = None
+		self.__client_loop = None
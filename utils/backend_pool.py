@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import time
+import random
+import threading
+from collections import namedtuple
+
+BackendSpec = namedtuple("BackendSpec", ("url", "credential", "weight"))
+BackendSpec.__doc__ = """
+推流后端配置
+
+Attributes:
+- url (str): 后端地址
+- credential (str): 访问后端使用的密钥，Alist 为 API 密钥，MISAKA 后端为 Token
+- weight (int): 按权重选择时的权重
+"""
+
+
+class Backend:
+    """
+    推流后端的运行状态：EWMA 延迟与健康状态
+
+    状态只在请求结束或健康检查时由单个赋值更新，读取时无需加锁
+    """
+
+    __slots__ = ("spec", "latency", "healthy", "failures", "requests", "errors", "slow")
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.latency = None
+        self.healthy = True
+        self.failures = 0
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+
+    @property
+    def url(self):
+        return self.spec.url
+
+    @property
+    def credential(self):
+        return self.spec.credential
+
+    @property
+    def weight(self):
+        return self.spec.weight
+
+
+# noinspection PyBroadException
+class BackendPool:
+    """
+    多个推流后端组成的后端池
+
+    - 每个后端记录请求与健康检查耗时的 EWMA，以及连续失败次数，连续失败达到阈值后标记为不健康
+    - 按最低延迟（least_latency）或权重（weighted）选择后端，健康的后端优先，其余后端作为最后的兜底
+    - execute 按选择顺序依次请求，后端不可达时自动切换到下一个
+    """
+
+    LEAST_LATENCY = "least_latency"
+    WEIGHTED = "weighted"
+    SELECTIONS = (LEAST_LATENCY, WEIGHTED)
+
+    def __init__(self, name, specs, selection=LEAST_LATENCY, alpha=0.3, failure_threshold=2):
+        """
+        初始化后端池
+
+        Parameters:
+        - name (str): 后端池名称，用于日志与指标
+        - specs (Iterable[BackendSpec]): 后端配置
+        - selection (str): 选择策略，least_latency 或 weighted
+        - alpha (float): EWMA 的平滑系数，越大越偏向最近的耗时
+        - failure_threshold (int): 连续失败多少次后标记为不健康
+        """
+        self.__name = name
+        self.__specs = tuple(specs)
+        self.__backends = tuple(Backend(spec) for spec in self.__specs)
+        self.__selection = selection if selection in self.SELECTIONS else self.LEAST_LATENCY
+        self.__alpha = alpha
+        self.__failure_threshold = max(int(failure_threshold), 1)
+        self.__stopped = threading.Event()
+        self.__health_thread = None
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def specs(self):
+        return self.__specs
+
+    @property
+    def selection(self):
+        return self.__selection
+
+    @property
+    def primary(self):
+        """
+        获取第一个配置的后端
+
+        Returns:
+        - Backend: 后端，后端池为空时返回 None
+        """
+        return self.__backends[0] if self.__backends else None
+
+    def __len__(self):
+        return len(self.__backends)
+
+    def record_success(self, backend, seconds):
+        """
+        记录一次成功的请求或健康检查
+
+        Parameters:
+        - backend (Backend): 后端
+        - seconds (float): 耗时（秒）
+        """
+        self.__observe_latency(backend, seconds)
+        backend.failures = 0
+        backend.healthy = True
+
+    def record_slow(self, backend, seconds):
+        """
+        记录一次被对冲请求抢先返回的请求：只按已等待的时间更新延迟，不计入连续失败次数，
+        后端变慢但仍可达时按延迟排到后面，不会被标记为不健康
+
+        Parameters:
+        - backend (Backend): 后端
+        - seconds (float): 已等待的时间（秒）
+        """
+        self.__observe_latency(backend, seconds)
+        backend.slow += 1
+
+    def __observe_latency(self, backend, seconds):
+        backend.latency = seconds if backend.latency is None else \
+            self.__alpha * seconds + (1 - self.__alpha) * backend.latency
+
+    def record_failure(self, backend):
+        """
+        记录一次后端不可达（连接失败、超时或 5xx）
+
+        Parameters:
+        - backend (Backend): 后端
+        """
+        backend.failures += 1
+        backend.errors += 1
+        if backend.failures >= self.__failure_threshold:
+            backend.healthy = False
+
+    def candidates(self):
+        """
+        按选择策略排列后端，健康的后端在前
+
+        Returns:
+        - list: 后端
+        """
+        backends = self.__backends
+        if len(backends) <= 1:
+            return list(backends)
+
+        healthy = [backend for backend in backends if backend.healthy]
+        unhealthy = [backend for backend in backends if not backend.healthy]
+        # 尚未测得延迟的后端按 0 处理，让它尽快被请求到
+        healthy.sort(key=self.__latency_key)
+        unhealthy.sort(key=self.__latency_key)
+        if self.__selection == self.WEIGHTED and len(healthy) > 1:
+            first = self.__choose_weighted(healthy)
+            healthy.remove(first)
+            healthy.insert(0, first)
+        return healthy + unhealthy
+
+    def select(self):
+        """
+        选择一个后端
+
+        Returns:
+        - Backend: 后端，后端池为空时返回 None
+        """
+        backends = self.candidates()
+        return backends[0] if backends else None
+
+    def alternate(self, backend):
+        """
+        获取用于对冲请求的另一个健康后端
+
+        Parameters:
+        - backend (Backend): 当前请求的后端
+
+        Returns:
+        - Backend: 按选择顺序排在最前的其他健康后端，没有时返回 backend 本身
+        """
+        if len(self.__backends) > 1:
+            for candidate in self.candidates():
+                if candidate is not backend and candidate.healthy:
+                    return candidate
+        return backend
+
+    @staticmethod
+    def __latency_key(backend):
+        return backend.latency or 0.0
+
+    @staticmethod
+    def __choose_weighted(backends):
+        """
+        按权重随机选择一个后端
+
+        Returns:
+        - Backend: 后端
+        """
+        total = sum(backend.weight for backend in backends)
+        if total <= 0:
+            return backends[0]
+        point = random.random() * total
+        for backend in backends:
+            point -= backend.weight
+            if point < 0:
+                return backend
+        return backends[-1]
+
+    def execute(self, request):
+        """
+        按选择顺序请求后端，后端不可达时切换到下一个
+
+        Parameters:
+        - request (Callable[[Backend], tuple]): 请求函数，返回 (结果, 后端是否可达)；结果由对冲请求的
+          另一个后端返回时，返回 (结果, 后端是否可达, (实际返回结果的后端, 其耗时))
+
+        Returns:
+        - tuple: (第一个可达后端的结果, True)，全部不可达时返回 (最后一个后端的结果, False)
+        """
+        result = None
+        for backend in self.candidates():
+            backend.requests += 1
+            started = time.perf_counter()
+            result, reachable = self.__record(backend, request(backend), time.perf_counter() - started)
+            if reachable:
+                return result, True
+        return result, False
+
+    async def execute_async(self, request):
+        """
+        execute 的异步版本
+
+        Parameters:
+        - request (Callable[[Backend], Awaitable[tuple]]): 异步请求函数，返回值与 execute 相同
+
+        Returns:
+        - tuple: (第一个可达后端的结果, True)，全部不可达时返回 (最后一个后端的结果, False)
+        """
+        result = None
+        for backend in self.candidates():
+            backend.requests += 1
+            started = time.perf_counter()
+            result, reachable = self.__record(backend, await request(backend), time.perf_counter() - started)
+            if reachable:
+                return result, True
+        return result, False
+
+    def __record(self, backend, outcome, seconds):
+        """
+        根据请求结果更新后端状态：结果由对冲请求的另一个后端返回时，成功只记在实际返回结果的后端上，
+        被请求的后端在 seconds 内没有返回，按慢请求记录延迟，不会被当作低延迟后端
+
+        Parameters:
+        - backend (Backend): 被请求的后端
+        - outcome (tuple): 请求函数的返回值
+        - seconds (float): 请求耗时（秒）
+
+        Returns:
+        - tuple: (结果, 是否可达)
+        """
+        result, reachable = outcome[0], outcome[1]
+        answer = outcome[2] if len(outcome) > 2 else None
+        if answer is not None and answer[0] is not backend:
+            self.record_slow(backend, seconds)
+            backend, seconds = answer
+        elif answer is not None:
+            seconds = answer[1]
+        if reachable:
+            self.record_success(backend, seconds)
+        else:
+            self.record_failure(backend)
+        return result, reachable
+
+    def start_health_checks(self, probe, interval):
+        """
+        启动后台健康检查线程，只有一个后端时无需检查
+
+        Parameters:
+        - probe (Callable[[Backend], bool]): 检查函数，后端可达时返回 True
+        - interval (float): 检查间隔（秒），为 0 时不检查
+        """
+        if interval <= 0 or len(self.__backends) <= 1 or self.__health_thread is not None:
+            return
+        self.__health_thread = threading.Thread(
+            target=self.__check_health,
+            args=(probe, interval),
+            name=f"{self.__name}-health-check",
+            daemon=True
+        )
+        self.__health_thread.start()
+
+    def __check_health(self, probe, interval):
+        """
+        健康检查线程：每隔 interval 秒依次检查全部后端，直到后端池被停止
+        """
+        while not self.__stopped.wait(interval):
+            for backend in self.__backends:
+                started = time.perf_counter()
+                try:
+                    reachable = probe(backend)
+                except Exception:
+                    reachable = False
+                if reachable:
+                    self.record_success(backend, time.perf_counter() - started)
+                else:
+                    self.record_failure(backend)
+
+    def stop(self):
+        """
+        停止健康检查线程，配置重载替换后端池时调用
+        """
+        self.__stopped.set()
+
+    def stats(self):
+        """
+        获取各后端的运行状态
+
+        Returns:
+        - list: [{url, healthy, latency, requests, errors, slow}, ...]
+        """
+        return [
+            {
+                "url": backend.url,
+                "healthy": backend.healthy,
+                "latency": backend.latency,
+                "requests": backend.requests,
+                "errors": backend.errors,
+                "slow": backend.slow
+            }
+            for backend in self.__backends
+        ]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+# noinspection PyBroadException
+class BackgroundRefresher:
+    """
+    后台刷新工具：在有限大小的线程池中刷新即将过期的缓存条目
+
+    - 同一个键同时最多只有一个刷新任务，其余提交直接跳过
+    - 进行中与排队的刷新任务总数超过 max_pending 时丢弃新的提交，上游变慢时不会无限堆积
+    - 刷新失败只记录次数，不影响已返回给客户端的结果
+    """
+
+    SCHEDULED = "scheduled"
+    SKIPPED = "skipped"
+    DROPPED = "dropped"
+
+    def __init__(self, name, max_workers=4, max_pending=64):
+        """
+        初始化后台刷新工具，线程按需创建
+
+        Parameters:
+        - name (str): 名称，用于线程名
+        - max_workers (int): 最大线程数
+        - max_pending (int): 进行中与排队的刷新任务总数上限
+        """
+        self.__name = name
+        self.__max_workers = max(int(max_workers), 1)
+        self.__max_pending = max(int(max_pending), self.__max_workers)
+        self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix=name)
+        self.__lock = threading.Lock()
+        self.__in_flight = set()
+        self.__failed = 0
+
+    @property
+    def settings(self):
+        return self.__max_workers, self.__max_pending
+
+    def submit(self, key, func, *args):
+        """
+        提交刷新任务
+
+        Parameters:
+        - key: 刷新任务的键，需可哈希
+        - func (Callable): 刷新函数
+        - args: 函数的参数
+
+        Returns:
+        - str: scheduled（已提交）、skipped（同一个键已有刷新任务）或 dropped（任务数已达上限）
+        """
+        with self.__lock:
+            if key in self.__in_flight:
+                return self.SKIPPED
+            if len(self.__in_flight) >= self.__max_pending:
+                return self.DROPPED
+            self.__in_flight.add(key)
+        try:
+            self.__executor.submit(self.__run, key, func, args)
+        except RuntimeError:
+            # 线程池已关闭（配置重载替换或进程退出）
+            with self.__lock:
+                self.__in_flight.discard(key)
+            return self.DROPPED
+        return self.SCHEDULED
+
+    def __run(self, key, func, args):
+        """
+        执行刷新任务，结束后释放键
+        """
+        try:
+            func(*args)
+        except Exception:
+            with self.__lock:
+                self.__failed += 1
+        finally:
+            with self.__lock:
+                self.__in_flight.discard(key)
+
+    def shutdown(self):
+        """
+        不再接受新的刷新任务，已提交的任务继续执行
+        """
+        self.__executor.shutdown(wait=False)
+
+    def stats(self):
+        """
+        获取后台刷新统计信息
+
+        Returns:
+        - dict: 进行中的刷新任务数与失败次数
+        """
+        with self.__lock:
+            return {"in_flight": len(self.__in_flight), "failed": self.__failed}
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import time
+import threading
+from collections import OrderedDict
+
+from .types import LookupFailure
+
+
+# noinspection PyBroadException
+class TTLCache:
+    """
+    线程安全的 LRU 缓存，每个条目带有过期时间（TTL）
+
+    条目以 (过期时间, 值) 二元组的形式保存在 OrderedDict 中，尽量保持紧凑；
+    超过容量时淘汰最久未使用的条目，过期条目在访问时惰性删除
+
+    Attributes:
+    - __max_size (int): 缓存最大条目数
+    - __ttl (float): 默认过期时间（秒），小于等于 0 时禁用缓存
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        """
+        初始化缓存
+
+        Parameters:
+        - max_size (int): 缓存最大条目数
+        - ttl (float): 默认过期时间（秒），小于等于 0 时禁用缓存
+        """
+        self.__lock = threading.Lock()
+        self.__data = OrderedDict()
+        self.__max_size = 1
+        self.__ttl = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__store = None
+        self.__namespace = None
+        self.__key_encoder = None
+        self.configure(max_size, ttl)
+
+    def configure(self, max_size, ttl):
+        """
+        调整缓存容量与默认过期时间，多余的条目会被立即淘汰
+
+        Parameters:
+        - max_size (int): 缓存最大条目数
+        - ttl (float): 默认过期时间（秒）
+        """
+        with self.__lock:
+            self.__max_size = max(int(max_size or 0), 1)
+            self.__ttl = float(ttl or 0)
+            while len(self.__data) > self.__max_size:
+                self.__data.popitem(last=False)
+
+    def attach_store(self, store, namespace, key_encoder=str, key_decoder=str):
+        """
+        将缓存写入同步到持久化存储，并在后台线程中用存储中未过期的记录预热缓存
+
+        Parameters:
+        - store (PersistentStore or None): 持久化存储，为 None 时停止同步
+        - namespace (str): 存储中的命名空间
+        - key_encoder (Callable): 将缓存键编码为字符串
+        - key_decoder (Callable): 将字符串解码为缓存键
+        """
+        if store is self.__store and namespace == self.__namespace:
+            return
+        self.__key_encoder = key_encoder
+        self.__namespace = namespace
+        self.__store = store
+        if store is not None:
+            threading.Thread(target=self.__warm_up, args=(store, namespace, key_decoder),
+                             name=f"cache-warm-up-{namespace}", daemon=True).start()
+
+    def __warm_up(self, store, namespace, key_decoder):
+        """
+        从持久化存储加载未过期的记录，已存在的条目不会被覆盖
+
+        Parameters:
+        - store (PersistentStore): 持久化存储
+        - namespace (str): 存储中的命名空间
+        - key_decoder (Callable): 将字符串解码为缓存键
+        """
+        rows = store.load(namespace, limit=self.__max_size)
+        now = time.time()
+        monotonic_now = time.monotonic()
+        with self.__lock:
+            # 过期时间越晚越靠前，倒序写入使其成为最近使用的条目
+            for encoded_key, value, expires_at in reversed(rows):
+                ttl = min(expires_at - now, self.__ttl)
+                if ttl <= 0:
+                    continue
+                try:
+                    key = key_decoder(encoded_key)
+                except Exception:
+                    continue
+                if key in self.__data:
+                    continue
+                self.__data[key] = (monotonic_now + ttl, value)
+            while len(self.__data) > self.__max_size:
+                self.__data.popitem(last=False)
+
+    @property
+    def enabled(self):
+        """
+        缓存是否启用
+
+        Returns:
+        - bool: 默认过期时间大于 0 时返回 True
+        """
+        return self.__ttl > 0
+
+    def get(self, key, default=None):
+        """
+        获取缓存值，过期或不存在时返回默认值
+
+        Parameters:
+        - key: 缓存键
+        - default: 未命中时的返回值
+
+        Returns:
+        - 缓存值或 default
+        """
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__data.get(key)
+            if entry is None:
+                self.__misses += 1
+                return default
+            if entry[0] <= now:
+                del self.__data[key]
+                self.__misses += 1
+                return default
+            self.__data.move_to_end(key)
+            self.__hits += 1
+            return entry[1]
+
+    def get_with_ttl(self, key, default=None):
+        """
+        获取缓存值及其剩余有效期，用于判断条目是否即将过期
+
+        Parameters:
+        - key: 缓存键
+        - default: 未命中时的返回值
+
+        Returns:
+        - tuple: (缓存值, 剩余有效期（秒）)，过期或不存在时返回 (default, 0)
+        """
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__data.get(key)
+            if entry is None:
+                self.__misses += 1
+                return default, 0
+            if entry[0] <= now:
+                del self.__data[key]
+                self.__misses += 1
+                return default, 0
+            self.__data.move_to_end(key)
+            self.__hits += 1
+            return entry[1], entry[0] - now
+
+    def __contains__(self, key):
+        """
+        判断是否存在未过期的条目，不计入命中统计，也不调整淘汰顺序
+        """
+        entry = self.__data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存值
+
+        Parameters:
+        - key: 缓存键
+        - value: 缓存值
+        - ttl (float, optional): 当前条目的过期时间（秒），未提供时使用默认值
+        """
+        ttl = self.__ttl if ttl is None else ttl
+        if not self.enabled or ttl <= 0:
+            return
+        expire_at = time.monotonic() + ttl
+        with self.__lock:
+            self.__data[key] = (expire_at, value)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.__max_size:
+                self.__data.popitem(last=False)
+        store = self.__store
+        if store is not None and isinstance(value, str):
+            store.set(self.__namespace, self.__key_encoder(key), value, time.time() + ttl)
+
+    def delete(self, key):
+        """
+        删除缓存值
+
+        Parameters:
+        - key: 缓存键
+
+        Returns:
+        - bool: 条目存在并被删除时返回 True
+        """
+        store = self.__store
+        if store is not None:
+            store.delete(self.__namespace, self.__key_encoder(key))
+        with self.__lock:
+            return self.__data.pop(key, None) is not None
+
+    def pop(self, key, default=None):
+        """
+        删除缓存值并返回，不计入命中统计
+
+        Parameters:
+        - key: 缓存键
+        - default: 条目不存在或已过期时的返回值
+
+        Returns:
+        - 被删除的缓存值或 default
+        """
+        store = self.__store
+        if store is not None:
+            store.delete(self.__namespace, self.__key_encoder(key))
+        with self.__lock:
+            entry = self.__data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def keys(self):
+        """
+        获取当前全部缓存键的快照，包含尚未惰性删除的过期条目
+
+        Returns:
+        - list: 缓存键
+        """
+        with self.__lock:
+            return list(self.__data)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self.__lock:
+            self.__data.clear()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数与容量
+        """
+        return {
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "size": len(self.__data),
+            "max_size": self.__max_size,
+            "ttl": self.__ttl
+        }
+
+
+class NegativeCache:
+    """
+    负缓存：记录最近查询失败的键，在短时间内直接返回失败，避免客户端重试时反复请求上游
+
+    “未找到”与“上游错误”使用不同的过期时间，过期时间为 0 时不缓存该类失败
+    """
+
+    def __init__(self, max_size=1024, not_found_ttl=0, error_ttl=0):
+        """
+        初始化负缓存
+
+        Parameters:
+        - max_size (int): 最大条目数
+        - not_found_ttl (float): “未找到”的缓存时间（秒）
+        - error_ttl (float): “上游错误”的缓存时间（秒）
+        """
+        self.__cache = TTLCache()
+        self.__ttls = {}
+        self.configure(max_size, not_found_ttl, error_ttl)
+
+    def configure(self, max_size, not_found_ttl, error_ttl):
+        """
+        调整容量与过期时间
+
+        Parameters:
+        - max_size (int): 最大条目数
+        - not_found_ttl (float): “未找到”的缓存时间（秒）
+        - error_ttl (float): “上游错误”的缓存时间（秒）
+        """
+        self.__ttls = {LookupFailure.NOT_FOUND: not_found_ttl, LookupFailure.UPSTREAM_ERROR: error_ttl}
+        self.__cache.configure(max_size, max(not_found_ttl, error_ttl))
+
+    def get(self, key):
+        """
+        获取键最近一次查询失败的原因
+
+        Parameters:
+        - key: 缓存键
+
+        Returns:
+        - LookupFailure: 失败原因，未缓存时返回 None
+        """
+        if not self.__cache.enabled:
+            return None
+        return self.__cache.get(key)
+
+    def set(self, key, failure):
+        """
+        记录一次查询失败
+
+        Parameters:
+        - key: 缓存键
+        - failure (LookupFailure): 失败原因
+        """
+        self.__cache.set(key, failure, ttl=self.__ttls.get(failure, 0))
+
+    def delete(self, key):
+        """
+        删除失败记录，例如媒体重新入库后
+
+        Parameters:
+        - key: 缓存键
+
+        Returns:
+        - bool: 记录存在并被删除时返回 True
+        """
+        return self.__cache.delete(key)
+
+    def keys(self):
+        return self.__cache.keys()
+
+    def __contains__(self, key):
+        return self.__cache.enabled and key in self.__cache
+
+    def stats(self):
+        """
+        获取负缓存统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数与容量
+        """
+        return self.__cache.stats()
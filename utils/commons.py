@@ -25,6 +25,10 @@ def singleton(cls):
     global INSTANCES
 
     def _singleton(*args, **kwargs):
+        # 实例创建后无需再加锁，热路径上只做一次字典查找
+        instance = INSTANCES.get(cls)
+        if instance is not None:
+            return instance
         with lock:
             if cls not in INSTANCES:
                 INSTANCES[cls] = cls(*args, **kwargs)
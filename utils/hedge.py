@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import threading
+from collections import deque
+
+
+class HedgePolicy:
+    """
+    对冲请求策略：记录最近的请求耗时，第一个请求超过指定分位数的耗时仍未返回时再发出一个对冲请求
+
+    样本不足 min_samples 时无法估计分位数，此时不对冲；分位数每新增 recompute_every 个样本才重新计算一次，
+    请求路径上只读取计算好的延迟
+    """
+
+    def __init__(self, percentile=95, min_delay=0.05, window=512, min_samples=20, recompute_every=16):
+        """
+        初始化对冲策略
+
+        Parameters:
+        - percentile (int): 对冲延迟使用的耗时分位数（1 - 99）
+        - min_delay (float): 对冲延迟的下限（秒），避免上游很快时对冲过多
+        - window (int): 保留最近多少个耗时样本
+        - min_samples (int): 开始对冲所需的最少样本数
+        - recompute_every (int): 每新增多少个样本重新计算一次分位数
+        """
+        self.__percentile = min(max(int(percentile), 1), 99)
+        self.__min_delay = max(float(min_delay), 0.0)
+        self.__samples = deque(maxlen=max(int(window), 1))
+        self.__min_samples = max(int(min_samples), 1)
+        self.__recompute_every = max(int(recompute_every), 1)
+        self.__pending = 0
+        self.__delay = None
+        self.__lock = threading.Lock()
+        self.__requests = 0
+        self.__hedged = 0
+        self.__hedge_wins = 0
+
+    @property
+    def settings(self):
+        return self.__percentile, self.__min_delay
+
+    def observe(self, seconds):
+        """
+        记录一次请求耗时
+
+        Parameters:
+        - seconds (float): 耗时（秒）
+        """
+        with self.__lock:
+            self.__samples.append(seconds)
+            self.__pending += 1
+            if self.__pending < self.__recompute_every or len(self.__samples) < self.__min_samples:
+                return
+            self.__pending = 0
+            samples = sorted(self.__samples)
+        index = min(len(samples) - 1, len(samples) * self.__percentile // 100)
+        self.__delay = max(samples[index], self.__min_delay)
+
+    def delay(self):
+        """
+        获取对冲延迟
+
+        Returns:
+        - float: 对冲延迟（秒），样本不足时返回 None，表示不对冲
+        """
+        return self.__delay
+
+    def record(self, hedged, hedge_won):
+        """
+        记录一次请求的对冲结果
+
+        Parameters:
+        - hedged (bool): 是否发出了对冲请求
+        - hedge_won (bool): 是否采用了对冲请求的结果
+        """
+        with self.__lock:
+            self.__requests += 1
+            self.__hedged += hedged
+            self.__hedge_wins += hedge_won
+
+    def stats(self):
+        """
+        获取对冲统计信息
+
+        Returns:
+        - dict: 请求数、对冲数、对冲胜出数、对冲比例与当前对冲延迟
+        """
+        with self.__lock:
+            requests, hedged, hedge_wins = self.__requests, self.__hedged, self.__hedge_wins
+        return {
+            "requests": requests,
+            "hedged": hedged,
+            "hedge_wins": hedge_wins,
+            "hedge_rate": hedged / requests if requests else 0.0,
+            "delay": self.__delay
+        }
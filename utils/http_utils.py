@@ -3,8 +3,15 @@
 # -*- coding: utf-8 -*-
 
 
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+from urllib.parse import urlparse
+
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from requests.cookies import RequestsCookieJar, merge_cookies
 from urllib3.exceptions import InsecureRequestWarning
 
 # 禁用不安全请求警告
@@ -23,7 +30,8 @@ class RequestUtils:
 				 session=None,
 				 timeout=None,
 				 referer=None,
-				 accept_type=None):
+				 accept_type=None,
+				 pool_maxsize=None):
 		"""
 		初始化 RequestUtils 对象
 
@@ -31,9 +39,10 @@ class RequestUtils:
 		- headers (dict): 请求头信息
 		- cookies (str or dict): 请求携带的 cookies
 		- session (requests.Session): 请求的会话对象
-		- timeout (float): 请求超时时间
+		- timeout (float or tuple): 请求超时时间，可以是 (连接超时, 读取超时) 元组
 		- referer (str): 请求头中的 referer
 		- accept_type (str): 请求头中的 Accept 类型
+		- pool_maxsize (int): 会话中每个 host 的连接池大小，用于统计连接池耗尽次数
 		"""
 		self.__headers = headers if isinstance(headers, dict) else {}
 		if "Content-Type" not in self.__headers:
@@ -45,6 +54,74 @@ class RequestUtils:
 		self.__timeout = timeout
 		if accept_type:
 			self.__headers.update({"Accept": accept_type})
+		self.__pool_maxsize = pool_maxsize
+		self.__pool_lock = threading.Lock()
+		self.__in_flight = 0
+		self.__in_flight_by_host = {}
+		self.__max_in_flight = 0
+		self.__pool_exhausted = 0
+
+	@staticmethod
+	def create_session(pool_connections=10, pool_maxsize=10, max_retries=0, pool_block=False):
+		"""
+		创建带有指定连接池大小的会话，连接会以 keep-alive 方式复用
+
+		Parameters:
+		- pool_connections (int): 缓存的连接池数量（按 host 区分）
+		- pool_maxsize (int): 每个连接池保存的最大连接数
+		- max_retries (int): 连接失败时的重试次数
+		- pool_block (bool): 连接池耗尽时是否阻塞等待空闲连接
+
+		Returns:
+		- requests.Session: 会话对象
+		"""
+		session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=pool_connections,
+							  pool_maxsize=pool_maxsize,
+							  max_retries=max_retries,
+							  pool_block=pool_block)
+		session.mount("http://", adapter)
+		session.mount("https://", adapter)
+		return session
+
+	@contextmanager
+	def __track_request(self, url):
+		"""
+		统计正在进行中的请求数；会话按 host 分别建立连接池，同一 host 进行中的请求数超过连接池大小时记为一次连接池耗尽
+
+		Parameters:
+		- url (str): 请求的 URL
+		"""
+		host = urlparse(url).netloc
+		with self.__pool_lock:
+			self.__in_flight += 1
+			self.__max_in_flight = max(self.__max_in_flight, self.__in_flight)
+			host_in_flight = self.__in_flight_by_host.get(host, 0) + 1
+			self.__in_flight_by_host[host] = host_in_flight
+			if self.__pool_maxsize and host_in_flight > self.__pool_maxsize:
+				self.__pool_exhausted += 1
+		try:
+			yield
+		finally:
+			with self.__pool_lock:
+				self.__in_flight -= 1
+				host_in_flight = self.__in_flight_by_host.pop(host) - 1
+				if host_in_flight:
+					self.__in_flight_by_host[host] = host_in_flight
+
+	def pool_stats(self):
+		"""
+		获取连接池使用情况
+
+		Returns:
+		- dict: 当前进行中的请求数与峰值（全部 host 合计）、每个 host 的连接池大小与耗尽次数
+		"""
+		return {
+			"in_flight": self.__in_flight,
+			"max_in_flight": self.__max_in_flight,
+			"pool_maxsize": self.__pool_maxsize,
+			"pool_exhausted": self.__pool_exhausted
+		}
 
 	def update_headers(self, headers):
 		"""
@@ -80,20 +157,21 @@ class RequestUtils:
 			json = {}
 
 		try:
-			if self.__session:
-				return self.__session.post(url,
-										   data=data,
-										   verify=False,
-										   headers=self.__headers,
-										   timeout=self.__timeout,
-										   json=json)
-			else:
-				return requests.post(url,
-									 data=data,
-									 verify=False,
-									 headers=self.__headers,
-									 timeout=self.__timeout,
-									 json=json)
+			with self.__track_request(url):
+				if self.__session:
+					return self.__session.post(url,
+											   data=data,
+											   verify=False,
+											   headers=self.__headers,
+											   timeout=self.__timeout,
+											   json=json)
+				else:
+					return requests.post(url,
+										 data=data,
+										 verify=False,
+										 headers=self.__headers,
+										 timeout=self.__timeout,
+										 json=json)
 		except requests.exceptions.RequestException:
 			return None
 
@@ -109,23 +187,24 @@ class RequestUtils:
 		- str or None: 请求的响应内容（字符串）或 None（发生异常时）
 		"""
 		try:
-			if self.__session:
-				response = self.__session.get(url,
-											  verify=False,
-											  headers=self.__headers,
-											  timeout=self.__timeout,
-											  params=params)
-			else:
-				response = requests.get(url,
-										verify=False,
-										headers=self.__headers,
-										timeout=self.__timeout,
-										params=params)
-			return str(response.content, 'utf-8')
+			with self.__track_request(url):
+				if self.__session:
+					response = self.__session.get(url,
+												  verify=False,
+												  headers=self.__headers,
+												  timeout=self.__timeout,
+												  params=params)
+				else:
+					response = requests.get(url,
+											verify=False,
+											headers=self.__headers,
+											timeout=self.__timeout,
+											params=params)
+				return str(response.content, 'utf-8')
 		except requests.exceptions.RequestException:
 			return None
 
-	def get_res(self, url, params=None, allow_redirects=True, raise_exception=False):
+	def get_res(self, url, params=None, allow_redirects=True, raise_exception=False, headers=None):
 		"""
 		发送 GET 请求，返回完整的响应对象
 
@@ -134,33 +213,36 @@ class RequestUtils:
 		- params (dict): 请求携带的参数
 		- allow_redirects (bool): 是否允许重定向
 		- raise_exception (bool): 是否抛出异常
+		- headers (Mapping): 本次请求使用的请求头，提供时替代实例的请求头且不修改共享状态
 
 		Returns:
 		- requests.Response or None: 请求的响应对象或 None（发生异常时）
 		"""
+		request_headers = self.__headers if headers is None else headers
 		try:
-			if self.__session:
-				return self.__session.get(url,
-										  params=params,
-										  verify=False,
-										  headers=self.__headers,
-										  cookies=self.__cookies,
-										  timeout=self.__timeout,
-										  allow_redirects=allow_redirects)
-			else:
-				return requests.get(url,
-									params=params,
-									verify=False,
-									headers=self.__headers,
-									cookies=self.__cookies,
-									timeout=self.__timeout,
-									allow_redirects=allow_redirects)
+			with self.__track_request(url):
+				if self.__session:
+					return self.__session.get(url,
+											  params=params,
+											  verify=False,
+											  headers=request_headers,
+											  cookies=self.__cookies,
+											  timeout=self.__timeout,
+											  allow_redirects=allow_redirects)
+				else:
+					return requests.get(url,
+										params=params,
+										verify=False,
+										headers=request_headers,
+										cookies=self.__cookies,
+										timeout=self.__timeout,
+										allow_redirects=allow_redirects)
 		except requests.exceptions.RequestException:
 			if raise_exception:
 				raise requests.exceptions.RequestException
 			return None
 
-	def post_res(self, url, data=None, params=None, allow_redirects=True, files=None, json=None):
+	def post_res(self, url, data=None, params=None, allow_redirects=True, files=None, json=None, headers=None):
 		"""
 		发送 POST 请求，返回完整的响应对象
 
@@ -171,35 +253,116 @@ class RequestUtils:
 		- allow_redirects (bool): 是否允许重定向
 		- files (dict): 上传的文件
 		- json (dict): 请求携带的 JSON 数据
+		- headers (Mapping): 本次请求使用的请求头，提供时替代实例的请求头且不修改共享状态
+
+		Returns:
+		- requests.Response or None: 请求的响应对象或 None（发生异常时）
+		"""
+		request_headers = self.__headers if headers is None else headers
+		try:
+			with self.__track_request(url):
+				if self.__session:
+					return self.__session.post(url,
+											   data=data,
+											   params=params,
+											   verify=False,
+											   headers=request_headers,
+											   cookies=self.__cookies,
+											   timeout=self.__timeout,
+											   allow_redirects=allow_redirects,
+											   files=files,
+											   json=json)
+				else:
+					return requests.post(url,
+										 data=data,
+										 params=params,
+										 verify=False,
+										 headers=request_headers,
+										 cookies=self.__cookies,
+										 timeout=self.__timeout,
+										 allow_redirects=allow_redirects,
+										 files=files, json=json)
+		except requests.exceptions.RequestException:
+			return None
+
+	@staticmethod
+	def freeze_headers(headers):
+		"""
+		构造不可变的请求头模板，启动时构造一次，之后每次请求直接复用
+
+		Parameters:
+		- headers (dict): 请求头信息
+
+		Returns:
+		- MappingProxyType: 只读的请求头
+		"""
+		frozen_headers = dict(headers or {})
+		if not any(key.lower() == "content-type" for key in frozen_headers):
+			frozen_headers["Content-Type"] = "application/json; charset=utf-8"
+		return MappingProxyType(frozen_headers)
+
+	def prepare_template(self, method, url, headers=None):
+		"""
+		构造可复用的请求模板，URL、请求头与 cookies 只合并一次，每次请求只需填充请求体
+
+		Parameters:
+		- method (str): 请求方法
+		- url (str): 请求的 URL
+		- headers (Mapping): 请求头，未提供时使用实例的请求头
+
+		Returns:
+		- requests.PreparedRequest: 请求模板
+		"""
+		request = requests.Request(method=method,
+								   url=url,
+								   headers=dict(self.__headers if headers is None else headers),
+								   cookies=self.__cookies)
+		session = self.__session or requests.Session()
+		return session.prepare_request(request)
+
+	def send_prepared(self, template, data=None, json=None):
+		"""
+		基于请求模板发送请求，模板本身不会被修改
+
+		与 Session.request 一致，发送时合并会话的 cookies 以及环境变量中的代理与证书配置（HTTP(S)_PROXY、NO_PROXY 等）
+
+		Parameters:
+		- template (requests.PreparedRequest): prepare_template 构造的请求模板
+		- data (dict or str): 请求携带的数据
+		- json (dict): 请求携带的 JSON 数据
 
 		Returns:
 		- requests.Response or None: 请求的响应对象或 None（发生异常时）
 		"""
+		prepared_request = template.copy()
+		prepared_request.prepare_body(data=data, files=None, json=json)
 		try:
-			if self.__session:
-				return self.__session.post(url,
-										   data=data,
-										   params=params,
-										   verify=False,
-										   headers=self.__headers,
-										   cookies=self.__cookies,
-										   timeout=self.__timeout,
-										   allow_redirects=allow_redirects,
-										   files=files,
-										   json=json)
-			else:
-				return requests.post(url,
-									 data=data,
-									 params=params,
-									 verify=False,
-									 headers=self.__headers,
-									 cookies=self.__cookies,
-									 timeout=self.__timeout,
-									 allow_redirects=allow_redirects,
-									 files=files, json=json)
+			with self.__track_request(prepared_request.url):
+				if self.__session:
+					return self.__send(self.__session, prepared_request)
+				with requests.Session() as session:
+					return self.__send(session, prepared_request)
 		except requests.exceptions.RequestException:
 			return None
 
+	def __send(self, session, prepared_request):
+		"""
+		按 Session.request 的方式合并 cookies 与环境配置后发送已构造好的请求
+
+		Parameters:
+		- session (requests.Session): 发送请求的会话
+		- prepared_request (requests.PreparedRequest): 已填充请求体的请求
+
+		Returns:
+		- requests.Response: 请求的响应对象
+		"""
+		prepared_request.headers.pop("Cookie", None)
+		prepared_request.prepare_cookies(
+			merge_cookies(merge_cookies(RequestsCookieJar(), session.cookies), self.__cookies or {})
+		)
+		settings = session.merge_environment_settings(prepared_request.url, {}, None, False, None)
+		return session.send(prepared_request, timeout=self.__timeout, **settings)
+
 	@staticmethod
 	def cookie_parse(cookies_str, array=False):
 		"""
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import time
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import date, datetime
+
+StreamOverride = namedtuple("StreamOverride", ["name", "stream_path"])
+
+
+# noinspection SpellCheckingInspection
+class OverrideSchedule:
+    """
+    按日期与时间段替换推流视频的时间表
+
+    配置的时段在加载时展开为按时间排序的区间表，每个请求只读取一次时钟并做一次二分查找；
+    当前所在区间的结束时间（下一次切换时间）会被缓存，大多数请求只需一次比较
+    """
+
+    DEFAULT_ENTRIES = (
+        {
+            "name": "国家公祭日",
+            "date": "12-13",
+            "start": "10:00",
+            "end": "11:01",
+            "stream_path_key": "national_memorial_day_stream_path"
+        },
+        {
+            "name": "9·18纪念日",
+            "date": "09-18",
+            "start": "10:00",
+            "end": "11:01",
+            "stream_path_key": "september_18th_incident_stream_path"
+        },
+    )
+
+    def __init__(self, entries=()):
+        """
+        初始化时间表
+
+        Parameters:
+        - entries (Iterable[tuple]): 已解析的时段，(名称, 年份或 None, 月, 日, 开始分钟, 结束分钟, 推流路径)，
+          时段重叠时靠后的时段优先
+        """
+        self.__entries = tuple(entries)
+        self.__lock = threading.Lock()
+        self.__table = (0.0, 0.0, (), (None,))
+        self.__cached = (0.0, -1.0, None)
+        if not self.__entries:
+            self.__cached = (float("-inf"), float("inf"), None)
+
+    @classmethod
+    def from_config(cls, raw_entries, stream_paths):
+        """
+        解析 config.yaml 中的 stream_overrides 配置
+
+        Parameters:
+        - raw_entries (list or None): 时段配置列表，为 None 时使用默认的两个纪念日
+        - stream_paths (Mapping): 可通过 stream_path_key 引用的推流路径配置
+
+        Returns:
+        - OverrideSchedule: 时间表
+
+        Raises:
+        - ValueError: 时段配置不合法时抛出，错误信息中包含全部不合法的时段
+        """
+        raw_entries = cls.DEFAULT_ENTRIES if raw_entries is None else raw_entries
+        if not isinstance(raw_entries, (list, tuple)):
+            raise ValueError("stream_overrides 必须是列表")
+
+        errors = []
+        entries = []
+        for index, raw_entry in enumerate(raw_entries):
+            try:
+                entry = cls.__parse_entry(raw_entry, stream_paths)
+            except ValueError as e:
+                errors.append(f"stream_overrides[{index}] {e}")
+                continue
+            # 未配置推流路径的时段不会替换任何请求，无需放入时间表
+            if entry[-1]:
+                entries.append(entry)
+        if errors:
+            raise ValueError("；".join(errors))
+        return cls(entries)
+
+    @classmethod
+    def __parse_entry(cls, raw_entry, stream_paths):
+        """
+        解析单个时段配置
+
+        Parameters:
+        - raw_entry (dict): 时段配置，包含 name、date、start、end 以及 stream_path 或 stream_path_key
+        - stream_paths (Mapping): 可通过 stream_path_key 引用的推流路径配置
+
+        Returns:
+        - tuple: (名称, 年份或 None, 月, 日, 开始分钟, 结束分钟, 推流路径)
+        """
+        if not isinstance(raw_entry, dict):
+            raise ValueError("必须是字典")
+        name = str(raw_entry.get("name") or "")
+        year, month, day = cls.__parse_date(raw_entry.get("date"))
+        start = cls.__parse_minutes(raw_entry.get("start", "00:00"), "start")
+        end = cls.__parse_minutes(raw_entry.get("end", "24:00"), "end")
+        if end <= start:
+            raise ValueError(f"end 必须晚于 start：{raw_entry.get('start')} - {raw_entry.get('end')}")
+
+        if raw_entry.get("stream_path_key"):
+            key = str(raw_entry["stream_path_key"])
+            if key not in stream_paths:
+                raise ValueError(f"stream_path_key 不存在：{key}")
+            stream_path = stream_paths[key]
+        else:
+            stream_path = raw_entry.get("stream_path")
+        stream_path = "" if stream_path is None else str(stream_path)
+        return name or stream_path, year, month, day, start, end, stream_path
+
+    @staticmethod
+    def __parse_date(value):
+        """
+        解析日期，支持每年重复的 MM-DD 与只生效一次的 YYYY-MM-DD
+
+        Returns:
+        - tuple: (年份或 None, 月, 日)
+        """
+        if isinstance(value, datetime):
+            value = value.date()
+        if isinstance(value, date):
+            return value.year, value.month, value.day
+        parts = str(value or "").strip().split("-")
+        try:
+            numbers = [int(part) for part in parts]
+        except ValueError:
+            numbers = []
+        if len(numbers) == 2:
+            year, (month, day) = None, numbers
+        elif len(numbers) == 3:
+            year, month, day = numbers
+        else:
+            raise ValueError(f"date 必须是 MM-DD 或 YYYY-MM-DD：{value}")
+        try:
+            # 2000 年是闰年，每年重复的 02-29 也能通过校验
+            date(year or 2000, month, day)
+        except ValueError:
+            raise ValueError(f"date 不是合法的日期：{value}")
+        return year, month, day
+
+    @staticmethod
+    def __parse_minutes(value, key):
+        """
+        解析 HH:MM 格式的时间，YAML 会将未加引号的 10:00 解析为六十进制整数 600，按分钟处理
+
+        Returns:
+        - int: 从 0 点开始的分钟数，范围 0 - 1440
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            minutes = value
+        else:
+            parts = str(value or "").strip().split(":")
+            try:
+                hour, minute = (int(part) for part in parts)
+            except ValueError:
+                raise ValueError(f"{key} 必须是 HH:MM：{value}")
+            if not 0 <= minute < 60:
+                raise ValueError(f"{key} 不是合法的时间：{value}")
+            minutes = hour * 60 + minute
+        if not 0 <= minutes <= 24 * 60:
+            raise ValueError(f"{key} 不是合法的时间：{value}")
+        return minutes
+
+    def __compile(self, now):
+        """
+        将时段展开为 now 所在年份前后各一年内的区间表
+
+        Parameters:
+        - now (float): 当前时间戳
+
+        Returns:
+        - tuple: (区间表开始时间, 区间表结束时间, 切换时间列表, 每个区间生效的替换)
+        """
+        year = datetime.fromtimestamp(now).year
+        table_start = datetime(year - 1, 1, 1).timestamp()
+        table_end = datetime(year + 2, 1, 1).timestamp()
+
+        intervals = []
+        for priority, (name, entry_year, month, day, start, end, stream_path) in enumerate(self.__entries):
+            override = StreamOverride(name, stream_path)
+            for current_year in (year - 1, year, year + 1):
+                if entry_year is not None and entry_year != current_year:
+                    continue
+                try:
+                    midnight = datetime(current_year, month, day).timestamp()
+                except ValueError:
+                    continue
+                intervals.append((midnight + start * 60, midnight + end * 60, priority, override))
+
+        boundaries = sorted({point for interval in intervals for point in interval[:2]})
+        segments = [None]
+        for index in range(len(boundaries) - 1):
+            segment_start, segment_end = boundaries[index], boundaries[index + 1]
+            active = [interval for interval in intervals if interval[0] <= segment_start and segment_end <= interval[1]]
+            segments.append(max(active, key=lambda interval: interval[2])[3] if active else None)
+        segments.append(None)
+        return table_start, table_end, tuple(boundaries), tuple(segments)
+
+    def current(self, now=None):
+        """
+        获取当前生效的替换
+
+        Parameters:
+        - now (float, optional): 时间戳，默认为当前时间
+
+        Returns:
+        - StreamOverride or None: 当前生效的替换，不在任何时段内时返回 None
+        """
+        now = time.time() if now is None else now
+        valid_from, valid_until, override = self.__cached
+        if valid_from <= now < valid_until:
+            return override
+
+        table_start, table_end, boundaries, segments = self.__table
+        if not table_start <= now < table_end:
+            with self.__lock:
+                table_start, table_end, boundaries, segments = self.__table
+                if not table_start <= now < table_end:
+                    self.__table = self.__compile(now)
+                    table_start, table_end, boundaries, segments = self.__table
+
+        index = bisect_right(boundaries, now)
+        valid_from = boundaries[index - 1] if index > 0 else table_start
+        valid_until = boundaries[index] if index < len(boundaries) else table_end
+        override = segments[index]
+        self.__cached = (valid_from, valid_until, override)
+        return override
+
+    def next_transition(self, now=None):
+        """
+        获取下一次切换时间
+
+        Parameters:
+        - now (float, optional): 时间戳，默认为当前时间
+
+        Returns:
+        - float: 下一次切换时间的时间戳，没有任何时段时返回 inf
+        """
+        self.current(now)
+        return self.__cached[1]
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+# noinspection SpellCheckingInspection
+class PathMapper:
+    """
+    挂载路径映射表：把 Emby 中的路径前缀替换为 Alist 中的存储路径前缀
+
+    前缀按路径分段构建为前缀树，每次映射只需沿路径逐段查找一次，取最长的匹配前缀；
+    按分段匹配保证 /mnt/media 不会匹配到 /mnt/media2 下的文件
+    """
+
+    __children = 0
+    __target = 1
+
+    def __init__(self, mappings=()):
+        """
+        构建前缀树
+
+        Parameters:
+        - mappings (Iterable[tuple]): ((Emby 路径前缀, Alist 路径前缀), ...)，同一前缀出现多次时以最后一次为准
+        """
+        self.__root = [{}, None]
+        self.__size = 0
+        for emby_prefix, alist_prefix in mappings:
+            node = self.__root
+            for segment in self.__split(emby_prefix):
+                node = node[self.__children].setdefault(segment, [{}, None])
+            if node[self.__target] is None:
+                self.__size += 1
+            node[self.__target] = alist_prefix.rstrip("/")
+
+    @classmethod
+    def from_config(cls, raw_mappings):
+        """
+        从配置构建映射表
+
+        Parameters:
+        - raw_mappings (list): 配置中的 alist_path_mappings，每项包含 emby_prefix 与 alist_prefix
+
+        Returns:
+        - PathMapper: 映射表，未配置时不做任何替换
+
+        Raises:
+        - ValueError: 配置项不合法时抛出
+        """
+        if raw_mappings is None:
+            return cls()
+        if not isinstance(raw_mappings, list):
+            raise ValueError("alist_path_mappings 必须是列表")
+
+        mappings = []
+        for index, raw_mapping in enumerate(raw_mappings):
+            if not isinstance(raw_mapping, dict):
+                raise ValueError(f"alist_path_mappings 第 {index + 1} 项必须是字典")
+            prefixes = []
+            for key in ("emby_prefix", "alist_prefix"):
+                prefix = raw_mapping.get(key)
+                prefix = prefix.strip() if isinstance(prefix, str) else ""
+                if not prefix.startswith("/"):
+                    raise ValueError(f"alist_path_mappings 第 {index + 1} 项的 {key} 必须是以 / 开头的路径")
+                prefixes.append(prefix)
+            mappings.append(tuple(prefixes))
+        return cls(mappings)
+
+    @staticmethod
+    def __split(path):
+        """
+        把路径前缀拆分为分段，忽略首尾与重复的 /
+
+        Returns:
+        - list: 分段
+        """
+        return [segment for segment in path.split("/") if segment]
+
+    def map(self, path):
+        """
+        把以 / 开头的 Emby 路径映射为 Alist 路径
+
+        Parameters:
+        - path (str): Emby 路径
+
+        Returns:
+        - str: 替换最长匹配前缀后的路径，没有匹配的前缀时原样返回
+        """
+        node = self.__root
+        target = node[self.__target]
+        matched_end = 0
+        position = 1
+        while node[self.__children]:
+            end = path.find("/", position)
+            node = node[self.__children].get(path[position:] if end < 0 else path[position:end])
+            if node is None:
+                break
+            if node[self.__target] is not None:
+                target = node[self.__target]
+                matched_end = len(path) if end < 0 else end
+            if end < 0:
+                break
+            position = end + 1
+
+        if target is None:
+            return path
+        return target + path[matched_end:] or "/"
+
+    def __len__(self):
+        return self.__size
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+
+from log.log import logger
+
+
+# noinspection SqlNoDataSourceInspection,SqlResolve
+class PersistentStore:
+    """
+    基于 SQLite（WAL 模式）的持久化键值存储，用于在重启后恢复解析结果缓存
+
+    写入先放入内存队列，由后台线程批量提交，请求线程不会等待磁盘；
+    每条记录带有过期时间（Unix 时间戳），读取时跳过已过期的记录，后台线程定期清理
+    """
+
+    __stores = {}
+    __stores_lock = threading.Lock()
+    __purge_interval = 300
+    __stop = object()
+
+    def __init__(self, db_path, flush_interval=1.0, batch_size=512):
+        """
+        初始化存储并启动后台写入线程
+
+        Parameters:
+        - db_path (str): 数据库文件路径，所在目录不存在时自动创建
+        - flush_interval (float): 批量写入的最长等待时间（秒）
+        - batch_size (int): 单次事务最多写入的条数
+        """
+        self.__db_path = db_path
+        self.__flush_interval = max(float(flush_interval), 0.01)
+        self.__batch_size = max(int(batch_size), 1)
+        self.__queue = queue.SimpleQueue()
+        self.__written = 0
+        self.__last_purge = 0.0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.__connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+
+        self.__writer = threading.Thread(target=self.__write_loop, name="persistent-store-writer", daemon=True)
+        self.__writer.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def open(cls, db_path, flush_interval=1.0):
+        """
+        获取指定路径的存储，同一路径只会打开一次
+
+        Parameters:
+        - db_path (str): 数据库文件路径
+        - flush_interval (float): 批量写入的最长等待时间（秒）
+
+        Returns:
+        - PersistentStore: 存储
+        """
+        db_path = os.path.abspath(db_path)
+        with cls.__stores_lock:
+            store = cls.__stores.get(db_path)
+            if store is None:
+                store = cls(db_path, flush_interval)
+                cls.__stores[db_path] = store
+            return store
+
+    def __connect(self):
+        """
+        创建数据库连接，每个线程使用独立的连接
+
+        Returns:
+        - sqlite3.Connection: 数据库连接
+        """
+        connection = sqlite3.connect(self.__db_path, timeout=5)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def db_path(self):
+        return self.__db_path
+
+    def set(self, namespace, key, value, expires_at):
+        """
+        写入一条记录，实际写入由后台线程完成
+
+        Parameters:
+        - namespace (str): 命名空间
+        - key (str): 键
+        - value (str): 值
+        - expires_at (float): 过期时间（Unix 时间戳）
+        """
+        self.__queue.put(("set", namespace, key, value, expires_at))
+
+    def delete(self, namespace, key):
+        """
+        删除一条记录，实际删除由后台线程完成
+
+        Parameters:
+        - namespace (str): 命名空间
+        - key (str): 键
+        """
+        self.__queue.put(("delete", namespace, key))
+
+    def load(self, namespace, limit=None):
+        """
+        读取命名空间中未过期的记录，过期时间越晚越靠前
+
+        Parameters:
+        - namespace (str): 命名空间
+        - limit (int, optional): 最多读取的条数
+
+        Returns:
+        - list: [(键, 值, 过期时间), ...]
+        """
+        sql = "SELECT key, value, expires_at FROM entries WHERE namespace = ? AND expires_at > ? " \
+              "ORDER BY expires_at DESC"
+        params = [namespace, time.time()]
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        connection = self.__connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+        finally:
+            connection.close()
+
+    def flush(self, timeout=5.0):
+        """
+        等待此前提交的写入全部落盘
+
+        Parameters:
+        - timeout (float): 最长等待时间（秒）
+
+        Returns:
+        - bool: 是否在超时前完成
+        """
+        if not self.__writer.is_alive():
+            return False
+        done = threading.Event()
+        self.__queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self):
+        """
+        写入剩余的记录并停止后台线程
+        """
+        if self.__writer.is_alive():
+            self.__queue.put(self.__stop)
+            self.__writer.join(timeout=5)
+
+    def stats(self):
+        """
+        获取存储统计信息
+
+        Returns:
+        - dict: 数据库路径、已写入条数与待写入条数
+        """
+        return {
+            "db_path": self.__db_path,
+            "written": self.__written,
+            "pending": self.__queue.qsize()
+        }
+
+    def __write_loop(self):
+        """
+        后台写入线程：等待第一条操作后，在 flush_interval 内尽量攒够一批再提交
+        """
+        connection = self.__connect()
+        try:
+            while True:
+                operation = self.__queue.get()
+                batch = [operation]
+                deadline = time.monotonic() + self.__flush_interval
+                while len(batch) < self.__batch_size and batch[-1] is not self.__stop and batch[-1][0] != "flush":
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.__queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                if not self.__write_batch(connection, batch):
+                    return
+        finally:
+            connection.close()
+
+    def __write_batch(self, connection, batch):
+        """
+        在一个事务中执行一批操作
+
+        Returns:
+        - bool: 是否继续运行
+        """
+        running = True
+        events = []
+        try:
+            with connection:
+                for operation in batch:
+                    if operation is self.__stop:
+                        running = False
+                    elif operation[0] == "set":
+                        connection.execute(
+                            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                            operation[1:]
+                        )
+                        self.__written += 1
+                    elif operation[0] == "delete":
+                        connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", operation[1:])
+                    elif operation[0] == "flush":
+                        events.append(operation[1])
+                now = time.time()
+                if now - self.__last_purge >= self.__purge_interval:
+                    connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                    self.__last_purge = now
+        except sqlite3.Error as e:
+            logger.error("写入持久化缓存出错：%s", e)
+        for event in events:
+            event.set()
+        return running
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import os
+import sys
+import time
+import signal
+import socket
+import atexit
+import traceback
+
+from werkzeug.serving import make_server
+
+
+# noinspection PyBroadException
+class PreforkServer:
+    """
+    prefork 多进程服务：主进程监听端口后 fork 出多个 worker 进程，由内核在 worker 之间分配连接
+
+    - 主进程只负责监听端口与管理 worker，不导入应用；应用在 worker 进程中通过 app_loader 导入，
+      使日志、配置轮询、持久化写入、健康检查等后台线程在 fork 之后创建（线程不会被 fork 复制）
+    - worker 异常退出时自动重新启动，短时间内频繁退出时延迟重启；使用共享表时，worker 被杀死或异常退出可能
+      导致其持有的分段锁无法释放，因此停止全部 worker，重新创建共享表的分段锁后再全部重新启动
+    - SIGTERM / SIGINT 停止全部 worker 后退出，SIGHUP 转发给全部 worker 重新加载配置
+    """
+
+    __restart_delay = 1.0
+    __crash_window = 5.0
+
+    def __init__(self, host, port, workers, app_loader, backlog=2048, shared_table=None):
+        """
+        初始化 prefork 服务
+
+        Parameters:
+        - host (str): 监听地址
+        - port (int): 监听端口
+        - workers (int): worker 进程数
+        - app_loader (Callable[[int], Callable]): 在 worker 进程中调用，参数为 worker 序号，返回 WSGI 应用
+        - backlog (int): 监听队列长度
+        - shared_table (SharedTable, optional): worker 之间共享的缓存表，worker 异常退出时重新创建其分段锁
+        """
+        self.__host = host
+        self.__port = port
+        self.__workers = max(int(workers), 1)
+        self.__app_loader = app_loader
+        self.__backlog = backlog
+        self.__socket = None
+        self.__shared_table = shared_table
+        self.__children = {}
+        self.__stopping = False
+
+    def serve_forever(self):
+        """
+        监听端口并启动 worker 进程，阻塞直到收到停止信号
+        """
+        self.__socket = socket.create_server((self.__host, self.__port), backlog=self.__backlog)
+        self.__socket.set_inheritable(True)
+        signal.signal(signal.SIGTERM, self.__stop)
+        signal.signal(signal.SIGINT, self.__stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.__forward_signal)
+
+        print(f"PiliPili Stream 监听 {self.__host}:{self.__port}，worker 进程数：{self.__workers}", flush=True)
+        for index in range(self.__workers):
+            self.__spawn(index)
+        try:
+            self.__supervise()
+        finally:
+            self.__socket.close()
+
+    def __spawn(self, index):
+        """
+        fork 一个 worker 进程
+
+        Parameters:
+        - index (int): worker 序号
+        """
+        pid = os.fork()
+        if pid:
+            self.__children[pid] = (index, time.monotonic())
+            return
+
+        exit_code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, self.__exit_worker)
+            if hasattr(signal, "SIGHUP"):
+                # 由 app_loader 决定是否处理 SIGHUP，默认忽略，避免 worker 被转发的信号终止
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            app = self.__app_loader(index)
+            server = make_server(self.__host, self.__port, app, threaded=True, fd=self.__socket.fileno())
+            server.serve_forever()
+        except SystemExit:
+            pass
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            # os._exit 不会执行退出处理，先手动执行，写入 worker 中剩余的持久化缓存与日志
+            try:
+                atexit._run_exitfuncs()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+
+    @staticmethod
+    def __exit_worker(signum, frame):
+        """
+        worker 收到停止信号时退出 serve_forever
+        """
+        raise SystemExit(0)
+
+    def __supervise(self):
+        """
+        等待 worker 退出，未停止服务时重新启动
+        """
+        while self.__children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index, started_at = self.__children.pop(pid, (None, 0.0))
+            if index is None or self.__stopping:
+                continue
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code != 0 and self.__shared_table is not None:
+                print(f"worker {index}（pid {pid}）异常退出，退出码：{exit_code}，"
+                      f"重新创建共享缓存的分段锁并重新启动全部 worker", flush=True)
+                self.__restart_all([index], started_at)
+                continue
+            print(f"worker {index}（pid {pid}）退出，退出码：{exit_code}，重新启动", flush=True)
+            if time.monotonic() - started_at < self.__crash_window:
+                time.sleep(self.__restart_delay)
+            if not self.__stopping:
+                self.__spawn(index)
+
+    def __restart_all(self, indexes, started_at):
+        """
+        停止其余 worker，等待全部退出后重新创建共享表的分段锁，再重新启动全部 worker；
+        新旧 worker 不会同时使用不同的锁写入共享表
+
+        Parameters:
+        - indexes (list): 已退出的 worker 序号
+        - started_at (float): 已退出的 worker 的启动时间
+        """
+        indexes = indexes + [index for index, _ in self.__children.values()]
+        self.__forward_signal(signal.SIGTERM, None)
+        while self.__children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                self.__children.clear()
+                break
+            except InterruptedError:
+                continue
+            self.__children.pop(pid, None)
+        if self.__stopping:
+            return
+        self.__shared_table.reset_locks()
+        if time.monotonic() - started_at < self.__crash_window:
+            time.sleep(self.__restart_delay)
+        for index in sorted(indexes):
+            if not self.__stopping:
+                self.__spawn(index)
+
+    def __stop(self, signum, frame):
+        """
+        停止全部 worker
+        """
+        self.__stopping = True
+        self.__forward_signal(signal.SIGTERM, frame)
+
+    def __forward_signal(self, signum, frame):
+        """
+        将信号转发给全部 worker
+        """
+        for pid in list(self.__children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import math
+import time
+import ipaddress
+import threading
+from collections import OrderedDict
+
+
+def is_trusted_proxy(address, trusted_proxies):
+    """
+    判断地址是否属于受信任的反向代理
+
+    Parameters:
+    - address (str): IP 地址
+    - trusted_proxies (tuple): 受信任的网段 (IPv4Network / IPv6Network, ...)
+
+    Returns:
+    - bool: 地址合法且属于任一网段时返回 True
+    """
+    try:
+        ip = ipaddress.ip_address(address.strip())
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def get_client_ip(real_ip, forwarded_for, remote_addr, trusted_proxies=()):
+    """
+    获取客户端 IP：只有连接的对端是受信任的反向代理时才使用其设置的请求头，
+    优先使用 X-Real-IP，其次是 X-Forwarded-For 中从右往左第一个不属于受信任代理的地址；
+    其它情况使用连接的对端地址，避免直连端口的客户端伪造请求头绕过限流
+
+    Parameters:
+    - real_ip (str): X-Real-IP 请求头
+    - forwarded_for (str): X-Forwarded-For 请求头
+    - remote_addr (str): 连接的对端地址
+    - trusted_proxies (tuple, optional): 受信任的反向代理网段，默认不信任任何代理
+
+    Returns:
+    - str: 客户端 IP，无法获取时返回 空字符串
+    """
+    remote_addr = remote_addr or ""
+    if not trusted_proxies or not is_trusted_proxy(remote_addr, trusted_proxies):
+        return remote_addr
+    if real_ip:
+        return real_ip.strip()
+    if forwarded_for:
+        for address in reversed(forwarded_for.split(",")):
+            address = address.strip()
+            if address and not is_trusted_proxy(address, trusted_proxies):
+                return address
+    return remote_addr
+
+
+class TokenBucketLimiter:
+    """
+    令牌桶限流：每个键一个令牌桶，以 rate 个/秒的速度补充令牌，最多积累 burst 个
+
+    - 令牌桶只保存 (剩余令牌数, 更新时间)，按更新时间排序；空闲到令牌补满的桶与不存在的桶等价，
+      在每次获取令牌时从最久未更新的一端顺带清理，无需后台线程
+    - 桶的数量超过 max_size 时淘汰最久未更新的桶
+    """
+
+    def __init__(self, rate, burst, max_size=4096):
+        """
+        初始化令牌桶限流
+
+        Parameters:
+        - rate (float): 每秒补充的令牌数
+        - burst (int): 令牌桶容量，即允许的突发请求数
+        - max_size (int): 最多保存的令牌桶数量
+        """
+        self.__rate = float(rate)
+        self.__burst = max(float(burst), 1.0)
+        self.__max_size = max(int(max_size), 1)
+        self.__idle = self.__burst / self.__rate
+        self.__buckets = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__allowed = 0
+        self.__limited = 0
+
+    @property
+    def settings(self):
+        return self.__rate, self.__burst, self.__max_size
+
+    @property
+    def retry_after(self):
+        """
+        获取被限流后建议的重试间隔，即补充一个令牌所需的时间
+
+        Returns:
+        - int: 重试间隔（秒），至少为 1
+        """
+        return max(math.ceil(1 / self.__rate), 1)
+
+    def acquire(self, keys):
+        """
+        从每个键的令牌桶中各取一个令牌，任一令牌桶不足时都不取
+
+        Parameters:
+        - keys (Iterable): 限流键，例如 ("ip", 客户端 IP) 与 ("api_key", API 密钥)
+
+        Returns:
+        - bool: 是否允许请求
+        """
+        now = time.monotonic()
+        buckets = self.__buckets
+        with self.__lock:
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if now - oldest[1] < self.__idle:
+                    break
+                buckets.popitem(last=False)
+
+            levels = []
+            for key in keys:
+                bucket = buckets.get(key)
+                tokens = self.__burst if bucket is None else \
+                    min(self.__burst, bucket[0] + (now - bucket[1]) * self.__rate)
+                if tokens < 1:
+                    self.__limited += 1
+                    return False
+                levels.append((key, tokens - 1))
+
+            for key, tokens in levels:
+                buckets[key] = (tokens, now)
+                buckets.move_to_end(key)
+            while len(buckets) > self.__max_size:
+                buckets.popitem(last=False)
+            self.__allowed += 1
+            return True
+
+    def stats(self):
+        """
+        获取限流统计信息
+
+        Returns:
+        - dict: 允许与被限流的请求数，以及当前的令牌桶数量
+        """
+        with self.__lock:
+            return {"allowed": self.__allowed, "limited": self.__limited, "buckets": len(self.__buckets)}
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import mmap
+import time
+import struct
+import hashlib
+import threading
+import multiprocessing
+
+
+# noinspection PyBroadException
+class SharedTable:
+    """
+    基于匿名共享内存（mmap）的定长哈希表，在 fork 之前创建后由全部 worker 进程共享
+
+    - 表由若干组（bucket）组成，每组 ways 个定长槽位，键按哈希固定落在一组中，组满时淘汰最早过期的条目
+    - 写入按组加分段锁（multiprocessing.Lock），不同组的写入互不阻塞；worker 在持有锁时被杀死会导致锁无法释放，
+      因此获取锁有超时，超时后放弃本次写入或删除（只是缓存）并计数，由 PreforkServer 在停止全部 worker 后调用
+      reset_locks 重新创建分段锁
+    - 读取不加锁：每个槽位带有序列号（seqlock），写入期间为奇数，写完后改为一个新的偶数，读取时序列号为奇数
+      或前后不一致则重读；写入中途进程退出时序列号保持为奇数，该槽位在被重新写入前不会被读到
+    - 键、值与命名空间合计超过槽位大小的条目不写入共享表
+    """
+
+    # 槽位头：序列号、键哈希、过期时间（Unix 时间戳，0 表示空槽位）、键长度、值长度
+    __header = struct.Struct("<IQdHH")
+    __seq = struct.Struct("<I")
+    __read_retries = 8
+
+    def __init__(self, slots=16384, slot_size=2048, ways=8, lock_stripes=64, lock_timeout=0.1):
+        """
+        创建共享哈希表，必须在 fork worker 进程之前调用
+
+        Parameters:
+        - slots (int): 槽位总数，向上取整为 ways 的整数倍
+        - slot_size (int): 每个槽位的字节数，包含 24 字节的槽位头
+        - ways (int): 每组的槽位数，即同一个组中最多同时保存的条目数
+        - lock_stripes (int): 分段锁的数量
+        - lock_timeout (float): 获取分段锁的超时时间（秒）
+        """
+        self.__ways = max(int(ways), 1)
+        self.__buckets = max((int(slots) + self.__ways - 1) // self.__ways, 1)
+        self.__slots = self.__buckets * self.__ways
+        self.__slot_size = max(int(slot_size), self.__header.size + 64)
+        self.__payload_size = self.__slot_size - self.__header.size
+        self.__memory = mmap.mmap(-1, self.__slots * self.__slot_size)
+        self.__locks = tuple(multiprocessing.Lock() for _ in range(max(int(lock_stripes), 1)))
+        self.__lock_timeout = float(lock_timeout)
+        self.__lock_timeouts = 0
+
+    @property
+    def capacity(self):
+        return self.__slots
+
+    @property
+    def lock_timeouts(self):
+        """
+        获取当前进程获取分段锁超时、放弃写入或删除的次数
+
+        Returns:
+        - int: 超时次数
+        """
+        return self.__lock_timeouts
+
+    def reset_locks(self):
+        """
+        重新创建全部分段锁，用于 worker 持有锁时被杀死之后；
+        只能在没有任何 worker 进程使用共享表时调用，之后 fork 的 worker 使用新的锁
+        """
+        self.__locks = tuple(multiprocessing.Lock() for _ in range(len(self.__locks)))
+
+    def __acquire(self, lock):
+        """
+        获取分段锁，超时时计数
+
+        Returns:
+        - bool: 是否获取到锁
+        """
+        if lock.acquire(timeout=self.__lock_timeout):
+            return True
+        self.__lock_timeouts += 1
+        return False
+
+    @property
+    def slot_size(self):
+        return self.__slot_size
+
+    @staticmethod
+    def __hash(key):
+        """
+        计算键的 64 位哈希，不依赖进程的 hash 随机化
+        """
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+    def __bucket_offset(self, key_hash):
+        """
+        获取键所在组的第一个槽位的偏移量与分段锁
+        """
+        bucket = key_hash % self.__buckets
+        return bucket * self.__ways * self.__slot_size, self.__locks[bucket % len(self.__locks)]
+
+    def __read_slot(self, offset):
+        """
+        无锁读取一个槽位
+
+        Returns:
+        - tuple: (键哈希, 过期时间, 键, 值)，槽位正在被写入且重试后仍不一致时返回 None
+        """
+        memory = self.__memory
+        for _ in range(self.__read_retries):
+            seq, key_hash, expires_at, key_length, value_length = self.__header.unpack_from(memory, offset)
+            if seq & 1:
+                continue
+            payload_offset = offset + self.__header.size
+            payload = memory[payload_offset:payload_offset + key_length + value_length]
+            if self.__seq.unpack_from(memory, offset)[0] == seq:
+                return key_hash, expires_at, payload[:key_length], payload[key_length:]
+        return None
+
+    def __write_slot(self, offset, key_hash, expires_at, key, value):
+        """
+        在持有分段锁时写入一个槽位，写入期间序列号为奇数，写完后改为与写入前不同的偶数；
+        上一次写入中途中断、序列号仍为奇数时同样适用
+        """
+        memory = self.__memory
+        writing = self.__seq.unpack_from(memory, offset)[0] | 1
+        self.__seq.pack_into(memory, offset, writing)
+        payload_offset = offset + self.__header.size
+        memory[payload_offset:payload_offset + len(key) + len(value)] = key + value
+        self.__header.pack_into(memory, offset, writing, key_hash, expires_at, len(key), len(value))
+        self.__seq.pack_into(memory, offset, (writing + 1) & 0xFFFFFFFF)
+
+    def get(self, key):
+        """
+        读取未过期的条目
+
+        Parameters:
+        - key (bytes): 键
+
+        Returns:
+        - tuple: (值, 过期时间（Unix 时间戳）)，不存在或已过期时返回 None
+        """
+        key_hash = self.__hash(key)
+        offset, _ = self.__bucket_offset(key_hash)
+        now = time.time()
+        for index in range(self.__ways):
+            slot_offset = offset + index * self.__slot_size
+            # 先只比较哈希，绝大多数不匹配的槽位不需要复制键值
+            if self.__header.unpack_from(self.__memory, slot_offset)[1] != key_hash:
+                continue
+            slot = self.__read_slot(slot_offset)
+            if slot is None or slot[0] != key_hash or slot[2] != key:
+                continue
+            return (slot[3], slot[1]) if slot[1] > now else None
+        return None
+
+    def set(self, key, value, expires_at):
+        """
+        写入条目，同一组中优先覆盖相同的键，其次是空槽位或已过期的条目，否则淘汰最早过期的条目
+
+        Parameters:
+        - key (bytes): 键
+        - value (bytes): 值
+        - expires_at (float): 过期时间（Unix 时间戳）
+
+        Returns:
+        - bool: 是否写入，键值超过槽位大小或获取分段锁超时时返回 False
+        """
+        if len(key) + len(value) > self.__payload_size:
+            return False
+        key_hash = self.__hash(key)
+        offset, lock = self.__bucket_offset(key_hash)
+        now = time.time()
+        if not self.__acquire(lock):
+            return False
+        try:
+            target = None
+            earliest = None
+            for index in range(self.__ways):
+                slot_offset = offset + index * self.__slot_size
+                _, slot_hash, slot_expires_at, key_length, _ = self.__header.unpack_from(self.__memory, slot_offset)
+                if slot_hash == key_hash and self.__read_key(slot_offset, key_length) == key:
+                    target = slot_offset
+                    break
+                if slot_expires_at <= now:
+                    target = target if target is not None else slot_offset
+                elif earliest is None or slot_expires_at < earliest[0]:
+                    earliest = (slot_expires_at, slot_offset)
+            if target is None:
+                target = earliest[1]
+            self.__write_slot(target, key_hash, expires_at, key, value)
+        finally:
+            lock.release()
+        return True
+
+    def __read_key(self, offset, key_length):
+        """
+        在持有分段锁时读取槽位中的键
+        """
+        payload_offset = offset + self.__header.size
+        return self.__memory[payload_offset:payload_offset + key_length]
+
+    def delete(self, key):
+        """
+        删除条目
+
+        Parameters:
+        - key (bytes): 键
+
+        Returns:
+        - tuple: 被删除的 (值, 过期时间)，条目不存在或获取分段锁超时时返回 None
+        """
+        key_hash = self.__hash(key)
+        offset, lock = self.__bucket_offset(key_hash)
+        if not self.__acquire(lock):
+            return None
+        try:
+            for index in range(self.__ways):
+                slot_offset = offset + index * self.__slot_size
+                slot = self.__read_slot(slot_offset)
+                if slot is None or slot[0] != key_hash or slot[2] != key:
+                    continue
+                self.__write_slot(slot_offset, 0, 0.0, b"", b"")
+                return slot[3], slot[1]
+        finally:
+            lock.release()
+        return None
+
+    def items(self, prefix=b""):
+        """
+        遍历未过期的条目，用于按前缀查找键，遍历期间其他进程的写入可能被看到，也可能不被看到
+
+        Parameters:
+        - prefix (bytes): 键前缀
+
+        Returns:
+        - list: [(键, 值, 过期时间), ...]
+        """
+        now = time.time()
+        entries = []
+        for slot_offset in range(0, self.__slots * self.__slot_size, self.__slot_size):
+            if self.__header.unpack_from(self.__memory, slot_offset)[2] <= now:
+                continue
+            slot = self.__read_slot(slot_offset)
+            if slot is not None and slot[1] > now and slot[2].startswith(prefix):
+                entries.append((slot[2], slot[3], slot[1]))
+        return entries
+
+
+# noinspection PyBroadException
+class SharedTTLCache:
+    """
+    与 TTLCache 接口一致、数据保存在 SharedTable 中的缓存，prefork 模式下替换各 API 的进程内缓存，
+    任意 worker 写入的条目对全部 worker 可见
+
+    - 每个缓存使用独立的命名空间，多个缓存可以共用一张共享表
+    - 容量由共享表决定，configure 中的 max_size 不生效
+    - 命中与未命中次数按进程统计
+    """
+
+    __separator = b"\x00"
+
+    def __init__(self, table, namespace, key_encoder=str, key_decoder=str, ttl=300):
+        """
+        初始化共享缓存
+
+        Parameters:
+        - table (SharedTable): 共享表
+        - namespace (str): 命名空间
+        - key_encoder (Callable): 将缓存键编码为字符串
+        - key_decoder (Callable): 将字符串解码为缓存键
+        - ttl (float): 默认过期时间（秒），小于等于 0 时禁用缓存
+        """
+        self.__table = table
+        self.__prefix = namespace.encode("utf-8") + self.__separator
+        self.__key_encoder = key_encoder
+        self.__key_decoder = key_decoder
+        self.__ttl = float(ttl or 0)
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__store = None
+        self.__store_namespace = None
+        self.__store_key_encoder = str
+
+    def configure(self, max_size, ttl):
+        """
+        调整默认过期时间，容量由共享表决定
+
+        Parameters:
+        - max_size (int): 不生效，仅为与 TTLCache 保持一致
+        - ttl (float): 默认过期时间（秒）
+        """
+        self.__ttl = float(ttl or 0)
+
+    def attach_store(self, store, namespace, key_encoder=str, key_decoder=str):
+        """
+        将缓存写入同步到持久化存储，并在后台线程中用存储中未过期的记录预热共享表
+
+        Parameters:
+        - store (PersistentStore or None): 持久化存储，为 None 时停止同步
+        - namespace (str): 存储中的命名空间
+        - key_encoder (Callable): 将缓存键编码为字符串
+        - key_decoder (Callable): 将字符串解码为缓存键
+        """
+        if store is self.__store and namespace == self.__store_namespace:
+            return
+        self.__store_key_encoder = key_encoder
+        self.__store_namespace = namespace
+        self.__store = store
+        if store is not None:
+            threading.Thread(target=self.__warm_up, args=(store, namespace, key_decoder),
+                             name=f"shared-cache-warm-up-{namespace}", daemon=True).start()
+
+    def __warm_up(self, store, namespace, key_decoder):
+        """
+        从持久化存储加载未过期的记录，共享表中已存在的条目不会被覆盖
+        """
+        now = time.time()
+        for encoded_key, value, expires_at in store.load(namespace, limit=self.__table.capacity):
+            expires_at = min(expires_at, now + self.__ttl)
+            if expires_at <= now:
+                continue
+            try:
+                key = self.__encode_key(key_decoder(encoded_key))
+            except Exception:
+                continue
+            if self.__table.get(key) is None:
+                self.__table.set(key, value.encode("utf-8"), expires_at)
+
+    def __encode_key(self, key):
+        return self.__prefix + self.__key_encoder(key).encode("utf-8")
+
+    @property
+    def enabled(self):
+        """
+        缓存是否启用
+
+        Returns:
+        - bool: 默认过期时间大于 0 时返回 True
+        """
+        return self.__ttl > 0
+
+    def get(self, key, default=None):
+        """
+        获取缓存值，过期或不存在时返回默认值
+
+        Parameters:
+        - key: 缓存键
+        - default: 未命中时的返回值
+
+        Returns:
+        - 缓存值或 default
+        """
+        return self.get_with_ttl(key, default)[0]
+
+    def get_with_ttl(self, key, default=None):
+        """
+        获取缓存值及其剩余有效期
+
+        Parameters:
+        - key: 缓存键
+        - default: 未命中时的返回值
+
+        Returns:
+        - tuple: (缓存值, 剩余有效期（秒）)，过期或不存在时返回 (default, 0)
+        """
+        entry = self.__table.get(self.__encode_key(key)) if self.__ttl > 0 else None
+        with self.__lock:
+            if entry is None:
+                self.__misses += 1
+                return default, 0
+            self.__hits += 1
+        return entry[0].decode("utf-8"), entry[1] - time.time()
+
+    def __contains__(self, key):
+        """
+        判断是否存在未过期的条目，不计入命中统计
+        """
+        return self.__ttl > 0 and self.__table.get(self.__encode_key(key)) is not None
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存值，只支持字符串
+
+        Parameters:
+        - key: 缓存键
+        - value (str): 缓存值
+        - ttl (float, optional): 当前条目的过期时间（秒），未提供时使用默认值
+        """
+        ttl = self.__ttl if ttl is None else ttl
+        if not self.enabled or ttl <= 0 or not isinstance(value, str):
+            return
+        expires_at = time.time() + ttl
+        self.__table.set(self.__encode_key(key), value.encode("utf-8"), expires_at)
+        store = self.__store
+        if store is not None:
+            store.set(self.__store_namespace, self.__store_key_encoder(key), value, expires_at)
+
+    def delete(self, key):
+        """
+        删除缓存值
+
+        Parameters:
+        - key: 缓存键
+
+        Returns:
+        - bool: 条目存在并被删除时返回 True
+        """
+        return self.pop(key) is not None
+
+    def pop(self, key, default=None):
+        """
+        删除缓存值并返回，不计入命中统计
+
+        Parameters:
+        - key: 缓存键
+        - default: 条目不存在或已过期时的返回值
+
+        Returns:
+        - 被删除的缓存值或 default
+        """
+        store = self.__store
+        if store is not None:
+            store.delete(self.__store_namespace, self.__store_key_encoder(key))
+        entry = self.__table.delete(self.__encode_key(key))
+        if entry is None or entry[1] <= time.time():
+            return default
+        return entry[0].decode("utf-8")
+
+    def keys(self):
+        """
+        获取命名空间中未过期的键，需要遍历整张共享表
+
+        Returns:
+        - list: 缓存键
+        """
+        keys = []
+        prefix_length = len(self.__prefix)
+        for encoded_key, _, _ in self.__table.items(self.__prefix):
+            try:
+                keys.append(self.__key_decoder(encoded_key[prefix_length:].decode("utf-8")))
+            except Exception:
+                continue
+        return keys
+
+    def clear(self):
+        for key in self.keys():
+            self.__table.delete(self.__encode_key(key))
+
+    def __len__(self):
+        return len(self.__table.items(self.__prefix))
+
+    def stats(self):
+        """
+        获取当前进程的缓存统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、命名空间中的条目数、共享表容量、默认过期时间
+          与获取共享表分段锁超时的次数（整张共享表）
+        """
+        with self.__lock:
+            hits, misses = self.__hits, self.__misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "size": len(self),
+            "max_size": self.__table.capacity,
+            "ttl": self.__ttl,
+            "lock_timeouts": self.__table.lock_timeouts
+        }
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import asyncio
+import threading
+
+
+# noinspection PyBroadException
+class SingleFlight:
+    """
+    请求合并工具：同一个键的并发调用只会真正执行一次，
+    其余调用者等待该次执行结束并共享其结果或异常
+    """
+
+    class _Call:
+        """
+        一次正在进行中的调用
+        """
+        __slots__ = ("event", "result", "error")
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        执行调用，若同一个键已有调用正在进行，则等待并复用其结果
+
+        Parameters:
+        - key: 合并调用的键，需可哈希
+        - func (Callable): 实际执行的函数
+        - args: 函数的可变参数
+        - kwargs: 函数的关键字参数
+
+        Returns:
+        - 函数的返回值；若函数抛出异常，所有等待者都会收到同一个异常
+        """
+        with self.__lock:
+            call = self.__calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._Call()
+                self.__calls[key] = call
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                self.__calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self):
+        """
+        获取当前正在进行中的调用数量
+
+        Returns:
+        - int: 进行中的调用数量
+        """
+        return len(self.__calls)
+
+
+# noinspection PyBroadException
+class AsyncSingleFlight:
+    """
+    SingleFlight 的 asyncio 版本，用于同一事件循环内的协程
+    """
+
+    def __init__(self):
+        self.__futures = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """
+        执行协程函数，若同一个键已有调用正在进行，则等待并复用其结果
+
+        Parameters:
+        - key: 合并调用的键，需可哈希
+        - func (Callable): 返回协程的函数
+        - args: 函数的可变参数
+        - kwargs: 函数的关键字参数
+
+        Returns:
+        - 协程的返回值；若协程抛出异常，所有等待者都会收到同一个异常；
+          执行中的协程被取消（例如客户端断开）时，未被取消的等待者会重新发起调用
+        """
+        future = self.__futures.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 只有执行中的协程被取消、而当前协程自身未被取消时才重试，由第一个重试者重新执行
+                task = asyncio.current_task()
+                if not future.cancelled() or getattr(task, "cancelling", lambda: 0)():
+                    raise
+            future = self.__futures.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self.__futures[key] = future
+        try:
+            result = await func(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待者时避免出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self.__futures.pop(key, None)
+
+    def in_flight(self):
+        """
+        获取当前正在进行中的调用数量
+
+        Returns:
+        - int: 进行中的调用数量
+        """
+        return len(self.__futures)
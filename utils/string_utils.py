@@ -3,19 +3,82 @@
 # -*- coding: utf-8 -*-
 
 import re
-from urllib.parse import urlparse
+import time
+from functools import lru_cache
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qsl
 
 
 # noinspection PyBroadException
 class StringUtils:
 
+    # 需要编码的特殊字符
+    __special_character_mapping = {
+        ' ': '%20',
+        '"': '%22',
+        '#': '%23',
+        '%': '%25',
+        '&': '%26',
+        '(': '%28',
+        ')': '%29',
+        '+': '%2B',
+        ',': '%2C',
+        ':': '%3A',
+        ';': '%3B',
+        '<': '%3C',
+        '=': '%3D',
+        '>': '%3E',
+        '?': '%3F',
+        '@': '%40',
+        '\\': '%5C',
+        '|': '%7C',
+        '！': '%EF%BC%81'
+    }
+
+    # 预先排好序的替换表：% 必须最先替换，否则会把其他字符编码后产生的 % 再编码一次。
+    # CPython 的 str.translate 在替换结果不是单个字符且字符串包含中文时会逐字符查表，
+    # 比只对实际出现的字符执行 str.replace 慢数倍，因此这里使用替换表
+    __special_character_replacements = tuple(
+        sorted(__special_character_mapping.items(), key=lambda item: item[0] != '%')
+    )
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def compile_pattern(pattern_word):
+        """
+        编译并缓存不区分大小写的正则表达式
+
+        Parameters:
+        - pattern_word (str): 正则表达式模式
+
+        Returns:
+        - re.Pattern: 编译后的正则表达式
+        """
+        return re.compile(pattern_word, re.IGNORECASE)
+
+    @staticmethod
+    def encode_special_characters(text):
+        """
+        编码路径中的特殊字符
+
+        Parameters:
+        - text (str): 待编码的字符串
+
+        Returns:
+        - str: 编码后的字符串
+        """
+        for character, encoded in StringUtils.__special_character_replacements:
+            if character in text:
+                text = text.replace(character, encoded)
+        return text
+
     @staticmethod
     def dir_path_clean(pattern_word, dir_path):
         """
         清理目录路径中的特殊字符，并进行编码
 
         Parameters:
-        - pattern (str): 正则表达式模式
+        - pattern (str or re.Pattern): 正则表达式模式，字符串模式按不区分大小写编译
         - dir_path (str): 待清理的目录路径
 
         Returns:
@@ -30,7 +93,9 @@ class StringUtils:
             return dir_path
 
         # 在目录路径中查找特定模式
-        match = re.search(pattern_word, dir_path, re.IGNORECASE)
+        if isinstance(pattern_word, str):
+            pattern_word = StringUtils.compile_pattern(pattern_word)
+        match = pattern_word.search(dir_path)
 
         # 如果未找到匹配或匹配组不为空，则返回原始目录路径
         if not match or not match.group(1):
@@ -38,30 +103,8 @@ class StringUtils:
 
         try:
             # 清理特殊字符并进行编码
-            special_character_mapping = {
-                ' ': '%20',
-                '"': '%22',
-                '#': '%23',
-                '%': '%25',
-                '&': '%26',
-                '(': '%28',
-                ')': '%29',
-                '+': '%2B',
-                ',': '%2C',
-                ':': '%3A',
-                ';': '%3B',
-                '<': '%3C',
-                '=': '%3D',
-                '>': '%3E',
-                '?': '%3F',
-                '@': '%40',
-                '\\': '%5C',
-                '|': '%7C',
-                '！': '%EF%BC%81'
-            }
-
             uncleaned_part = match.group(1)
-            cleaned_part = ''.join(special_character_mapping.get(char, char) for char in uncleaned_part)
+            cleaned_part = StringUtils.encode_special_characters(uncleaned_part)
             return dir_path.replace(uncleaned_part, cleaned_part)
         except Exception as e:
             return dir_path
@@ -84,3 +127,52 @@ class StringUtils:
             return True if parsed_url.scheme and parsed_url.netloc else False
         except Exception as e:
             return False
+
+    @staticmethod
+    def get_url_expire_time(url):
+        """
+        从签名 URL 的查询参数中解析链接的过期时间
+
+        支持常见的签名参数：Expires / x-oss-expires（Unix 时间戳）、
+        X-Amz-Date + X-Amz-Expires（S3 预签名）、q-sign-time（COS）、
+        se（Azure SAS）以及 Alist 自身的 sign=xxx:时间戳
+
+        Parameters:
+        - url (str): 待解析的 URL
+
+        Returns:
+        - float or None: 过期时间的 Unix 时间戳，无法解析时返回 None
+        """
+        if not url or not isinstance(url, str) or "?" not in url:
+            return None
+        try:
+            params = {key.lower(): value for key, value in parse_qsl(urlparse(url).query)}
+        except Exception as e:
+            return None
+
+        expire_times = []
+        for key in ("expires", "x-oss-expires"):
+            if params.get(key, "").isdigit():
+                expire_times.append(float(params[key]))
+        if params.get("x-amz-date") and params.get("x-amz-expires", "").isdigit():
+            try:
+                signed_at = datetime.strptime(params["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                expire_times.append(signed_at.timestamp() + float(params["x-amz-expires"]))
+            except ValueError:
+                pass
+        sign_time = params.get("q-sign-time", "").split(";")
+        if len(sign_time) == 2 and sign_time[1].isdigit():
+            expire_times.append(float(sign_time[1]))
+        if params.get("se"):
+            try:
+                expire_times.append(datetime.fromisoformat(params["se"].replace("Z", "+00:00")).timestamp())
+            except ValueError:
+                pass
+        sign = params.get("sign", "").rsplit(":", 1)
+        if len(sign) == 2 and sign[1].isdigit() and sign[1] != "0":
+            expire_times.append(float(sign[1]))
+
+        # 过滤掉明显不是时间戳的值（如毫秒或早于当前时间很多的值）
+        now = time.time()
+        expire_times = [expire_time for expire_time in expire_times if now - 86400 < expire_time < now + 366 * 86400]
+        return min(expire_times) if expire_times else None
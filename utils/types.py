@@ -27,4 +27,48 @@ class RedirectMode(Enum):
     - POST (str): POST请求类型
     """
     MISAKA = 'MISAKA'
-    ALIST = 'ALIST'
\ No newline at end of file
+    ALIST = 'ALIST'
+
+
+class RedirectOutcome(Enum):
+    """
+    推流重定向结果枚举，用于指标标签
+
+    Attributes:
+    - REDIRECTED (str): 正常重定向到推流地址
+    - FORBIDDEN (str): UA 不被允许，重定向到禁止播放视频
+    - NO_PATH (str): 未获取到 Emby 文件路径
+    - UPSTREAM_ERROR (str): 未能从推流后端获取到推流地址
+    - RATE_LIMITED (str): 客户端请求上游过于频繁，返回 429
+    """
+    REDIRECTED = 'redirected'
+    FORBIDDEN = 'forbidden'
+    NO_PATH = 'no_path'
+    UPSTREAM_ERROR = 'upstream_error'
+    RATE_LIMITED = 'rate_limited'
+
+
+class LibraryAction(Enum):
+    """
+    媒体库变更通知的处理方式枚举
+
+    Attributes:
+    - NEW (str): 新入库，可选择预先解析推流地址
+    - UPDATED (str): 媒体被更新，文件可能被移动或替换，删除缓存后可选择重新解析
+    - DELETED (str): 媒体被删除，只删除缓存
+    """
+    NEW = 'new'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+
+
+class LookupFailure(Enum):
+    """
+    上游查询失败原因枚举，用于负缓存
+
+    Attributes:
+    - NOT_FOUND (str): 上游正常响应，但没有找到媒体或文件
+    - UPSTREAM_ERROR (str): 上游不可达、超时或返回 5xx
+    """
+    NOT_FOUND = 'not_found'
+    UPSTREAM_ERROR = 'upstream_error'
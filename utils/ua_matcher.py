@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+
+import re
+from functools import lru_cache
+
+
+# noinspection PyBroadException
+class UserAgentMatcher:
+    """
+    UA 匹配器：把允许列表一次性编译为一个合并的正则，并缓存每个 UA 的判断结果
+
+    判断规则与 Config.is_allowed_user_agent 原有逻辑一致：
+    - 两个允许列表都为空时全部允许
+    - 包含 infuse 但不包含 direct 的 UA 拒绝
+    - 包含 afuse 的 UA 拒绝
+    - 其余 UA 只要包含任一允许列表中的字符串（不区分大小写）即允许
+    """
+
+    def __init__(self, ua_allow_list, web_ua_allow_list, cache_size=256):
+        """
+        初始化 UA 匹配器
+
+        Parameters:
+        - ua_allow_list (list): UA 允许列表
+        - web_ua_allow_list (list): Web UA 允许列表
+        - cache_size (int): 判断结果缓存的最大条目数
+        """
+        allow_list = [str(ua).lower() for ua in list(ua_allow_list or []) + list(web_ua_allow_list or [])]
+        self.__allow_all = not ua_allow_list and not web_ua_allow_list
+        # 空字符串是任何 UA 的子串，与原逻辑一致时等价于全部匹配
+        self.__match_all = "" in allow_list
+        allow_list = sorted({ua for ua in allow_list if ua}, key=len, reverse=True)
+        self.__pattern = re.compile("|".join(re.escape(ua) for ua in allow_list)) if allow_list else None
+        self.is_allowed = lru_cache(maxsize=cache_size)(self.__is_allowed)
+
+    def __is_allowed(self, user_agent):
+        """
+        检查 UA 是否被允许
+
+        Parameters:
+        - user_agent (str): 要检查的用户代理字符串
+
+        Returns:
+        - bool: 允许时返回 True，否则返回 False
+        """
+        if self.__allow_all:
+            return True
+        user_agent = user_agent.lower() if isinstance(user_agent, str) else ""
+        if "infuse" in user_agent and "direct" not in user_agent:
+            return False
+        if "afuse" in user_agent:
+            return False
+        if self.__match_all:
+            return True
+        return self.__pattern is not None and self.__pattern.search(user_agent) is not None
+
+    def cache_stats(self):
+        """
+        获取判断结果缓存的统计信息
+
+        Returns:
+        - dict: 命中次数、未命中次数、当前条目数与容量
+        """
+        cache_info = self.is_allowed.cache_info()
+        return {
+            "hits": cache_info.hits,
+            "misses": cache_info.misses,
+            "size": cache_info.currsize,
+            "max_size": cache_info.maxsize
+        }